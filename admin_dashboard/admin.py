@@ -1,13 +1,22 @@
 from django.contrib import admin
-from .models import Product, Customer, DashboardStats
+from .models import Category, Product, Customer, DashboardStats, Order, OrderItem
 
 # Register your models here.
 
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ['name', 'parent', 'position', 'product_count']
+    list_select_related = ['parent']
+    prepopulated_fields = {'slug': ['name']}
+    readonly_fields = ['product_count']
+    search_fields = ['name']
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'price', 'stock_quantity', 'is_active', 'created_at']
     list_filter = ['category', 'is_active', 'created_at']
-    search_fields = ['name', 'category', 'description']
+    list_select_related = ['category']
+    search_fields = ['name', 'category__name', 'description']
     list_editable = ['price', 'stock_quantity', 'is_active']
 
 @admin.register(Customer)
@@ -16,6 +25,20 @@ class CustomerAdmin(admin.ModelAdmin):
     search_fields = ['user__first_name', 'user__last_name', 'user__email', 'phone']
     list_filter = ['created_at']
 
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ['product']
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'customer', 'status', 'total', 'placed_at']
+    list_filter = ['status', 'placed_at']
+    list_select_related = ['customer__user']
+    raw_id_fields = ['customer']
+    readonly_fields = ['total']
+    inlines = [OrderItemInline]
+
 @admin.register(DashboardStats)
 class DashboardStatsAdmin(admin.ModelAdmin):
     list_display = ['date', 'total_earnings', 'daily_earnings', 'new_customers', 'total_customers']
@@ -0,0 +1,78 @@
+"""Helpers shared by the ``benchmark_*`` management commands"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+
+@contextmanager
+def scratch_database(verbosity=0, name=None):
+    """
+    Run the block against a freshly migrated throwaway copy of the default database.
+
+    ``name`` puts the copy in that file instead of the backend's default test
+    database (in memory for SQLite), which concurrent writers need. A SQLite
+    file copy runs in WAL mode with immediate transactions, so writers queue
+    for the lock instead of failing with "database is locked".
+    """
+    old_name = connection.settings_dict['NAME']
+    old_test = connection.settings_dict.get('TEST', {})
+    old_options = connection.settings_dict.get('OPTIONS', {})
+    if name:
+        connection.settings_dict['TEST'] = {**old_test, 'NAME': name}
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['OPTIONS'] = {
+                **old_options, 'transaction_mode': 'IMMEDIATE', 'init_command': 'PRAGMA journal_mode=WAL;',
+            }
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        connection.settings_dict['TEST'] = old_test
+        connection.settings_dict['OPTIONS'] = old_options
+
+
+def simulate_latency(milliseconds):
+    """Delay every query on every connection by ``milliseconds``, as a remote database would"""
+    delay = milliseconds / 1000
+
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(delay)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+    # The current thread's connection may already be open.
+    if connection.connection is not None:
+        install(None, connection)
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times and return the timings in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentiles(timings):
+    """Return the p50, p95 and p99 of ``timings``"""
+    ordered = sorted(timings)
+    return {
+        f'p{q}': ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))] if ordered else 0.0
+        for q in (50, 95, 99)
+    }
+
+
+def summarize(timings):
+    """Return median and p95 of ``timings`` as a short string"""
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f'median {statistics.median(ordered):8.2f} ms   p95 {p95:8.2f} ms'
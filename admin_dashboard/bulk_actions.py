@@ -0,0 +1,62 @@
+"""Set based product actions.
+
+Every update is a single UPDATE over the selected products, so changing
+thousands of rows costs one statement and cannot lose concurrent edits the
+way a load-modify-save loop does. Deletes go through ``QuerySet.delete()`` so
+order lines are detached and every product sends ``post_delete``.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Product
+from .signals import products_bulk_changed
+
+ACTION_CHOICES = [
+    ('activate', 'Activate'),
+    ('deactivate', 'Deactivate'),
+    ('set_status', 'Set status'),
+    ('set_category', 'Change category'),
+    ('adjust_stock', 'Adjust stock'),
+    ('delete', 'Delete'),
+]
+
+# Actions that need a value, and the form field holding it
+ACTION_VALUE_FIELDS = {
+    'set_status': 'status',
+    'set_category': 'category',
+    'adjust_stock': 'stock_delta',
+}
+
+
+def _updates(action, value):
+    if action == 'activate':
+        return {'is_active': True}
+    if action == 'deactivate':
+        return {'is_active': False}
+    if action == 'set_status':
+        return {'status': value}
+    if action == 'set_category':
+        return {'category_id': value}
+    if action == 'adjust_stock':
+        # Stock never goes below zero, matching ProductForm's validation
+        return {'stock_quantity': Greatest(F('stock_quantity') + value, Value(0))}
+    raise ValueError(f'Unknown bulk action: {action}')
+
+
+def apply_bulk_action(products, action, value=None):
+    """Apply ``action`` to ``products`` in one statement and return the rows affected"""
+    # Narrow by primary key so search joins and ordering never reach the write.
+    selected = Product.objects.filter(pk__in=products.order_by().values('pk'))
+
+    with transaction.atomic():
+        if action == 'delete':
+            # The per-row post_delete receivers keep the derived data in step.
+            _, deleted = selected.delete()
+            return deleted.get(Product._meta.label, 0)
+        affected = selected.update(updated_at=timezone.now(), **_updates(action, value))
+
+    if affected:
+        products_bulk_changed.send(sender=Product, action=action)
+    return affected
@@ -0,0 +1,162 @@
+"""Product categories: the cached category tree and its product counts.
+
+Every category, with its children and product counts, is loaded with one
+query into a ``CategoryTree`` kept in process memory. Filters, navigation
+menus and facet labels resolve slugs, names and descendants from it without
+touching the database. ``invalidate()`` drops it after category writes and
+product moves, and it is rebuilt after ``CATEGORY_TREE_MAX_AGE`` seconds to
+pick up other processes' writes.
+
+``Category.product_count`` counts the products filed directly under a
+category. Product saves and deletes move it by one with an ``F()`` update
+(see ``signals.py``) and set based writes recount every category with a
+single ``UPDATE``.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .models import Category, Product
+
+# Created by migration 0009 and by the sample data generators
+DEFAULT_CATEGORIES = [
+    'Dairy, Bread & Eggs',
+    'Snacks & Munchies',
+    'Fruits & Vegetables',
+    'Bakery & Biscuits',
+    'Instant Food',
+    'Tea, Coffee & Drinks',
+    'Atta, Rice & Dal',
+    'Masala, Oil & More',
+    'Sweet Tooth',
+    'Frozen Veg',
+    'Frozen Non-Veg',
+]
+
+
+@dataclass
+class CategoryNode:
+    """One category in the tree"""
+    id: int
+    name: str
+    slug: str
+    parent_id: int
+    product_count: int
+    children: list = field(default_factory=list)
+    # Products in this category and all of its descendants
+    total_count: int = 0
+
+    def __str__(self):
+        return self.name
+
+    def descendant_ids(self):
+        """This category's id followed by the ids of everything below it"""
+        ids = [self.id]
+        for child in self.children:
+            ids.extend(child.descendant_ids())
+        return ids
+
+
+class CategoryTree:
+    """Categories indexed by id, slug and name, with the roots in display order"""
+
+    def __init__(self, rows):
+        """Build the tree from ``(id, name, slug, parent_id, product_count)`` rows in display order"""
+        self.by_id = {row[0]: CategoryNode(*row) for row in rows}
+        self.roots = []
+        for node in self.by_id.values():
+            parent = self.by_id.get(node.parent_id)
+            (parent.children if parent else self.roots).append(node)
+        self.by_slug = {node.slug: node for node in self.by_id.values()}
+        self.by_name = {node.name: node for node in self.by_id.values()}
+        for root in self.roots:
+            self._total(root)
+
+    def _total(self, node):
+        node.total_count = node.product_count + sum(self._total(child) for child in node.children)
+        return node.total_count
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        """Yield ``(node, depth)`` depth first"""
+        stack = [(root, 0) for root in reversed(self.roots)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            stack.extend((child, depth + 1) for child in reversed(node.children))
+
+    def name(self, category_id):
+        node = self.by_id.get(category_id)
+        return node.name if node else ''
+
+    def choices(self, key='id'):
+        """``(id or slug, indented name)`` pairs for a select box"""
+        return [(getattr(node, key), '— ' * depth + node.name) for node, depth in self]
+
+    def rollup(self, counts):
+        """Turn ``{category id: count}`` into ``{slug: count}`` including each category's descendants"""
+        totals = {node.slug: sum(counts.get(pk, 0) for pk in node.descendant_ids()) for node, _ in self}
+        return {slug: count for slug, count in totals.items() if count}
+
+
+_state = {'tree': None, 'built': None}
+_lock = threading.Lock()
+
+
+def tree():
+    """Return the cached category tree, loading it on first use"""
+    max_age = getattr(settings, 'CATEGORY_TREE_MAX_AGE', 60)
+    with _lock:
+        if _state['tree'] is None or time.monotonic() - _state['built'] > max_age:
+            rows = Category.objects.values_list('pk', 'name', 'slug', 'parent_id', 'product_count')
+            _state.update(tree=CategoryTree(list(rows)), built=time.monotonic())
+        return _state['tree']
+
+
+def invalidate():
+    """Reload the tree on the next lookup"""
+    with _lock:
+        _state['tree'] = None
+
+
+def product_moved(old_id, new_id):
+    """Move one product's count from category ``old_id`` to ``new_id``; either may be None"""
+    if old_id == new_id:
+        return
+    if old_id:
+        # Floored at zero: rows written without signals are only counted by recount()
+        Category.objects.filter(pk=old_id, product_count__gt=0).update(product_count=F('product_count') - 1)
+    if new_id:
+        Category.objects.filter(pk=new_id).update(product_count=F('product_count') + 1)
+    invalidate()
+
+
+def recount():
+    """Recount every category's products in one set based UPDATE"""
+    counts = (
+        Product.objects.filter(category=OuterRef('pk')).order_by()
+        .values('category').annotate(count=Count('pk')).values('count')
+    )
+    Category.objects.update(product_count=Coalesce(Subquery(counts), 0))
+    invalidate()
+
+
+def ensure_defaults():
+    """Create any missing default category and return a freshly loaded tree"""
+    existing = set(Category.objects.values_list('name', flat=True))
+    Category.objects.bulk_create(
+        [
+            Category(name=name, slug=slugify(name), position=position)
+            for position, name in enumerate(DEFAULT_CATEGORIES) if name not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    invalidate()
+    return tree()
@@ -0,0 +1,40 @@
+"""Run a view's independent ORM queries side by side under ASGI.
+
+Django's async ORM methods (``acount()``, ``aaggregate()``, ``async for``) hand
+their work to the one thread that owns the request's connection, so awaiting
+several of them together still runs them back to back. ``run_queries`` gives
+each query a worker thread with its own database connection instead, which
+lets the database serve them at the same time.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def _on_own_connection(query):
+    def run():
+        try:
+            return query()
+        finally:
+            # Worker threads never see request_finished; apply CONN_MAX_AGE here.
+            close_old_connections()
+    return run
+
+
+def run_queries_sync(queries):
+    """Run ``{name: callable}`` one after the other and return ``{name: result}``"""
+    return {name: query() for name, query in queries.items()}
+
+
+async def run_queries(queries):
+    """Run ``{name: callable}`` concurrently and return ``{name: result}``"""
+    if len(queries) < 2 or not getattr(settings, 'CONCURRENT_VIEW_QUERIES', True):
+        return await sync_to_async(run_queries_sync)(queries)
+
+    results = await asyncio.gather(*(
+        sync_to_async(_on_own_connection(query), thread_sensitive=False)()
+        for query in queries.values()
+    ))
+    return dict(zip(queries, results))
@@ -0,0 +1,56 @@
+"""Facet counts for the product list's category and status filters.
+
+One ``GROUP BY category_id, status`` over the products matching the search
+yields a small grid of counts (at most categories x statuses rows). Both
+facets are derived from it: the category counts honour the status filter and
+the status counts honour the category filter, so each dropdown shows what
+choosing an option would return; a parent category also counts its
+descendants' products (``CategoryTree.rollup``). The grid is cached per
+search text under the catalog generation of ``result_cache``, so any product
+write refreshes it and changing the dropdowns never queries again.
+"""
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from ecommerce.instrumentation import record_cache
+
+from .result_cache import generation, normalize
+
+METRIC_NAME = 'product_facets'
+
+
+def facet_grid(queryset, search=None):
+    """Return ``[(category id, status, count)]`` for ``queryset``, the products matching ``search``"""
+    digest = hashlib.md5(repr(normalize({'search': search})).encode()).hexdigest()
+    key = f'product_facets:{generation()}:{digest}'
+    grid = cache.get(key)
+    record_cache(METRIC_NAME, grid is not None)
+    if grid is None:
+        grid = list(
+            queryset.order_by().values_list('category_id', 'status').annotate(count=Count('pk'))
+        )
+        cache.set(key, grid, getattr(settings, 'PRODUCT_RESULT_CACHE_TIMEOUT', 300))
+    return grid
+
+
+def facet_counts(grid, status=None, category_ids=None):
+    """Return the ``(counts by category id, counts by status)`` for the other filter's selection"""
+    categories, statuses = Counter(), Counter()
+    for category_id, row_status, count in grid:
+        if not status or row_status == status:
+            categories[category_id] += count
+        if not category_ids or category_id in category_ids:
+            statuses[row_status] += count
+    return categories, statuses
+
+
+def label_choices(field, counts, total):
+    """Append each option's count, and ``total`` for the empty option, to the labels of the choice ``field``"""
+    field.choices = [
+        (value, f'{label} ({counts.get(value, 0) if value else total})')
+        for value, label in field.choices
+    ]
@@ -1,5 +1,31 @@
 from django import forms
 from .models import Product
+from .categories import tree
+from .bulk_actions import ACTION_CHOICES, ACTION_VALUE_FIELDS
+from .images import schedule_derivatives
+
+
+def validate_price(price):
+    """Validate price is positive"""
+    if price is not None and price <= 0:
+        raise forms.ValidationError("Price must be greater than 0.")
+    return price
+
+
+def validate_stock_quantity(stock_quantity):
+    """Validate stock quantity is non-negative"""
+    if stock_quantity is not None and stock_quantity < 0:
+        raise forms.ValidationError("Stock quantity cannot be negative.")
+    return stock_quantity
+
+
+def validate_product_name(name):
+    """Strip the product name and validate its length"""
+    if name:
+        name = name.strip()
+        if len(name) < 2:
+            raise forms.ValidationError("Product name must be at least 2 characters long.")
+    return name
 
 
 class ProductForm(forms.ModelForm):
@@ -7,8 +33,12 @@ class ProductForm(forms.ModelForm):
     
     class Meta:
         model = Product
-        fields = ['name', 'description', 'price', 'category', 'stock_quantity', 'image', 'status']
+        fields = ['name', 'sku', 'description', 'price', 'category', 'stock_quantity', 'image', 'status']
         widgets = {
+            'sku': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Supplier SKU (optional)'
+            }),
             'name': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Product Name',
@@ -46,29 +76,30 @@ class ProductForm(forms.ModelForm):
                 'required': True
             }),
         }
-        
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Options come from the cached tree rather than a query per render
+        self.fields['category'].choices = [('', 'Select category')] + tree().choices()
+
+    def save(self, commit=True):
+        """Save the product and queue derivatives for a newly uploaded image"""
+        product = super().save(commit=commit)
+        if commit and 'image' in self.changed_data:
+            schedule_derivatives(product)
+        return product
+
     def clean_price(self):
         """Validate price is positive"""
-        price = self.cleaned_data.get('price')
-        if price is not None and price <= 0:
-            raise forms.ValidationError("Price must be greater than 0.")
-        return price
+        return validate_price(self.cleaned_data.get('price'))
     
     def clean_stock_quantity(self):
         """Validate stock quantity is non-negative"""
-        stock_quantity = self.cleaned_data.get('stock_quantity')
-        if stock_quantity is not None and stock_quantity < 0:
-            raise forms.ValidationError("Stock quantity cannot be negative.")
-        return stock_quantity
+        return validate_stock_quantity(self.cleaned_data.get('stock_quantity'))
     
     def clean_name(self):
         """Validate product name"""
-        name = self.cleaned_data.get('name')
-        if name:
-            name = name.strip()
-            if len(name) < 2:
-                raise forms.ValidationError("Product name must be at least 2 characters long.")
-        return name
+        return validate_product_name(self.cleaned_data.get('name'))
 
 
 class ProductSearchForm(forms.Form):
@@ -92,10 +123,136 @@ class ProductSearchForm(forms.Form):
         })
     )
     
+    # Filtered by slug; the cached tree turns it into category ids
     category = forms.ChoiceField(
-        choices=[('', 'All Categories')] + Product.CATEGORY_CHOICES,
+        choices=lambda: [('', 'All Categories')] + tree().choices('slug'),
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
+    )
+
+
+class CustomerSearchForm(forms.Form):
+    """Form for searching and filtering customers"""
+
+    search = forms.CharField(
+        max_length=200,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Search Customers',
+            'aria-label': 'Search'
+        })
+    )
+
+    joined_from = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={
+            'class': 'form-control',
+            'type': 'date',
+            'aria-label': 'Joined from'
+        })
+    )
+
+    joined_to = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={
+            'class': 'form-control',
+            'type': 'date',
+            'aria-label': 'Joined to'
+        })
+    )
+
+
+class ProductImportForm(forms.Form):
+    """Form for uploading a product feed"""
+
+    FORMAT_CHOICES = [
+        ('', 'Detect from file name'),
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ]
+
+    file = forms.FileField(
+        widget=forms.FileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.jsonl,.ndjson'
+        })
+    )
+
+    format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
+    )
+
+
+class ProductBulkActionForm(forms.Form):
+    """Form for applying one action to many products"""
+
+    action = forms.ChoiceField(
+        choices=[('', 'Bulk action')] + ACTION_CHOICES,
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
+    )
+
+    ids = forms.Field(
+        required=False,
+        widget=forms.MultipleHiddenInput
+    )
+
+    select_all = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input'
+        })
+    )
+
+    status = forms.ChoiceField(
+        choices=[('', 'New status')] + Product.STATUS_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        })
+    )
+
+    category = forms.TypedChoiceField(
+        choices=lambda: [('', 'New category')] + tree().choices(),
+        coerce=int,
+        empty_value=None,
         required=False,
         widget=forms.Select(attrs={
             'class': 'form-select'
         })
     )
+
+    stock_delta = forms.IntegerField(
+        required=False,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': '+/- stock'
+        })
+    )
+
+    def clean_ids(self):
+        """Validate the selected product IDs are integers"""
+        ids = self.cleaned_data.get('ids') or []
+        try:
+            return [int(pk) for pk in ids]
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Product IDs must be whole numbers.")
+
+    def clean(self):
+        """Validate a selection and the value the action needs"""
+        cleaned_data = super().clean()
+        if not cleaned_data.get('ids') and not cleaned_data.get('select_all'):
+            raise forms.ValidationError("Select at least one product.")
+
+        value_field = ACTION_VALUE_FIELDS.get(cleaned_data.get('action'))
+        if value_field and cleaned_data.get(value_field) in (None, ''):
+            self.add_error(value_field, "This action needs a value.")
+        return cleaned_data
@@ -0,0 +1,92 @@
+"""Rendered product detail fragments and conditional GET helpers.
+
+A product's ``updated_at`` is its version stamp: detail fragments are cached in
+a small in-process LRU keyed by ``(page, pk, updated_at)``, and the same stamp
+yields the ETag and Last-Modified validators, so a client that already has the
+current page gets a 304 after one indexed lookup and no template rendering.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from ecommerce.page_cache import template_version
+
+from .models import Product
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered HTML fragments"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Render outside the lock; two threads racing on a miss just both render.
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def discard(self, pk):
+        """Drop every cached fragment of product ``pk``"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == pk]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+product_fragments = FragmentCache(getattr(settings, 'PRODUCT_FRAGMENT_CACHE_SIZE', 512))
+
+
+def product_version(pk, queryset=None):
+    """Return the product's ``updated_at`` without loading the row, or None"""
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.filter(pk=pk).values_list('updated_at', flat=True).first()
+
+
+def product_fragment(page, pk, updated_at, render):
+    """Return the cached fragment of ``page`` for this product version, rendering it on a miss"""
+    return product_fragments.get_or_render((page, pk, updated_at, template_version()), render)
+
+
+class ProductValidators:
+    """ETag and Last-Modified for one version of a product page"""
+
+    def __init__(self, page, pk, updated_at, *vary):
+        stamp = ':'.join(str(part) for part in (page, pk, updated_at.isoformat(), template_version(), *vary))
+        self.etag = f'"{hashlib.md5(stamp.encode()).hexdigest()}"'
+        self.last_modified = int(updated_at.timestamp())
+
+    def not_modified(self, request):
+        """Return a 304 response if the client's copy is current, else None"""
+        return get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+
+    def apply(self, response, cache_control):
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        response['Cache-Control'] = cache_control
+        return response
@@ -0,0 +1,197 @@
+"""Typo-tolerant product search: trigram matching over the search vocabulary.
+
+Misspelt words ("brocoli", "yoghurt") are matched against the distinct words
+of product names, descriptions and categories rather than against products,
+so the cost depends on the vocabulary size, not the catalog size. Each word
+is split into padded trigrams (``"  b", " br", "bro", ...``) and an inverted
+index maps every trigram to the words containing it. Candidates sharing
+trigrams with the query word are ranked by their trigram similarity
+(shared / union, as in PostgreSQL's ``pg_trgm``) and then by how many
+products use them.
+
+The vocabulary comes from the search backend (``fts5vocab`` over the FTS
+index on SQLite). Product saves and deletes apply the change in their words
+in place, set based writes mark the index stale, and it is rebuilt after
+``PRODUCT_FUZZY_MAX_AGE`` seconds to pick up other processes' writes.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .search import TOKEN_RE, get_search_backend
+
+# Words shorter than this, and numbers, are never corrected
+MIN_WORD_LENGTH = 3
+SIMILARITY_THRESHOLD = 0.3
+
+# The product fields whose words are indexed in place; category names are
+# indexed when loaded, and renames rebuild the index
+TEXT_FIELDS = ('name', 'description')
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def _correctable(token):
+    return len(token) >= MIN_WORD_LENGTH and not token.isdigit()
+
+
+def search_text(product):
+    """Return the indexed field values of ``product``, or None if one is deferred"""
+    if all(field in product.__dict__ for field in TEXT_FIELDS):
+        return tuple(str(product.__dict__[field]) for field in TEXT_FIELDS)
+    return None
+
+
+class TrigramIndex:
+    """Trigram inverted index over a vocabulary of words"""
+
+    def __init__(self):
+        self._frequency = {}  # word -> products using it
+        self._sorted = []  # for prefix checks
+        self._postings = defaultdict(set)  # trigram -> words
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._frequency)
+
+    def load(self, vocabulary):
+        """Replace the contents with ``(word, products using it)`` pairs"""
+        frequency = {}
+        postings = defaultdict(set)
+        for word, count in vocabulary:
+            frequency[word] = count
+            if _correctable(word):
+                for trigram in trigrams(word):
+                    postings[trigram].add(word)
+        with self._lock:
+            self._frequency, self._postings, self._sorted = frequency, postings, sorted(frequency)
+
+    def add(self, text):
+        """Index the words of ``text``"""
+        self.replace('', text)
+
+    def remove(self, text):
+        """Uncount the words of ``text``, dropping words no product uses any more"""
+        self.replace(text, '')
+
+    def replace(self, old, new):
+        """Move one product's count from the words of ``old`` to those of ``new``"""
+        old_words, new_words = set(TOKEN_RE.findall(old.lower())), set(TOKEN_RE.findall(new.lower()))
+        with self._lock:
+            for word in new_words - old_words:
+                if word in self._frequency:
+                    self._frequency[word] += 1
+                    continue
+                self._frequency[word] = 1
+                insort(self._sorted, word)
+                if _correctable(word):
+                    for trigram in trigrams(word):
+                        self._postings[trigram].add(word)
+            for word in old_words - new_words:
+                count = self._frequency.get(word)
+                if count is None:
+                    continue
+                if count > 1:
+                    self._frequency[word] = count - 1
+                    continue
+                del self._frequency[word]
+                del self._sorted[bisect_left(self._sorted, word)]
+                for trigram in trigrams(word):
+                    self._postings.get(trigram, set()).discard(word)
+
+    def known(self, token):
+        """Whether ``token`` is a word, or the start of one, in the vocabulary"""
+        with self._lock:
+            index = bisect_left(self._sorted, token)
+            return index < len(self._sorted) and self._sorted[index].startswith(token)
+
+    def similar(self, word, limit=5, threshold=SIMILARITY_THRESHOLD):
+        """Return ``[(candidate, similarity)]`` for the words most similar to ``word``"""
+        grams = trigrams(word)
+        shared = Counter()
+        with self._lock:
+            for trigram in grams:
+                shared.update(self._postings.get(trigram, ()))
+            scored = []
+            for candidate, count in shared.items():
+                similarity = count / (len(grams) + len(trigrams(candidate)) - count)
+                if similarity >= threshold:
+                    scored.append((similarity, self._frequency.get(candidate, 0), candidate))
+        scored.sort(reverse=True)
+        return [(candidate, similarity) for similarity, _, candidate in scored[:limit]]
+
+    def correct(self, query):
+        """Return ``query`` with unknown words replaced by their closest match, or None"""
+        tokens = TOKEN_RE.findall(query.lower())
+        corrected, changed = [], False
+        for token in tokens:
+            if _correctable(token) and not self.known(token):
+                matches = self.similar(token, limit=1)
+                if matches:
+                    token, changed = matches[0][0], True
+            corrected.append(token)
+        return ' '.join(corrected) if changed else None
+
+
+class FuzzyMatcher:
+    """The process-wide trigram index over the search vocabulary, built on first use"""
+
+    def __init__(self):
+        self._index = None
+        self._built = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        max_age = getattr(settings, 'PRODUCT_FUZZY_MAX_AGE', 300)
+        with self._lock:
+            if self._index is None or time.monotonic() - self._built > max_age:
+                index = TrigramIndex()
+                index.load(get_search_backend().vocabulary())
+                self._index, self._built = index, time.monotonic()
+            return self._index
+
+    def correct(self, query):
+        return self.index().correct(query)
+
+    def similar(self, word, limit=5):
+        return self.index().similar(word.lower(), limit)
+
+    def product_saved(self, product, previous):
+        """Apply the change in a saved product's words to a built index
+
+        ``previous`` is the product's ``search_text`` as loaded, ``()`` for a
+        new product.
+        """
+        index = self._index
+        if index is None:
+            return
+        current = search_text(product)
+        if previous is None or current is None:
+            self.invalidate()
+        elif current != previous:
+            index.replace(' '.join(previous), ' '.join(current))
+
+    def product_deleted(self, product):
+        """Uncount a deleted product's words in a built index"""
+        index = self._index
+        if index is None:
+            return
+        text = search_text(product)
+        if text is None:
+            self.invalidate()
+        else:
+            index.remove(' '.join(text))
+
+    def invalidate(self):
+        """Rebuild on the next lookup"""
+        with self._lock:
+            self._index = None
+
+
+fuzzy_matcher = FuzzyMatcher()
@@ -0,0 +1,135 @@
+"""Product image derivatives.
+
+When a product image is uploaded, resized copies in the original raster
+format and in WebP are rendered by a small worker pool once the upload has
+been committed, so the request that saved the form never waits on Pillow.
+The derivatives are recorded in ``Product.image_variants`` and turned into a
+``srcset`` by the ``product_picture`` template tag.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from ecommerce import page_cache
+from homepage import catalog
+
+from .fragments import product_fragments
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (160, 320, 640, 1024)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2),
+                thread_name_prefix='product-images',
+            )
+        return _executor
+
+
+def schedule_derivatives(product):
+    """Render derivatives for the product's current image after the transaction commits"""
+    if not product.image:
+        return
+    pk, name = product.pk, product.image.name
+
+    def submit():
+        if getattr(settings, 'PRODUCT_IMAGE_ASYNC', True):
+            _get_executor().submit(_run_in_worker, pk, name)
+        else:
+            build_derivatives(pk, name)
+
+    transaction.on_commit(submit)
+
+
+def _run_in_worker(pk, name):
+    close_old_connections()
+    try:
+        build_derivatives(pk, name)
+    except Exception:
+        logger.exception('Could not build image derivatives for product %s', pk)
+    finally:
+        # Worker threads keep their own connections; don't leak them between tasks.
+        close_old_connections()
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif image_format == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def build_derivatives(pk, name):
+    """Render and record the derivatives of image ``name`` for product ``pk``"""
+    with default_storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+
+    fallback_format, fallback_ext = ('PNG', 'png') if _has_alpha(image) else ('JPEG', 'jpg')
+    widths = [width for width in DERIVATIVE_WIDTHS if width < image.width] or [image.width]
+    stem = os.path.splitext(os.path.basename(name))[0]
+
+    variants = {'source': name, 'fallback': {}, 'webp': {}}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for key, image_format, ext in (('fallback', fallback_format, fallback_ext), ('webp', 'WEBP', 'webp')):
+            path = f'products/derivatives/{pk}/{stem}-{width}w.{ext}'
+            variants[key][str(width)] = default_storage.save(path, ContentFile(_encode(resized, image_format)))
+
+    previous = Product.objects.filter(pk=pk).values_list('image_variants', flat=True).first()
+    # Only record the result if the product still points at the image we rendered.
+    updated = Product.objects.filter(pk=pk, image=name).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    _delete_files(previous if updated else variants)
+    if updated:
+        # The UPDATE sends no post_save: drop the cached fragment, storefront
+        # blocks and pages still serving the picture without its derivatives.
+        product_fragments.discard(pk)
+        catalog.refresh()
+        page_cache.invalidate()
+    return variants if updated else None
+
+
+def _delete_files(variants):
+    for key in ('fallback', 'webp'):
+        for path in ((variants or {}).get(key) or {}).values():
+            default_storage.delete(path)
+
+
+def current_variants(product):
+    """Return the recorded derivatives if they belong to the product's current image"""
+    variants = product.image_variants
+    if product.image and variants and variants.get('source') == product.image.name:
+        return variants
+    return None
@@ -0,0 +1,212 @@
+"""Bulk product import from CSV or JSON Lines feeds.
+
+The feed is read as a stream and handled a batch at a time: each batch is
+validated with the same rules as ``ProductForm`` and the valid rows are
+upserted on ``sku`` with one ``bulk_create(update_conflicts=True)`` inside
+their own transaction. Rows without a SKU are always inserted.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django import forms
+from django.db import transaction
+
+from .forms import validate_price, validate_stock_quantity, validate_product_name
+from .categories import tree
+from .models import Product
+from .signals import products_bulk_changed
+
+IMPORT_BATCH_SIZE = 2000
+
+UPDATE_FIELDS = ['name', 'description', 'price', 'category', 'stock_quantity', 'status', 'updated_at']
+
+STATUSES = {value for value, _ in Product.STATUS_CHOICES}
+
+# Product.price is DecimalField(max_digits=10, decimal_places=2)
+MAX_PRICE = Decimal('100000000')
+
+
+class FeedError(Exception):
+    """The feed could not be read as UTF-8 text in its format"""
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        # What was imported before the unreadable part
+        self.result = result
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import run"""
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)  # (line number, {field: message})
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+
+def read_rows(stream, file_format):
+    """Yield ``(line_number, row dict)`` pairs from a text stream"""
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def detect_format(filename):
+    """Guess the feed format from its file name"""
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def build_product(row):
+    """Validate one feed row and return ``(product, errors)``"""
+    if row is None:
+        return None, {'row': 'Could not parse this line.'}
+
+    errors = {}
+    values = {}
+
+    def check(name, func):
+        try:
+            values[name] = func()
+        except forms.ValidationError as error:
+            errors[name] = ' '.join(error.messages)
+
+    def parse_price():
+        try:
+            price = Decimal(_text(row, 'price'))
+        except InvalidOperation:
+            raise forms.ValidationError('Enter a number.')
+        if not price.is_finite() or price.as_tuple().exponent < -2:
+            raise forms.ValidationError('Enter a price with at most 2 decimal places.')
+        if price >= MAX_PRICE:
+            raise forms.ValidationError('Ensure that there are no more than 10 digits in total.')
+        return validate_price(price)
+
+    def parse_stock():
+        raw = _text(row, 'stock_quantity') or '0'
+        try:
+            stock = int(raw)
+        except ValueError:
+            raise forms.ValidationError('Enter a whole number.')
+        return validate_stock_quantity(stock)
+
+    def required(name, max_length=None):
+        value = _text(row, name)
+        if not value:
+            raise forms.ValidationError('This field is required.')
+        if max_length and len(value) > max_length:
+            raise forms.ValidationError(f'Ensure this value has at most {max_length} characters.')
+        return value
+
+    def choice(name, allowed, default=None):
+        value = _text(row, name) or default
+        if value not in allowed:
+            raise forms.ValidationError(f'Select a valid choice. {value!r} is not one of the available choices.')
+        return value
+
+    check('name', lambda: validate_product_name(required('name', max_length=200)))
+    check('description', lambda: required('description'))
+    check('price', parse_price)
+    check('stock_quantity', parse_stock)
+    # Feeds name the category; the cached tree turns the name into its id
+    check('category', lambda: tree().by_name[choice('category', tree().by_name)].id)
+    check('status', lambda: choice('status', STATUSES, default='active'))
+
+    sku = _text(row, 'sku') or None
+    if sku and len(sku) > 64:
+        errors['sku'] = 'Ensure this value has at most 64 characters.'
+    if errors:
+        return None, errors
+    values['category_id'] = values.pop('category')
+    return Product(sku=sku, **values), None
+
+
+class ProductImporter:
+    """Validate and upsert products from a feed in batches"""
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+
+    def run(self, stream, file_format='csv'):
+        result = ImportResult()
+        rows = read_rows(stream, file_format)
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch, result)
+        except UnicodeDecodeError as error:
+            raise FeedError(f'The file is not UTF-8 encoded ({error.reason}); save it as UTF-8 and retry.', result)
+        except csv.Error as error:
+            raise FeedError(f'The file is not valid CSV: {error}.', result)
+        finally:
+            # Batches before an unreadable part are already committed
+            if result.imported and not self.dry_run:
+                products_bulk_changed.send(sender=Product)
+        return result
+
+    def run_file(self, path, file_format=None):
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            return self.run(stream, file_format or detect_format(path))
+
+    def run_upload(self, upload, file_format=None):
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            return self.run(stream, file_format or detect_format(upload.name))
+        finally:
+            stream.detach()
+
+    def _import_batch(self, batch, result):
+        by_sku = {}
+        unkeyed = []
+        for line_number, row in batch:
+            product, errors = build_product(row)
+            if errors:
+                result.errors.append((line_number, errors))
+            elif product.sku:
+                # A later row for the same SKU wins, as it would in sequence.
+                by_sku[product.sku] = product
+            else:
+                unkeyed.append(product)
+
+        existing = set(
+            Product.objects.filter(sku__in=list(by_sku)).values_list('sku', flat=True)
+        ) if by_sku else set()
+        result.updated += len(existing)
+        result.created += len(by_sku) - len(existing) + len(unkeyed)
+
+        if self.dry_run:
+            return
+        with transaction.atomic():
+            if by_sku:
+                Product.objects.bulk_create(
+                    by_sku.values(),
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=UPDATE_FIELDS,
+                )
+            if unkeyed:
+                Product.objects.bulk_create(unkeyed)
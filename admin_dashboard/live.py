@@ -0,0 +1,105 @@
+"""Live dashboard KPIs for the JSON endpoint and the Server-Sent Events stream.
+
+``current_kpis()`` keeps the latest snapshot in the default cache for one
+``DASHBOARD_KPI_INTERVAL``, so any number of pollers share one set of queries
+per interval. Under ASGI a single ``KPIBroadcaster`` task per event loop reads
+that snapshot once per tick and fans it out to every connected stream; a
+stream only receives an event when the figures change, with a keep-alive
+comment in between.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import rollups
+
+logger = logging.getLogger(__name__)
+
+KPIS_KEY = 'dashboard:kpis'
+
+
+def interval():
+    return getattr(settings, 'DASHBOARD_KPI_INTERVAL', 5)
+
+
+def current_kpis():
+    """Return the dashboard KPIs, recomputing them at most once per interval"""
+    kpis = cache.get(KPIS_KEY)
+    if kpis is None:
+        snapshot = rollups.snapshot()
+        kpis = {
+            'monthly_earnings': snapshot['monthly_earnings'],
+            'total_customers': snapshot['total_customers'],
+            'new_customers_2_days': snapshot['new_customers_2_days'],
+            'total_products': snapshot['total_products'],
+        }
+        # Round-trip once so cached and streamed values are plain JSON types.
+        kpis = json.loads(json.dumps(kpis, cls=DjangoJSONEncoder))
+        cache.set(KPIS_KEY, kpis, interval())
+    return kpis
+
+
+def sse_event(data, event='kpis'):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class KPIBroadcaster:
+    """Compute the KPIs once per tick and hand them to every subscriber"""
+
+    def __init__(self, fetch=current_kpis):
+        self.fetch = fetch
+        self._subscribers = set()
+        self._task = None
+        self._latest = None
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    async def subscribe(self):
+        """Yield an SSE message per tick: the KPIs when they change, else a keep-alive"""
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        self._ensure_producer()
+        try:
+            yield f'retry: {int(interval() * 1000)}\n\n'
+            sent = None
+            if self._latest is not None:
+                sent = self._latest
+                yield sse_event(sent)
+            while True:
+                kpis = await queue.get()
+                if kpis == sent:
+                    yield ': keep-alive\n\n'
+                else:
+                    sent = kpis
+                    yield sse_event(kpis)
+        finally:
+            self._subscribers.discard(queue)
+
+    def _ensure_producer(self):
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._produce())
+
+    async def _produce(self):
+        while self._subscribers:
+            try:
+                self._latest = await sync_to_async(self.fetch)()
+            except Exception:
+                # Keep the previous figures; the next tick retries.
+                logger.exception('Could not compute dashboard KPIs')
+            else:
+                for queue in list(self._subscribers):
+                    if queue.full():
+                        queue.get_nowait()  # a slow client only needs the newest figures
+                    queue.put_nowait(self._latest)
+            await asyncio.sleep(interval())
+
+
+broadcaster = KPIBroadcaster()
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from admin_dashboard import rollups
+from admin_dashboard.benchmarking import scratch_database, simulate_latency, summarize
+from admin_dashboard.sample_data import seed_customers, seed_products
+
+ROUTES = [
+    '/dashboard/',
+    '/dashboard/products/',
+    '/dashboard/products/?status=active',
+    '/dashboard/customers/?search=smith',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare dashboard listing latency under the WSGI (sync) and ASGI (async) handlers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000, help='Catalog size to generate')
+        parser.add_argument('--customers', type=int, default=5000, help='Customers to generate')
+        parser.add_argument('--latency-ms', type=float, default=5.0, help='Simulated delay per database query')
+        parser.add_argument('--repeat', type=int, default=30, help='Sequential requests per route')
+        parser.add_argument('--concurrency', type=int, default=8, help='Clients in the throughput run')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], help='Run one handler (used internally)')
+
+    def handle(self, *args, **options):
+        if options['server']:
+            return self.run_server(options)
+
+        # The URLconf picks sync or async views at import time, so each
+        # handler gets a fresh process.
+        for server in ('wsgi', 'asgi'):
+            env = {**os.environ, 'DJANGO_ASYNC_VIEWS': '1' if server == 'asgi' else '0'}
+            command = [sys.executable, sys.argv[0], 'benchmark_async_views', '--server', server]
+            for option in ('products', 'customers', 'latency_ms', 'repeat', 'concurrency'):
+                command += [f"--{option.replace('_', '-')}", str(options[option])]
+            self.stdout.write(f'\n== {server.upper()} ==')
+            self.stdout.flush()
+            subprocess.run(command, env=env, check=True)
+
+    def run_server(self, options):
+        server = options['server']
+        if (server == 'asgi') != settings.ASYNC_VIEWS:
+            self.stderr.write('DJANGO_ASYNC_VIEWS does not match --server')
+            return
+
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['*']):
+            self.stdout.write(f"Seeding {options['products']} products and {options['customers']} customers...")
+            seed_products(options['products'])
+            seed_customers(options['customers'])
+            rollups.rebuild()
+            user = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+            simulate_latency(options['latency_ms'])
+
+            run = self.run_asgi if server == 'asgi' else self.run_wsgi
+            run(user, options['repeat'], options['concurrency'])
+
+    def report(self, route, timings, wall, requests):
+        self.stdout.write(f'  {route:<42} {summarize(timings)}   {requests / wall:7.1f} req/s concurrent')
+
+    def run_wsgi(self, user, repeat, concurrency):
+        clients = []
+        for _ in range(concurrency):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+
+        def timed_get(client, route):
+            started = time.perf_counter()
+            client.get(route)
+            return (time.perf_counter() - started) * 1000
+
+        for route in ROUTES:
+            timings = [timed_get(clients[0], route) for _ in range(repeat)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(lambda index: timed_get(clients[index % concurrency], route), range(repeat)))
+            self.report(route, timings, time.perf_counter() - started, repeat)
+
+    def run_asgi(self, user, repeat, concurrency):
+        async def main():
+            client = AsyncClient()
+            await client.aforce_login(user)
+
+            async def timed_get(route):
+                started = time.perf_counter()
+                await client.get(route)
+                return (time.perf_counter() - started) * 1000
+
+            for route in ROUTES:
+                timings = [await timed_get(route) for _ in range(repeat)]
+                limit = asyncio.Semaphore(concurrency)
+
+                async def limited():
+                    async with limit:
+                        await timed_get(route)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(limited() for _ in range(repeat)))
+                self.report(route, timings, time.perf_counter() - started, repeat)
+
+        asyncio.run(main())
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_dashboard.benchmarking import measure, scratch_database, summarize
+from admin_dashboard.fuzzy import TrigramIndex
+from admin_dashboard.models import Product
+from admin_dashboard.sample_data import seed_products
+from admin_dashboard.search import TOKEN_RE, get_search_backend
+
+
+def edit_distance(a, b):
+    """Levenshtein distance between ``a`` and ``b``"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return min(previous[-1], len(a) + len(b))
+
+
+class Command(BaseCommand):
+    help = 'Compare trigram spelling correction with an edit distance scan of every product name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000000, help='Catalog size to generate')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument('--page-size', type=int, default=10, help='Rows fetched per query')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the catalog')
+        parser.add_argument(
+            '--naive-limit', type=int, default=20000,
+            help='Rows the edit distance scan visits; its time is extrapolated to the full catalog'
+        )
+        parser.add_argument(
+            '--queries', nargs='+', default=['brocoli', 'yoghurt', 'choclate', 'orgnic milk', 'xyzzy'],
+            help='Misspelt search strings to time'
+        )
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        backend = get_search_backend()
+
+        with scratch_database():
+            self.stdout.write(f"Seeding {options['products']} products...")
+            seed_products(options['products'], seed=options['seed'])
+
+            started = time.perf_counter()
+            index = TrigramIndex()
+            index.load(backend.vocabulary())
+            self.stdout.write(
+                f'Trigram index over {len(index)} words built in {(time.perf_counter() - started) * 1000:.1f}ms'
+            )
+            names = list(Product.objects.values_list('name', flat=True)[:options['naive_limit']])
+            scale = options['products'] / max(len(names), 1)
+
+            for query in options['queries']:
+                corrected = index.correct(query)
+                queryset = backend.filter(Product.objects.order_by('-created_at'), corrected or query)
+
+                def fuzzy():
+                    corrected = index.correct(query)
+                    list(backend.filter(Product.objects.order_by('-created_at'), corrected or query)[:page_size])
+
+                def naive():
+                    words = TOKEN_RE.findall(query.lower())
+                    matches = []
+                    for name in names:
+                        tokens = TOKEN_RE.findall(name.lower())
+                        if all(any(edit_distance(word, token) <= 2 for token in tokens) for word in words):
+                            matches.append(name)
+                    return matches[:page_size]
+
+                self.stdout.write(f'\nQuery: {query!r} -> {corrected!r}, matches {queryset.count()}')
+                self.stdout.write(f"  {'trigram':<14} {summarize(measure(fuzzy, options['repeat']))}")
+                # Ranking by distance means visiting every row, so the time scales with the catalog
+                timings = measure(naive, 1)
+                self.stdout.write(
+                    f"  {'edit distance':<14} {timings[0]:.1f}ms over {len(names)} rows, "
+                    f"~{timings[0] * scale / 1000:.1f}s extrapolated to {options['products']}"
+                )
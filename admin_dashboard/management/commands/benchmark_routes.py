@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import URLResolver, get_resolver
+from django.urls.resolvers import RoutePattern
+
+from admin_dashboard.benchmarking import percentiles, scratch_database
+from admin_dashboard.models import Product
+from admin_dashboard.sample_data import category_ids, fake_product, seed_customers, seed_products, seed_stats
+from admin_dashboard.signals import products_bulk_changed
+
+# Routes whose integer argument is a product id
+PRODUCT_ROUTES = {
+    'storefront_product_detail', 'product_detail', 'edit_product', 'delete_product', 'toggle_product_status',
+}
+# Logging out would end the benchmark session
+SKIPPED_ROUTES = {'logout'}
+# Requests beyond the plain GET of every route: (method, route name, query string, form data)
+EXTRA_CASES = [
+    ('GET', 'products_list', '?search=organic', None),
+    ('GET', 'products_list', '?status=active&category=snacks-munchies', None),
+    ('GET', 'products_list', '?page=50', None),
+    ('GET', 'customers_list', '?search=smith', None),
+    ('GET', 'product_list', '?category=snacks-munchies', None),
+    ('POST', 'create_product', '', 'product'),
+    ('POST', 'edit_product', '', 'product'),
+    ('POST', 'delete_product', '', None),
+    ('POST', 'bulk_product_action', '', 'bulk'),
+]
+# Routes that only answer POST meaningfully
+POST_ONLY = {'toggle_product_status', 'bulk_product_action'}
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+@dataclass
+class Case:
+    """One request shape to time"""
+    label: str
+    method: str
+    path: str
+    form: str = None
+    disposable: bool = False
+
+
+def discover_routes(resolver=None, prefix=''):
+    """Yield ``(route, name)`` for every path() in the URLconf, outside the admin site"""
+    resolver = resolver or get_resolver()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == 'admin':
+                continue
+            yield from discover_routes(pattern, prefix + str(pattern.pattern))
+        elif isinstance(pattern.pattern, RoutePattern):
+            yield prefix + str(pattern.pattern), pattern.name
+
+
+def build_cases():
+    routes = {}
+    for route, name in discover_routes():
+        routes.setdefault(name or route, route)
+
+    def concrete(name, route):
+        def fill(match):
+            converter = match.group(1) or 'str'
+            if converter == 'int':
+                return '{pk}' if name in PRODUCT_ROUTES else '1'
+            return 'fresh'
+        return '/' + re.sub(r'<(?:(\w+):)?\w+>', fill, route)
+
+    cases = []
+    for name, route in routes.items():
+        if name in SKIPPED_ROUTES:
+            continue
+        method = 'POST' if name in POST_ONLY else 'GET'
+        cases.append(Case(f'{method} {name}', method, concrete(name, route)))
+    for method, name, query, form in EXTRA_CASES:
+        if name in routes:
+            cases.append(Case(
+                f'{method} {name}{query}', method, concrete(name, routes[name]) + query, form,
+                disposable=(method, name) == ('POST', 'delete_product'),
+            ))
+    return cases
+
+
+class Command(BaseCommand):
+    help = 'Drive every route in-process at fixed concurrency and report latency, throughput and queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000, help='Catalog size to generate')
+        parser.add_argument('--customers', type=int, default=2000, help='Customers to generate')
+        parser.add_argument('--days', type=int, default=30, help='Days of KPI history to generate')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the dataset and product picks')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per route')
+        parser.add_argument('--concurrency', type=int, default=4, help='Clients sending requests at once')
+        parser.add_argument('--routes', nargs='+', help='Only run routes whose label contains one of these')
+        parser.add_argument('--save', metavar='PATH', help='Write the results to this baseline JSON file')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare the results with this baseline JSON file')
+        parser.add_argument(
+            '--threshold', type=float, default=20.0, help='Percent p95 or throughput change reported as a regression'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true', help='Exit with an error when a regression is found'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as stream:
+                baseline = json.load(stream)
+
+        cases = build_cases()
+        if options['routes']:
+            cases = [case for case in cases if any(part in case.label for part in options['routes'])]
+
+        # Concurrent writers need a real file; SQLite's shared memory database locks whole tables.
+        with tempfile.TemporaryDirectory() as directory, \
+                scratch_database(name=os.path.join(directory, 'benchmark.sqlite3')), \
+                override_settings(ALLOWED_HOSTS=['*'], REQUEST_METRICS_SAMPLE_RATE=1.0, PRODUCT_IMAGE_ASYNC=False):
+            self.seed(options)
+            request_log = logging.getLogger('ecommerce.requests')
+            request_log.disabled = True
+            try:
+                results = self.run_cases(cases, options)
+            finally:
+                request_log.disabled = False
+
+        report = {
+            'dataset': {key: options[key] for key in ('products', 'customers', 'days', 'seed')},
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'routes': results,
+        }
+        if baseline and any(baseline.get(key) != report[key] for key in ('dataset', 'requests', 'concurrency')):
+            self.stdout.write(self.style.WARNING(
+                'The baseline was recorded with a different dataset, request count or concurrency.'
+            ))
+        self.print_results(results, baseline, options['threshold'])
+        if options['save']:
+            with open(options['save'], 'w') as stream:
+                json.dump(report, stream, indent=2, sort_keys=True)
+                stream.write('\n')
+            self.stdout.write(f"\nSaved baseline to {options['save']}")
+
+        if baseline and options['fail_on_regression'] and self.regressions:
+            raise CommandError(f'{len(self.regressions)} route(s) regressed: {", ".join(self.regressions)}')
+
+    def seed(self, options):
+        self.stdout.write(
+            f"Seeding {options['products']} products, {options['customers']} customers "
+            f"and {options['days']} days of stats..."
+        )
+        active_by_day = seed_products(options['products'], options['seed'], options['days'])
+        joined_by_day = seed_customers(options['customers'], options['seed'], options['days'])
+        if options['days']:
+            seed_stats(options['days'], joined_by_day, active_by_day)
+        products_bulk_changed.send(sender=Product)
+        self.categories = category_ids()
+        self.user = User.objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        # Storefront routes only show visible products; pick from those everywhere.
+        self.product_ids = list(
+            Product.objects.filter(is_active=True, status='active').values_list('pk', flat=True)
+        ) or [0]
+
+    def disposable_products(self, count, seed):
+        """Create ``count`` products for delete requests to consume"""
+        rng = random.Random(seed)
+        categories = category_ids()
+        products = Product.objects.bulk_create([fake_product(rng, categories=categories) for _ in range(count)])
+        pks = queue.SimpleQueue()
+        for product in products:
+            pks.put(product.pk)
+        return pks
+
+    def run_cases(self, cases, options):
+        results = {}
+        concurrency, total = options['concurrency'], options['requests']
+        for case in cases:
+            rng = random.Random(f"{options['seed']}:{case.label}")
+            picks = [rng.choice(self.product_ids) for _ in range(total)]
+            disposable = self.disposable_products(total, options['seed']) if case.disposable else None
+
+            def worker(index):
+                client = Client(raise_request_exception=False)
+                client.force_login(self.user)
+                samples = []
+                try:
+                    for number in range(index, total, concurrency):
+                        pk = disposable.get() if disposable else picks[number]
+                        samples.append(self.request(client, case, pk, number))
+                finally:
+                    connections.close_all()
+                return samples
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                samples = [sample for chunk in pool.map(worker, range(concurrency)) for sample in chunk]
+            wall = time.perf_counter() - started
+
+            timings = [duration for duration, _, _ in samples]
+            queries = sorted(count for _, count, _ in samples)
+            results[case.label] = {
+                **{key: round(value, 2) for key, value in percentiles(timings).items()},
+                'rps': round(len(samples) / wall, 1),
+                'queries': queries[len(queries) // 2],
+                'errors': sum(1 for _, _, status in samples if status >= 500),
+                'status': max(status for _, _, status in samples),
+            }
+        return results
+
+    def request(self, client, case, pk, number):
+        path = case.path.format(pk=pk)
+        data = self.form_data(case.form, pk, number)
+        started = time.perf_counter()
+        response = client.get(path) if case.method == 'GET' else client.post(path, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        duration = (time.perf_counter() - started) * 1000
+        match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+        return duration, int(match.group(1)) if match else 0, response.status_code
+
+    def form_data(self, form, pk, number):
+        if form == 'product':
+            return {
+                'name': f'Benchmark Product {number}',
+                'description': 'Created by benchmark_routes',
+                'price': '9.99',
+                'category': self.categories[number % len(self.categories)],
+                'stock_quantity': number % 100,
+                'status': 'active',
+            }
+        if form == 'bulk':
+            return {'action': 'set_status', 'status': 'active', 'ids': [pk]}
+        return {}
+
+    def print_results(self, results, baseline, threshold):
+        self.regressions = []
+        previous = (baseline or {}).get('routes', {})
+        width = max((len(label) for label in results), default=10)
+        self.stdout.write(
+            f"\n{'route':<{width}}  {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'queries':>7} {'status':>6}"
+        )
+        for label, result in results.items():
+            line = (
+                f"{label:<{width}}  {result['p50']:8.2f} {result['p95']:8.2f} {result['p99']:8.2f} "
+                f"{result['rps']:8.1f} {result['queries']:7d} {result['status']:6d}"
+            )
+            if result['errors']:
+                line += f"  {result['errors']} errors"
+            before = previous.get(label)
+            if before:
+                line += '  ' + self.compare(label, before, result, threshold)
+            self.stdout.write(self.style.ERROR(line) if label in self.regressions else line)
+
+    def compare(self, label, before, after, threshold):
+        """Describe the change against the baseline and record regressions"""
+        def change(key):
+            return (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+
+        p95, rps = change('p95'), change('rps')
+        notes = [f'p95 {p95:+.0f}%', f'req/s {rps:+.0f}%']
+        if after['queries'] != before['queries']:
+            notes.append(f"queries {before['queries']} -> {after['queries']}")
+        if p95 > threshold or rps < -threshold or after['queries'] > before['queries'] or after['errors']:
+            self.regressions.append(label)
+            notes.append('REGRESSION')
+        return ', '.join(notes)
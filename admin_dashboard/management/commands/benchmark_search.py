@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from admin_dashboard.benchmarking import scratch_database, measure, summarize
+from admin_dashboard.models import Product
+from admin_dashboard.sample_data import seed_products
+from admin_dashboard.search import ContainsSearchBackend, SQLiteFTSSearchBackend
+
+
+class Command(BaseCommand):
+    help = 'Compare FTS5 product search with the icontains filter on a generated catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500000, help='Catalog size to generate')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument('--page-size', type=int, default=10, help='Rows fetched per query')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the catalog')
+        parser.add_argument(
+            '--queries', nargs='+', default=['apple', 'choc', 'organic milk', 'frozen peas', 'xyz'],
+            help='Search strings to time'
+        )
+
+    def handle(self, *args, **options):
+        backends = [
+            ('icontains', ContainsSearchBackend()),
+            ('fts5', SQLiteFTSSearchBackend()),
+        ]
+        page_size = options['page_size']
+
+        with scratch_database():
+            self.stdout.write(f"Seeding {options['products']} products...")
+            seed_products(options['products'], seed=options['seed'])
+
+            for query in options['queries']:
+                self.stdout.write(f'\nQuery: {query!r}')
+                for label, backend in backends:
+                    queryset = backend.filter(Product.objects.order_by('-created_at'), query)
+
+                    def run():
+                        list(queryset.all()[:page_size])
+                        queryset.count()
+
+                    timings = measure(run, options['repeat'])
+                    self.stdout.write(f'  {label:<10} {summarize(timings)}   matches {queryset.count()}')
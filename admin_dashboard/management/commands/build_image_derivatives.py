@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from admin_dashboard.images import _run_in_worker, build_derivatives, current_variants
+from admin_dashboard.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Render missing resized/WebP renditions for product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render products that already have derivatives')
+        parser.add_argument('--workers', type=int, default=4, help='Images rendered in parallel (1 renders inline)')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('pk', 'image', 'image_variants')
+        pending = [
+            (product.pk, product.image.name)
+            for product in products.iterator()
+            if options['all'] or current_variants(product) is None
+        ]
+
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                list(pool.map(lambda job: _run_in_worker(*job), pending))
+        else:
+            for pk, name in pending:
+                try:
+                    build_derivatives(pk, name)
+                except (OSError, ValueError) as error:
+                    self.stderr.write(f'Product {pk}: {error}')
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered derivatives for {len(pending)} products'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_dashboard.importers import IMPORT_BATCH_SIZE, FeedError, ProductImporter
+
+
+class Command(BaseCommand):
+    help = 'Import products from a CSV or JSON Lines feed, upserting on sku'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file to import')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Feed format (default: from file name)')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the feed without writing')
+        parser.add_argument('--max-errors', type=int, default=50, help='Row errors to print')
+
+    def handle(self, *args, **options):
+        importer = ProductImporter(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        try:
+            result = importer.run_file(options['path'], options['format'])
+        except OSError as error:
+            raise CommandError(f"Could not read {options['path']}: {error}")
+        except FeedError as error:
+            raise CommandError(
+                f"Could not read {options['path']}: {error} "
+                f"{error.result.imported} products before it were imported."
+            )
+
+        for line_number, errors in result.errors[:options['max_errors']]:
+            details = '; '.join(f'{field}: {message}' for field, message in errors.items())
+            self.stderr.write(f'Line {line_number}: {details}')
+        if len(result.errors) > options['max_errors']:
+            self.stderr.write(f"... and {len(result.errors) - options['max_errors']} more errors")
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.imported} products ({result.created} new, {result.updated} updated), '
+            f'{len(result.errors)} rows rejected'
+        ))
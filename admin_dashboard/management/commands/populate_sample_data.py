@@ -1,90 +1,60 @@
-from django.core.management.base import BaseCommand
+import time
+from datetime import timedelta
+
 from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
-from datetime import datetime, timedelta
-import random
-from admin_dashboard.models import Product, Customer, DashboardStats
+
+from admin_dashboard import rollups
+from admin_dashboard.models import Product
+from admin_dashboard.sample_data import (
+    BATCH_SIZE, seed_customers, seed_orders, seed_products, seed_stats, sku_prefix, username_prefix,
+)
+from admin_dashboard.signals import products_bulk_changed
+
 
 class Command(BaseCommand):
-    help = 'Populate sample data for dashboard'
+    help = 'Populate the dashboard with deterministic sample products, customers, orders and KPI history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200, help='Products to generate')
+        parser.add_argument('--customers', type=int, default=100, help='Customers to generate')
+        parser.add_argument('--orders', type=int, default=300, help='Orders to generate')
+        parser.add_argument('--days', type=int, default=30, help='Days of history to spread sign-ups and stats over')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed yields the same data')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per INSERT transaction')
 
     def handle(self, *args, **options):
+        seed, days = options['seed'], options['days']
+        if min(options['products'], options['customers'], options['orders'], days) < 0:
+            raise CommandError('--products, --customers, --orders and --days must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if (Product.objects.filter(sku__startswith=sku_prefix(seed)).exists()
+                or User.objects.filter(username__startswith=username_prefix(seed)).exists()):
+            raise CommandError(f'Sample data for --seed {seed} already exists; pick another seed')
+
+        started = time.perf_counter()
         self.stdout.write('Creating sample data...')
-        
-        # Create sample products
-        products_data = [
-            {'name': 'Fresh Apples', 'category': 'Fruits', 'price': 4.99, 'stock': 150},
-            {'name': 'Organic Bananas', 'category': 'Fruits', 'price': 2.99, 'stock': 200},
-            {'name': 'Fresh Broccoli', 'category': 'Vegetables', 'price': 3.49, 'stock': 80},
-            {'name': 'Carrots', 'category': 'Vegetables', 'price': 1.99, 'stock': 120},
-            {'name': 'Whole Milk', 'category': 'Dairy', 'price': 3.99, 'stock': 50},
-            {'name': 'Greek Yogurt', 'category': 'Dairy', 'price': 5.99, 'stock': 75},
-            {'name': 'Chicken Breast', 'category': 'Meat', 'price': 8.99, 'stock': 40},
-            {'name': 'Salmon Fillet', 'category': 'Seafood', 'price': 12.99, 'stock': 25},
-        ]
-        
-        for product_data in products_data:
-            product, created = Product.objects.get_or_create(
-                name=product_data['name'],
-                defaults={
-                    'description': f"Fresh {product_data['name'].lower()} from local farms",
-                    'category': product_data['category'],
-                    'price': product_data['price'],
-                    'stock_quantity': product_data['stock'],
-                    'is_active': True
-                }
-            )
-            if created:
-                self.stdout.write(f'Created product: {product.name}')
-        
-        # Create sample customers
-        customers_data = [
-            {'username': 'john_doe', 'first_name': 'John', 'last_name': 'Doe', 'email': 'john@example.com'},
-            {'username': 'jane_smith', 'first_name': 'Jane', 'last_name': 'Smith', 'email': 'jane@example.com'},
-            {'username': 'mike_wilson', 'first_name': 'Mike', 'last_name': 'Wilson', 'email': 'mike@example.com'},
-            {'username': 'sarah_brown', 'first_name': 'Sarah', 'last_name': 'Brown', 'email': 'sarah@example.com'},
-            {'username': 'david_jones', 'first_name': 'David', 'last_name': 'Jones', 'email': 'david@example.com'},
-        ]
-        
-        for customer_data in customers_data:
-            user, user_created = User.objects.get_or_create(
-                username=customer_data['username'],
-                defaults={
-                    'first_name': customer_data['first_name'],
-                    'last_name': customer_data['last_name'],
-                    'email': customer_data['email'],
-                }
-            )
-            if user_created:
-                customer, created = Customer.objects.get_or_create(
-                    user=user,
-                    defaults={
-                        'phone': f'+1-555-{random.randint(1000, 9999)}',
-                        'address': f'{random.randint(100, 999)} Main St, City, State'
-                    }
-                )
-                if created:
-                    self.stdout.write(f'Created customer: {customer}')
-        
-        # Create sample dashboard stats for the last 30 days
-        today = timezone.now().date()
-        for i in range(30):
-            date = today - timedelta(days=i)
-            daily_earnings = random.uniform(1000, 5000)
-            new_customers = random.randint(0, 10)
-            
-            stats, created = DashboardStats.objects.get_or_create(
-                date=date,
-                defaults={
-                    'daily_earnings': daily_earnings,
-                    'total_earnings': daily_earnings * (i + 1),  # Cumulative
-                    'new_customers': new_customers,
-                    'total_customers': Customer.objects.count() + new_customers
-                }
-            )
-            if created:
-                self.stdout.write(f'Created stats for {date}')
-        
-        self.stdout.write(
-            self.style.SUCCESS('Successfully populated sample data!')
+        active_by_day = seed_products(
+            options['products'], seed, days, options['batch_size'], progress=self.progress
         )
+        joined_by_day = seed_customers(
+            options['customers'], seed, days, options['batch_size'], progress=self.progress
+        )
+        seed_orders(options['orders'], seed, days, options['batch_size'], progress=self.progress)
+        if days:
+            seed_stats(days, joined_by_day, active_by_day)
+            self.stdout.write(f'Created stats for the last {days} days')
+        # Orders were bulk inserted: count their earnings from the ledger
+        rollups.rebuild_earnings(timezone.now().date() - timedelta(days=max(days, 1) - 1))
+
+        # bulk_create sends no post_save: rebuild today's rollup and drop cached pages
+        products_bulk_changed.send(sender=Product)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully populated sample data in {time.perf_counter() - started:.1f}s!'
+        ))
+
+    def progress(self, what, done, total):
+        self.stdout.write(f'  {what}: {done}/{total}')
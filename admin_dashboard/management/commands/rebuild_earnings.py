@@ -0,0 +1,30 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_dashboard import rollups
+
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f'{value!r} is not a YYYY-MM-DD date')
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard earnings of a date range from the order ledger'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=parse_day, help='First day to rebuild (default: the first order)')
+        parser.add_argument('--end', type=parse_day, help='Last day to rebuild (default: today)')
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--start must not be after --end')
+        started = time.perf_counter()
+        written = rollups.rebuild_earnings(options['start'], options['end'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt earnings for {written} days in {(time.perf_counter() - started) * 1000:.1f}ms'
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    DashboardStats = apps.get_model('admin_dashboard', 'DashboardStats')
+    Customer = apps.get_model('admin_dashboard', 'Customer')
+    Product = apps.get_model('admin_dashboard', 'Product')
+
+    month, running = None, 0
+    rows = list(DashboardStats.objects.order_by('date'))
+    for row in rows:
+        if (row.date.year, row.date.month) != month:
+            month, running = (row.date.year, row.date.month), 0
+        running += row.daily_earnings
+        row.monthly_earnings = running
+    if rows:
+        rows[-1].total_customers = Customer.objects.count()
+        rows[-1].total_products = Product.objects.filter(is_active=True).count()
+    DashboardStats.objects.bulk_update(rows, ['monthly_earnings', 'total_customers', 'total_products'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_dashboard', '0002_product_status_alter_product_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='monthly_earnings',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='dashboardstats',
+            name='total_products',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
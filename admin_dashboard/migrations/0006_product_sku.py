@@ -0,0 +1,60 @@
+from importlib import import_module
+
+from django.db import migrations, models
+
+PRODUCT_TABLE = 'admin_dashboard_product'
+
+search_index = import_module('admin_dashboard.migrations.0004_product_search_index')
+
+
+def drop_sku_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS product_sku_uniq')
+    with schema_editor.connection.cursor() as cursor:
+        constraints = schema_editor.connection.introspection.get_constraints(cursor, PRODUCT_TABLE)
+    if not any(c['unique'] and c['columns'] == ['sku'] for c in constraints.values()):
+        return
+    # Unapplying a later table rebuild (0010) on SQLite turns the index into an
+    # inline UNIQUE, which keeps the column from being dropped: rebuild without
+    # it, and put back the search triggers the rebuild takes with it.
+    Product = apps.get_model('admin_dashboard', 'Product')
+    plain = Product._meta.get_field('sku')
+    unique = models.CharField(blank=True, max_length=64, null=True, unique=True)
+    unique.set_attributes_from_name('sku')
+    unique.model = Product
+    search_index.run_on_sqlite(search_index.DROP_SQL)(apps, schema_editor)
+    schema_editor.alter_field(Product, unique, plain)
+    search_index.run_on_sqlite(search_index.CREATE_SQL)(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_dashboard', '0005_product_customer_indexes'),
+    ]
+
+    operations = [
+        # Add the column and its unique index separately: a unique AddField
+        # makes SQLite rebuild the whole table, which is slow on large
+        # catalogs and drops the search index triggers from 0004.
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX product_sku_uniq ON admin_dashboard_product (sku)',
+                    migrations.RunSQL.noop,
+                ),
+                migrations.RunPython(migrations.RunPython.noop, drop_sku_index),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='product',
+                    name='sku',
+                    field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+                ),
+            ],
+        ),
+    ]
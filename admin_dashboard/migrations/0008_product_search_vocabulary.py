@@ -0,0 +1,34 @@
+from django.db import migrations
+
+FTS_TABLE = 'admin_dashboard_product_fts'
+VOCAB_TABLE = 'admin_dashboard_product_fts_vocab'
+
+# One row per distinct term in the FTS index with the number of products using
+# it; SQLite derives it from the index, so it is always current.
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE {VOCAB_TABLE} USING fts5vocab({FTS_TABLE}, 'row')",
+]
+
+DROP_SQL = [
+    f'DROP TABLE IF EXISTS {VOCAB_TABLE}',
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_dashboard', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
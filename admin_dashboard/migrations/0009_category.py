@@ -0,0 +1,118 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils.text import slugify
+
+search_index = import_module('admin_dashboard.migrations.0004_product_search_index')
+search_vocabulary = import_module('admin_dashboard.migrations.0008_product_search_vocabulary')
+
+# Making the text column nullable rebuilds the product table on SQLite and
+# drops the search triggers. Going forward 0010 replaces the search index
+# anyway; going back it is reinstalled once the text column is restored.
+REINSTALL_SEARCH_SQL = [
+    *search_vocabulary.DROP_SQL,
+    *search_index.DROP_SQL,
+    *search_index.CREATE_SQL,
+    *search_vocabulary.CREATE_SQL,
+]
+
+# The categories Product.category used to offer as hardcoded choices
+DEFAULT_CATEGORIES = [
+    'Dairy, Bread & Eggs',
+    'Snacks & Munchies',
+    'Fruits & Vegetables',
+    'Bakery & Biscuits',
+    'Instant Food',
+    'Tea, Coffee & Drinks',
+    'Atta, Rice & Dal',
+    'Masala, Oil & More',
+    'Sweet Tooth',
+    'Frozen Veg',
+    'Frozen Non-Veg',
+]
+
+
+def unique_slug(name, taken):
+    base = slugify(name)[:90] or 'category'
+    slug, suffix = base, 2
+    while slug in taken:
+        slug, suffix = f'{base}-{suffix}', suffix + 1
+    taken.add(slug)
+    return slug
+
+
+def create_categories(apps, schema_editor):
+    """Turn every category string in use, plus the old choices, into a Category row"""
+    Category = apps.get_model('admin_dashboard', 'Category')
+    Product = apps.get_model('admin_dashboard', 'Product')
+
+    counts = dict(Product.objects.order_by().values_list('category').annotate(count=Count('pk')))
+    names = DEFAULT_CATEGORIES + sorted(name for name in counts if name not in DEFAULT_CATEGORIES)
+    taken = set()
+    Category.objects.bulk_create([
+        Category(name=name, slug=unique_slug(name, taken), position=position, product_count=counts.get(name, 0))
+        for position, name in enumerate(names)
+    ])
+    # One UPDATE per category rather than one per product
+    for category_id, name in Category.objects.values_list('pk', 'name'):
+        if counts.get(name):
+            Product.objects.filter(category=name).update(category_ref=category_id)
+
+
+def restore_names(apps, schema_editor):
+    Category = apps.get_model('admin_dashboard', 'Category')
+    Product = apps.get_model('admin_dashboard', 'Product')
+    for category_id, name in Category.objects.values_list('pk', 'name'):
+        Product.objects.filter(category_ref=category_id).update(category=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_dashboard', '0008_product_search_vocabulary'),
+        # Copies legacy storefront products with category strings, which must
+        # land before the strings are turned into categories.
+        ('homepage', '0003_move_products_to_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, search_index.run_on_sqlite(REINSTALL_SEARCH_SQL)),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('product_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('parent', models.ForeignKey(
+                    blank=True, null=True, on_delete=django.db.models.deletion.PROTECT,
+                    related_name='children', to='admin_dashboard.category',
+                )),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'ordering': ['position', 'name'],
+            },
+        ),
+        # The text column is dropped by 0010; nullable so that can be undone
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        # Filled in here and swapped in for the text column by 0010
+        migrations.AddField(
+            model_name='product',
+            name='category_ref',
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+',
+                to='admin_dashboard.category',
+            ),
+        ),
+        migrations.RunPython(create_categories, restore_names),
+    ]
@@ -0,0 +1,104 @@
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS_TABLE = 'admin_dashboard_product_fts'
+VOCAB_TABLE = 'admin_dashboard_product_fts_vocab'
+PRODUCT_TABLE = 'admin_dashboard_product'
+CATEGORY_TABLE = 'admin_dashboard_category'
+
+search_index = import_module('admin_dashboard.migrations.0004_product_search_index')
+search_vocabulary = import_module('admin_dashboard.migrations.0008_product_search_vocabulary')
+
+# The category name no longer lives on the product row, so the FTS table keeps
+# its own copy of the text instead of reading it from the product table.
+CATEGORY_NAME = f'(SELECT name FROM {CATEGORY_TABLE} WHERE id = new.category_id)'
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, description, category,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {PRODUCT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, {CATEGORY_NAME});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {PRODUCT_TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF name, description, category_id ON {PRODUCT_TABLE} BEGIN
+        UPDATE {FTS_TABLE} SET name = new.name, description = new.description, category = {CATEGORY_NAME}
+        WHERE rowid = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_category_au AFTER UPDATE OF name ON {CATEGORY_TABLE} BEGIN
+        UPDATE {FTS_TABLE} SET category = new.name
+        WHERE rowid IN (SELECT id FROM {PRODUCT_TABLE} WHERE category_id = new.id);
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+    SELECT product.id, product.name, product.description, category.name
+    FROM {PRODUCT_TABLE} product JOIN {CATEGORY_TABLE} category ON category.id = product.category_id
+    """,
+    *search_vocabulary.CREATE_SQL,
+]
+
+DROP_SQL = [
+    *search_vocabulary.DROP_SQL,
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_category_au',
+    *search_index.DROP_SQL,
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_dashboard', '0009_category'),
+    ]
+
+    operations = [
+        # Dropping the text column rebuilds the product table on SQLite, which
+        # would take the search triggers with it; they are recreated at the end.
+        # Going back, 0009 reinstalls the original index.
+        migrations.RunPython(run_on_sqlite(DROP_SQL), migrations.RunPython.noop),
+        migrations.RemoveIndex(model_name='product', name='product_category_created_idx'),
+        migrations.RemoveIndex(model_name='product', name='product_status_cat_idx'),
+        migrations.RemoveField(model_name='product', name='category'),
+        migrations.RenameField(model_name='product', old_name='category_ref', new_name='category'),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT, related_name='products',
+                to='admin_dashboard.category',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='product_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'category', 'created_at'], name='product_status_cat_idx'),
+        ),
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_dashboard', '0011_order_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchEntry',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='admin_dashboard.product')),
+            ],
+            options={
+                'db_table': 'admin_dashboard_product_fts',
+                'managed': False,
+            },
+        ),
+    ]
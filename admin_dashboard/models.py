@@ -5,6 +5,27 @@ from datetime import datetime, timedelta
 
 # Create your models here.
 
+class Category(models.Model):
+    """Product category; ``parent`` nests categories into a tree"""
+    name = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(max_length=100, unique=True)
+    parent = models.ForeignKey(
+        'self', on_delete=models.PROTECT, related_name='children', blank=True, null=True
+    )
+    position = models.PositiveIntegerField(default=0)
+    # Products in this category itself, kept current by admin_dashboard.categories
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['position', 'name']
+        verbose_name_plural = 'categories'
+
+
 class Product(models.Model):
     """Product model for the e-commerce store"""
 
@@ -15,27 +36,15 @@ class Product(models.Model):
         ('deactive', 'Deactive'),
     ]
 
-    # Category choices
-    CATEGORY_CHOICES = [
-        ('Dairy, Bread & Eggs', 'Dairy, Bread & Eggs'),
-        ('Snacks & Munchies', 'Snacks & Munchies'),
-        ('Fruits & Vegetables', 'Fruits & Vegetables'),
-        ('Bakery & Biscuits', 'Bakery & Biscuits'),
-        ('Instant Food', 'Instant Food'),
-        ('Tea, Coffee & Drinks', 'Tea, Coffee & Drinks'),
-        ('Atta, Rice & Dal', 'Atta, Rice & Dal'),
-        ('Masala, Oil & More', 'Masala, Oil & More'),
-        ('Sweet Tooth', 'Sweet Tooth'),
-        ('Frozen Veg', 'Frozen Veg'),
-        ('Frozen Non-Veg', 'Frozen Non-Veg'),
-    ]
-
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
-    category = models.CharField(max_length=100, choices=CATEGORY_CHOICES)
+    category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products')
     stock_quantity = models.IntegerField(default=0)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Resized renditions of ``image``, written by admin_dashboard.images
+    image_variants = models.JSONField(blank=True, null=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -61,6 +70,32 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Listing and cursor pagination, optionally narrowed by the filters
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='product_status_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='product_category_created_idx'),
+            models.Index(fields=['status', 'category', 'created_at'], name='product_status_cat_idx'),
+            # Active product counts and the dashboard's recent products
+            models.Index(
+                fields=['created_at'],
+                name='product_active_created_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
+
+class ProductSearchEntry(models.Model):
+    """A product's row in the SQLite FTS5 shadow table (migrations 0004 and 0010)"""
+    # Lets the ORM join the table on its rowid; the triggers write it, never Django
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_entry'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'admin_dashboard_product_fts'
+
 
 class Customer(models.Model):
     """Customer model extending User"""
@@ -76,14 +111,78 @@ class Customer(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='customer_created_idx'),
+        ]
+
+class Order(models.Model):
+    """A customer's order; its items are the ledger the earnings rollups are built from"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('paid', 'Paid'),
+        ('shipped', 'Shipped'),
+        ('delivered', 'Delivered'),
+        ('cancelled', 'Cancelled'),
+        ('refunded', 'Refunded'),
+    ]
+    # Orders in these states count towards earnings
+    EARNING_STATUSES = ('paid', 'shipped', 'delivered')
+
+    customer = models.ForeignKey(
+        Customer, on_delete=models.SET_NULL, related_name='orders', blank=True, null=True
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Sum of the item lines, kept current by admin_dashboard.orders
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    placed_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Order #{self.pk}"
+
+    @property
+    def earns(self):
+        """Whether this order's total counts towards earnings"""
+        return self.status in self.EARNING_STATUSES
+
+    class Meta:
+        ordering = ['-placed_at']
+        indexes = [
+            # Earnings per day over a date range
+            models.Index(fields=['placed_at', 'status', 'total'], name='order_placed_idx'),
+        ]
+
+
+class OrderItem(models.Model):
+    """One product line of an order, priced when the order was placed"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    # The line outlives its product; the name is kept for the record
+    product = models.ForeignKey(
+        Product, on_delete=models.SET_NULL, related_name='order_items', blank=True, null=True
+    )
+    product_name = models.CharField(max_length=200)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
+
 
 class DashboardStats(models.Model):
     """Model to store dashboard statistics"""
     date = models.DateField(unique=True)
     total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     daily_earnings = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    monthly_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     new_customers = models.IntegerField(default=0)
     total_customers = models.IntegerField(default=0)
+    total_products = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -0,0 +1,46 @@
+"""Placing orders and keeping their totals in step with their items.
+
+``place_order`` prices each line at the product's current price and writes
+the order, with its ``total`` already summed, and its items in one
+transaction, so the order's ``post_save`` moves the earnings rollups once.
+Items edited afterwards (the admin inline) re-sum their order through
+``refresh_total`` (see ``signals.py``), which saves it only when the total
+changed.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Order, OrderItem
+
+CENTS = Decimal('0.01')
+
+
+def place_order(customer, lines, status='paid', placed_at=None):
+    """Create and return an order for ``customer`` from ``(product, quantity)`` pairs"""
+    items = [
+        OrderItem(product=product, product_name=product.name, unit_price=product.price, quantity=quantity)
+        for product, quantity in lines
+    ]
+    order = Order(customer=customer, status=status, total=sum((item.line_total for item in items), Decimal(0)))
+    if placed_at is not None:
+        order.placed_at = placed_at
+    with transaction.atomic():
+        order.save()
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+    return order
+
+
+def refresh_total(order_id):
+    """Re-sum one order's items and save its total if it changed"""
+    order = Order.objects.filter(pk=order_id).first()
+    if order is None:
+        return
+    total = order.items.aggregate(total=Sum(F('unit_price') * F('quantity')))['total'] or Decimal(0)
+    total = Decimal(total).quantize(CENTS)
+    if total != order.total:
+        order.total = total
+        order.save(update_fields=['total', 'updated_at'])
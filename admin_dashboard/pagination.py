@@ -0,0 +1,96 @@
+"""Keyset (cursor) pagination.
+
+Pages are addressed by the ``(created_at, id)`` of the row at their edge
+instead of an OFFSET, so every page costs one indexed range scan no matter
+how deep it is. Cursors are opaque URL-safe tokens; a malformed cursor simply
+yields the first page.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(obj, direction):
+    """Return an opaque token pointing just past ``obj`` in ``direction``"""
+    payload = json.dumps([direction, obj.created_at.isoformat(), obj.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return ``(direction, created_at, pk)`` for ``token`` or None if it is invalid"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or created_at is None or not isinstance(pk, int):
+        return None
+    return direction, created_at, pk
+
+
+class KeysetPage:
+    """One page of results plus the cursors of its neighbours"""
+
+    def __init__(self, object_list, next_cursor, prev_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginate a queryset newest first on ``(created_at, id)``"""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, token=None):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return self._page(self.queryset.order_by('-created_at', '-pk'), backwards=False, at_start=True)
+
+        # The redundant outer bound gives the database a seekable range on
+        # created_at; the OR only breaks ties between equal timestamps.
+        direction, created_at, pk = cursor
+        if direction == 'next':
+            older = Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(pk__lt=pk))
+            return self._page(self.queryset.filter(older).order_by('-created_at', '-pk'), backwards=False)
+
+        newer = Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(pk__gt=pk))
+        return self._page(self.queryset.filter(newer).order_by('created_at', 'pk'), backwards=True)
+
+    def _page(self, queryset, backwards, at_start=False):
+        # Fetch one extra row to learn whether there is another page beyond this one.
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows, None, None)
+
+        if backwards:
+            next_cursor = encode_cursor(rows[-1], 'next')
+            prev_cursor = encode_cursor(rows[0], 'prev') if more else None
+        else:
+            next_cursor = encode_cursor(rows[-1], 'next') if more else None
+            prev_cursor = None if at_start else encode_cursor(rows[0], 'prev')
+        return KeysetPage(rows, next_cursor, prev_cursor)
@@ -0,0 +1,73 @@
+"""Query and row budgets for views, checked by the test suite.
+
+``QueryBudget`` counts the SQL statements a block runs and the rows it
+fetches back. ``QueryBudgetMixin`` adds ``assertWithinBudget``, which fails a
+test when a request goes over its budget and lists the queries it ran.
+"""
+from contextlib import contextmanager
+from unittest import mock
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.utils import CursorWrapper
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudget:
+    """Count the queries run and rows fetched on ``connection`` inside the block"""
+
+    def __init__(self, connection=None):
+        self.connection = connection or connections[DEFAULT_DB_ALIAS]
+        self.rows = 0
+        self._queries = CaptureQueriesContext(self.connection)
+        self._patches = []
+
+    @property
+    def queries(self):
+        return len(self._queries)
+
+    @property
+    def captured_queries(self):
+        return self._queries.captured_queries
+
+    def _counting(self, name):
+        budget = self
+
+        def fetch(cursor, *args):
+            result = cursor.db.wrap_database_errors(getattr(cursor.cursor, name))(*args)
+            if cursor.db is budget.connection:
+                if name == 'fetchone':
+                    budget.rows += result is not None
+                else:
+                    budget.rows += len(result)
+            return result
+        return fetch
+
+    def __enter__(self):
+        self._queries.__enter__()
+        for name in ('fetchone', 'fetchmany', 'fetchall'):
+            patch = mock.patch.object(CursorWrapper, name, self._counting(name), create=True)
+            patch.start()
+            self._patches.append(patch)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for patch in self._patches:
+            patch.stop()
+        self._patches.clear()
+        self._queries.__exit__(exc_type, exc_value, traceback)
+
+
+class QueryBudgetMixin:
+    """TestCase helpers for query budgets"""
+
+    @contextmanager
+    def assertWithinBudget(self, label, queries, rows):
+        """Fail if the block runs more than ``queries`` queries or fetches more than ``rows`` rows"""
+        with QueryBudget() as budget:
+            yield budget
+        if budget.queries > queries or budget.rows > rows:
+            sql = '\n'.join(f'  {query["sql"]}' for query in budget.captured_queries)
+            self.fail(
+                f'{label} went over its budget: {budget.queries}/{queries} queries, '
+                f'{budget.rows}/{rows} rows\n{sql}'
+            )
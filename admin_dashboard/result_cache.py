@@ -0,0 +1,108 @@
+"""Cached product listing results.
+
+``products_list`` keeps each page it answers in the default cache, keyed by
+the normalized search form data, the page asked for and a catalog generation
+that every ``Product`` write bumps through ``invalidate()`` (see
+``signals.py``). An entry holds only the ordered product ids, the total match
+count and the page's position, so a hit skips the search and the count and
+loads the page's rows with one ``in_bulk``. The rows themselves are always
+read fresh, which keeps writes that bypass the model signals (image
+derivatives, stock updates) visible.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+
+from ecommerce.instrumentation import record_cache
+
+from .models import Product
+from .pagination import KeysetPage
+
+GENERATION_KEY = 'product_results:generation'
+METRIC_NAME = 'product_results'
+
+
+def generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def invalidate():
+    """Drop every cached result by moving to a new generation"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def normalize(filters):
+    """Reduce search form data to the values that change the result"""
+    return {
+        field: ' '.join(str(value).lower().split())
+        for field, value in sorted(filters.items()) if value
+    }
+
+
+def hydrate(ids):
+    """Load the products with ``ids`` in one query, keeping their order"""
+    products = Product.objects.select_related('category').order_by().in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
+
+
+class ProductResultCache:
+    """Product listing pages stored as id lists, with process-wide hit and miss counts"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, filters, position, cursor_pagination):
+        """Cache key of one page: ``position`` is the cursor or page number asked for"""
+        payload = json.dumps([normalize(filters), position, cursor_pagination], sort_keys=True)
+        return f'product_results:{generation()}:{hashlib.md5(payload.encode()).hexdigest()}'
+
+    def get(self, key):
+        entry = cache.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        record_cache(METRIC_NAME, entry is not None)
+        return entry
+
+    def store(self, key, page_obj, total):
+        """Remember the ids and position of a page fetched from the database"""
+        entry = {'ids': [product.pk for product in page_obj], 'total': total}
+        if isinstance(page_obj, KeysetPage):
+            entry.update(next=page_obj.next_cursor, prev=page_obj.prev_cursor)
+        else:
+            entry['number'] = page_obj.number
+        cache.set(key, entry, getattr(settings, 'PRODUCT_RESULT_CACHE_TIMEOUT', 300))
+
+    def page(self, entry, queryset, per_page):
+        """Rebuild the page of a cached entry with one query"""
+        products = hydrate(entry['ids'])
+        if 'number' not in entry:
+            return KeysetPage(products, entry['next'], entry['prev'])
+        paginator = Paginator(queryset, per_page)
+        # Seed the cached_property so the paginator never counts the queryset.
+        paginator.count = entry['total']
+        return Page(products, entry['number'], paginator)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+product_results = ProductResultCache()
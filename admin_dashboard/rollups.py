@@ -0,0 +1,275 @@
+"""Incremental dashboard KPI rollups.
+
+Today's ``DashboardStats`` row is kept current by the signal handlers in
+``signals.py`` so the dashboard only has to read precomputed rows instead of
+aggregating the customer and product tables on every request.
+
+Earnings come from the order ledger. Each order that starts or stops
+earning, or changes its total or day, moves the ``daily_earnings`` of its
+day and the running ``monthly_earnings``/``total_earnings`` of that row and
+every later one with a single UPDATE (``earnings_changed``).
+``rebuild_earnings`` recomputes any date range from the ledger in one
+set based pass, for writes that bypass the signals.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Product, Customer, DashboardStats, Order
+
+
+def _today():
+    return timezone.now().date()
+
+
+def day_start(day):
+    """Return the aware datetime at which ``day`` begins"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _next_month(day):
+    """Return the first day of the month after ``day``"""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _same_month(a, b):
+    return (a.year, a.month) == (b.year, b.month)
+
+
+def _counted_row(day):
+    """Build an unsaved stats row for ``day`` from the source tables"""
+    month_start = day.replace(day=1)
+    previous = DashboardStats.objects.filter(date__lt=day).first()
+    monthly_earnings = DashboardStats.objects.filter(
+        date__gte=month_start, date__lt=day
+    ).aggregate(total=Sum('daily_earnings'))['total'] or 0
+    return DashboardStats(
+        date=day,
+        total_earnings=previous.total_earnings if previous else 0,
+        daily_earnings=0,
+        monthly_earnings=monthly_earnings,
+        new_customers=Customer.objects.filter(
+            created_at__gte=day_start(day), created_at__lt=day_start(day + timedelta(days=1))
+        ).count(),
+        total_customers=Customer.objects.count(),
+        total_products=Product.objects.filter(is_active=True).count(),
+    )
+
+
+def _carried_row(previous, day):
+    """Build an unsaved stats row for ``day`` carried forward from ``previous``"""
+    same_month = _same_month(previous.date, day)
+    return DashboardStats(
+        date=day,
+        total_earnings=previous.total_earnings,
+        daily_earnings=0,
+        monthly_earnings=previous.monthly_earnings if same_month else 0,
+        new_customers=0,
+        total_customers=previous.total_customers,
+        total_products=previous.total_products,
+    )
+
+
+def _ensure_row(day):
+    """
+    Make sure a stats row exists for ``day``.
+
+    Returns True when the row was bootstrapped from the source tables, in
+    which case it already reflects the write that triggered the call and the
+    caller must not apply its delta on top.
+    """
+    if DashboardStats.objects.filter(date=day).exists():
+        return False
+
+    previous = DashboardStats.objects.filter(date__lt=day).first()
+    row = _carried_row(previous, day) if previous else _counted_row(day)
+    try:
+        with transaction.atomic():
+            row.save()
+    except IntegrityError:
+        # Another request created the row first; treat it as carried forward.
+        return False
+    return previous is None
+
+
+def _apply(day, **deltas):
+    """Add ``deltas`` to the stats row for ``day`` in a single UPDATE"""
+    if _ensure_row(day):
+        return
+    DashboardStats.objects.filter(date=day).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def customer_added(customer):
+    """Count a newly created customer"""
+    _apply(_today(), new_customers=1, total_customers=1)
+
+
+def customer_removed(customer):
+    """Uncount a deleted customer"""
+    today = _today()
+    if _ensure_row(today):
+        return
+    DashboardStats.objects.filter(date=today).update(total_customers=F('total_customers') - 1)
+    if customer.created_at:
+        DashboardStats.objects.filter(date=customer.created_at.date()).update(
+            new_customers=F('new_customers') - 1
+        )
+
+
+def products_changed(active_delta):
+    """Adjust the active product total by ``active_delta``"""
+    if active_delta:
+        _apply(_today(), total_products=active_delta)
+
+
+def earnings_changed(day, amount):
+    """Add ``amount`` to the earnings of ``day`` and to the running totals from ``day`` on, in one UPDATE"""
+    if not amount:
+        return
+    _ensure_row(day)
+    DashboardStats.objects.filter(date__gte=day).update(
+        daily_earnings=Case(When(date=day, then=F('daily_earnings') + amount), default=F('daily_earnings')),
+        monthly_earnings=Case(
+            When(date__lt=_next_month(day), then=F('monthly_earnings') + amount), default=F('monthly_earnings')
+        ),
+        total_earnings=F('total_earnings') + amount,
+    )
+
+
+def order_changed(old, new):
+    """Move an order's earnings from ``old`` to ``new``, each a ``(day, amount)`` pair or None"""
+    if old and new and old[0] == new[0]:
+        earnings_changed(new[0], new[1] - old[1])
+        return
+    if old:
+        earnings_changed(old[0], -old[1])
+    if new:
+        earnings_changed(new[0], new[1])
+
+
+def daily_earnings(start, end):
+    """Return ``{day: earnings}`` for ``start`` to ``end`` inclusive from one GROUP BY over the ledger"""
+    orders = Order.objects.filter(
+        status__in=Order.EARNING_STATUSES,
+        placed_at__gte=day_start(start),
+        placed_at__lt=day_start(end + timedelta(days=1)),
+    )
+    return dict(
+        orders.order_by().annotate(day=TruncDate('placed_at')).values_list('day').annotate(earned=Sum('total'))
+    )
+
+
+def rebuild_earnings(start=None, end=None):
+    """
+    Recompute the earnings of the stats rows from ``start`` to ``end`` from the order ledger.
+
+    ``start`` defaults to the day of the first order and ``end`` to today.
+    The running totals continue from the row before ``start``; the range is
+    written back with one ``bulk_update`` (and a ``bulk_create`` for days
+    with sales but no row), and one UPDATE moves the rows after ``end`` by
+    however much the range changed. Returns the number of rows written.
+    """
+    end = end or _today()
+    if start is None:
+        first = Order.objects.order_by('placed_at').values_list('placed_at', flat=True).first()
+        start = min(first.date(), end) if first else end
+    earned = daily_earnings(start, end)
+
+    with transaction.atomic():
+        previous = DashboardStats.objects.filter(date__lt=start).first()
+        rows = {row.date: row for row in DashboardStats.objects.filter(date__gte=start, date__lte=end)}
+        last = rows[max(rows)] if rows else previous
+        old_total = last.total_earnings if last else Decimal(0)
+        old_monthly = last.monthly_earnings if last and _same_month(last.date, end) else Decimal(0)
+
+        total = previous.total_earnings if previous else Decimal(0)
+        monthly = previous.monthly_earnings if previous and _same_month(previous.date, start) else Decimal(0)
+        changed, created = [], []
+        carried, day = previous, start
+        while day <= end:
+            if day.day == 1:
+                monthly = Decimal(0)
+            amount = earned.get(day, Decimal(0))
+            total += amount
+            monthly += amount
+            row = rows.get(day)
+            if row is not None:
+                changed.append(row)
+            elif amount:
+                row = _carried_row(carried, day) if carried else _counted_row(day)
+                created.append(row)
+            if row is not None:
+                row.daily_earnings, row.monthly_earnings, row.total_earnings = amount, monthly, total
+                carried = row
+            day += timedelta(days=1)
+
+        DashboardStats.objects.bulk_update(changed, ['daily_earnings', 'monthly_earnings', 'total_earnings'])
+        DashboardStats.objects.bulk_create(created)
+        if total != old_total or monthly != old_monthly:
+            DashboardStats.objects.filter(date__gt=end).update(
+                total_earnings=F('total_earnings') + (total - old_total),
+                monthly_earnings=Case(
+                    When(date__lt=_next_month(end), then=F('monthly_earnings') + (monthly - old_monthly)),
+                    default=F('monthly_earnings'),
+                ),
+            )
+    return len(changed) + len(created)
+
+
+def rebuild(day=None):
+    """Recompute the stats row for ``day`` from the source tables"""
+    day = day or _today()
+    row = _counted_row(day)
+    existing = DashboardStats.objects.filter(date=day).first()
+    if existing:
+        row.daily_earnings = existing.daily_earnings
+        row.monthly_earnings += existing.daily_earnings
+        row.total_earnings = existing.total_earnings
+    DashboardStats.objects.update_or_create(
+        date=day,
+        defaults={
+            'total_earnings': row.total_earnings,
+            'daily_earnings': row.daily_earnings,
+            'monthly_earnings': row.monthly_earnings,
+            'new_customers': row.new_customers,
+            'total_customers': row.total_customers,
+            'total_products': row.total_products,
+        }
+    )
+
+
+def snapshot(day=None):
+    """
+    Return the dashboard KPIs for ``day`` without writing anything.
+
+    Reads at most the three most recent stats rows in one query; when no row
+    has been written yet the figures are counted from the source tables.
+    """
+    day = day or _today()
+    window_start = day - timedelta(days=2)
+    rows = list(DashboardStats.objects.filter(date__lte=day)[:3])
+
+    if not rows:
+        row = _counted_row(day)
+        return {
+            'monthly_earnings': row.monthly_earnings,
+            'total_customers': row.total_customers,
+            'new_customers_2_days': Customer.objects.filter(created_at__gte=day_start(window_start)).count(),
+            'total_products': row.total_products,
+        }
+
+    latest = rows[0]
+    if latest.date != day:
+        latest = _carried_row(latest, day)
+    return {
+        'monthly_earnings': latest.monthly_earnings,
+        'total_customers': latest.total_customers,
+        'new_customers_2_days': sum(r.new_customers for r in rows if r.date >= window_start),
+        'total_products': latest.total_products,
+    }
@@ -0,0 +1,280 @@
+"""Deterministic fake catalog, customers, orders and KPI history for load testing.
+
+Every generator draws from ``random.Random(seed)`` and writes with batched
+``bulk_create`` calls, one transaction per batch, so the same seed yields the
+same rows and only one batch is held in memory at a time. Generated rows are
+recognisable by their SKU (``S<seed>-``) and username (``sample<seed>-``)
+prefixes.
+"""
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .categories import DEFAULT_CATEGORIES, ensure_defaults
+from .models import Customer, DashboardStats, Order, OrderItem, Product
+
+PRODUCT_WORDS = [
+    'Fresh', 'Organic', 'Whole', 'Crunchy', 'Spicy', 'Sweet', 'Classic', 'Premium',
+    'Farm', 'Golden', 'Roasted', 'Salted', 'Creamy', 'Frozen', 'Instant', 'Natural',
+]
+PRODUCT_NOUNS = [
+    'Apples', 'Bananas', 'Broccoli', 'Carrots', 'Milk', 'Yogurt', 'Bread', 'Eggs',
+    'Cookies', 'Chips', 'Noodles', 'Coffee', 'Tea', 'Rice', 'Lentils', 'Paneer',
+    'Chocolate', 'Peas', 'Chicken Nuggets', 'Butter', 'Cheese', 'Juice', 'Oats', 'Honey',
+]
+FIRST_NAMES = [
+    'John', 'Jane', 'Mike', 'Sarah', 'David', 'Priya', 'Arjun', 'Maria', 'Chen', 'Fatima',
+    'Lucas', 'Emma', 'Noah', 'Aisha', 'Ravi', 'Sofia', 'Omar', 'Yuki', 'Liam', 'Ana',
+]
+LAST_NAMES = [
+    'Doe', 'Smith', 'Wilson', 'Brown', 'Jones', 'Sharma', 'Garcia', 'Wang', 'Khan', 'Silva',
+    'Patel', 'Kim', 'Nguyen', 'Müller', 'Rossi', 'Ivanova', 'Okafor', 'Tanaka', 'Martin', 'Lopez',
+]
+STREETS = ['Main St', 'Oak Ave', 'Park Rd', 'Lake View', 'Market St', 'Hill Rd', 'Station Rd']
+
+# Relative frequency of each product status
+STATUS_WEIGHTS = {'active': 80, 'draft': 12, 'deactive': 8}
+# Relative frequency of each order status
+ORDER_STATUS_WEIGHTS = {'delivered': 60, 'shipped': 12, 'paid': 10, 'pending': 8, 'cancelled': 6, 'refunded': 4}
+# Orders draw their lines from this many of the seed's products
+ORDER_PRODUCT_POOL = 1000
+
+BATCH_SIZE = 5000
+
+
+def sku_prefix(seed):
+    return f'S{seed}-'
+
+
+def username_prefix(seed):
+    return f'sample{seed}-'
+
+
+def _bulk_create_dated(model, objs, batch_size):
+    """``bulk_create`` the objects, then restore the ``created_at``/``updated_at`` set on them"""
+    # auto_now/auto_now_add overwrite both on insert; put them back afterwards
+    # rather than switching those flags off on the shared field definitions.
+    # One prepared UPDATE run per row is far cheaper than bulk_update's CASE.
+    created_field, updated_field = model._meta.get_field('created_at'), model._meta.get_field('updated_at')
+    stamps = [(obj.created_at, obj.updated_at) for obj in objs]
+    model.objects.bulk_create(objs, batch_size=batch_size)
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(model._meta.db_table)} SET {quote(created_field.column)} = %s, '
+            f'{quote(updated_field.column)} = %s WHERE {quote(model._meta.pk.column)} = %s',
+            [
+                (
+                    created_field.get_db_prep_value(created_at, connection),
+                    updated_field.get_db_prep_value(updated_at, connection),
+                    obj.pk,
+                )
+                for obj, (created_at, updated_at) in zip(objs, stamps)
+            ],
+        )
+    for obj, (created_at, updated_at) in zip(objs, stamps):
+        obj.created_at, obj.updated_at = created_at, updated_at
+
+
+def _moment(rng, now, days):
+    """A random moment between the start of the day ``days - 1`` days ago and ``now``"""
+    if not days:
+        return now
+    window_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    return window_start + timedelta(seconds=rng.random() * (now - window_start).total_seconds())
+
+
+def category_ids():
+    """Ids of the default categories, creating any that are missing, in a fixed order"""
+    tree = ensure_defaults()
+    return [tree.by_name[name].id for name in DEFAULT_CATEGORIES]
+
+
+def fake_product(rng, number=None, seed=0, categories=None):
+    """Build an unsaved product with a plausible grocery name and a valid category and status"""
+    categories = categories or category_ids()
+    name = f'{rng.choice(PRODUCT_WORDS)} {rng.choice(PRODUCT_NOUNS)} {rng.randint(1, 999)}'
+    status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+    return Product(
+        sku=None if number is None else f'{sku_prefix(seed)}{number:08d}',
+        name=name,
+        description=f'{name} from {rng.choice(PRODUCT_WORDS).lower()} local farms',
+        price=Decimal(rng.randint(99, 4999)) / 100,
+        category_id=rng.choice(categories),
+        # About one product in ten is sold out
+        stock_quantity=0 if rng.random() < 0.1 else rng.randint(1, 500),
+        status=status,
+        is_active=status != 'deactive' and rng.random() < 0.95,
+    )
+
+
+def seed_products(count, seed=0, days=0, batch_size=BATCH_SIZE, progress=None):
+    """
+    Insert ``count`` fake products created over the last ``days`` days.
+
+    Returns a Counter of products still active, by creation date.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    categories = category_ids()
+    active_by_day = Counter()
+    for start in range(0, count, batch_size):
+        batch = []
+        for number in range(start, min(start + batch_size, count)):
+            product = fake_product(rng, number, seed, categories)
+            product.created_at = product.updated_at = _moment(rng, now, days)
+            if product.is_active:
+                active_by_day[product.created_at.date()] += 1
+            batch.append(product)
+        with transaction.atomic():
+            _bulk_create_dated(Product, batch, batch_size)
+        if progress:
+            progress('products', start + len(batch), count)
+    return active_by_day
+
+
+def seed_customers(count, seed=0, days=0, batch_size=BATCH_SIZE, progress=None):
+    """
+    Insert ``count`` fake customers and their users, who joined over the last ``days`` days.
+
+    Returns a Counter of new customers by sign-up date.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    prefix = username_prefix(seed)
+    # Sample accounts cannot log in; hash the unusable marker once.
+    password = make_password(None)
+    joined_by_day = Counter()
+    for start in range(0, count, batch_size):
+        numbers = range(start, min(start + batch_size, count))
+        users, customers = [], []
+        for number in numbers:
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            joined = _moment(rng, now, days)
+            joined_by_day[joined.date()] += 1
+            users.append(User(
+                username=f'{prefix}{number}',
+                first_name=first,
+                last_name=last,
+                email=f'{first}.{last}.{number}@example.com'.lower(),
+                password=password,
+                date_joined=joined,
+            ))
+            customers.append(Customer(
+                phone=f'+1-555-{rng.randint(0, 9999):04d}',
+                address=f'{rng.randint(1, 999)} {rng.choice(STREETS)}',
+                date_of_birth=(now - timedelta(days=rng.randint(18 * 365, 80 * 365))).date(),
+                created_at=joined,
+                updated_at=joined,
+            ))
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            for user, customer in zip(users, customers):
+                customer.user = user
+            _bulk_create_dated(Customer, customers, batch_size)
+        if progress:
+            progress('customers', numbers.stop, count)
+    return joined_by_day
+
+
+def seed_orders(count, seed=0, days=0, batch_size=BATCH_SIZE, progress=None):
+    """
+    Insert ``count`` fake orders of one to four lines, placed over the last ``days`` days.
+
+    Orders go to the seed's customers and draw from the seed's products. They
+    bypass the model signals; ``rollups.rebuild_earnings`` counts them.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    customers = list(
+        Customer.objects.filter(user__username__startswith=username_prefix(seed))
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    products = list(
+        Product.objects.filter(sku__startswith=sku_prefix(seed))
+        .order_by('sku').values_list('pk', 'name', 'price')[:ORDER_PRODUCT_POOL]
+    )
+    if not products:
+        return
+    statuses, weights = list(ORDER_STATUS_WEIGHTS), list(ORDER_STATUS_WEIGHTS.values())
+    for start in range(0, count, batch_size):
+        orders, lines = [], []
+        for _ in range(start, min(start + batch_size, count)):
+            items = [
+                OrderItem(product_id=pk, product_name=name, unit_price=price, quantity=rng.randint(1, 3))
+                for pk, name, price in rng.sample(products, min(rng.randint(1, 4), len(products)))
+            ]
+            placed = _moment(rng, now, days)
+            orders.append(Order(
+                customer_id=rng.choice(customers) if customers else None,
+                status=rng.choices(statuses, weights=weights)[0],
+                total=sum((item.line_total for item in items), Decimal(0)),
+                placed_at=placed,
+                created_at=placed,
+                updated_at=placed,
+            ))
+            lines.append(items)
+        with transaction.atomic():
+            _bulk_create_dated(Order, orders, batch_size)
+            for order, items in zip(orders, lines):
+                for item in items:
+                    item.order = order
+            OrderItem.objects.bulk_create([item for items in lines for item in items], batch_size=batch_size)
+        if progress:
+            progress('orders', start + len(orders), count)
+
+
+def seed_stats(days, joined_by_day, active_by_day):
+    """
+    Replace the stats rows of the last ``days`` days with a generated history.
+
+    Customer and product totals follow the generated sign-ups and products on
+    top of what existed before the window. Earnings are carried over from
+    before the window; ``rollups.rebuild_earnings`` fills them in from the
+    order ledger.
+    """
+    today = timezone.now().date()
+    first_day = today - timedelta(days=days - 1)
+
+    previous = DashboardStats.objects.filter(date__lt=first_day).first()
+    total_earnings = previous.total_earnings if previous else Decimal(0)
+    total_customers = Customer.objects.count() - sum(n for d, n in joined_by_day.items() if d >= first_day)
+    total_products = (
+        Product.objects.filter(is_active=True).count()
+        - sum(n for d, n in active_by_day.items() if d >= first_day)
+    )
+
+    # Earnings of the window's first month that fall before the window
+    monthly_earnings = DashboardStats.objects.filter(
+        date__gte=first_day.replace(day=1), date__lt=first_day
+    ).aggregate(total=Sum('daily_earnings'))['total'] or Decimal(0)
+
+    rows = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        if day.day == 1:
+            monthly_earnings = Decimal(0)
+        total_customers += joined_by_day[day]
+        total_products += active_by_day[day]
+        rows.append(DashboardStats(
+            date=day,
+            daily_earnings=0,
+            monthly_earnings=monthly_earnings,
+            total_earnings=total_earnings,
+            new_customers=joined_by_day[day],
+            total_customers=total_customers,
+            total_products=total_products,
+        ))
+
+    with transaction.atomic():
+        DashboardStats.objects.filter(date__gte=first_day, date__lte=today).delete()
+        DashboardStats.objects.bulk_create(rows)
+    return rows
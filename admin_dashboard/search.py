@@ -0,0 +1,120 @@
+"""Product search backends.
+
+``products_list`` asks :func:`get_search_backend` for the backend matching the
+database in use and lets it narrow and rank the product queryset. On SQLite
+the text, including the category name, is copied into an FTS5 table kept in
+sync by triggers on the product and category tables (see migrations 0004 and
+0010), so bulk writes that skip model signals are indexed as well. Other
+databases fall back to the original ``icontains`` filter until a native
+backend (e.g. a Postgres ``tsvector`` column) is added.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Category, Product
+
+FTS_TABLE = 'admin_dashboard_product_fts'
+VOCAB_TABLE = 'admin_dashboard_product_fts_vocab'
+
+# bm25 column weights for (name, description, category)
+COLUMN_WEIGHTS = (10.0, 1.0, 4.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchBackend:
+    """Interface shared by all product search backends"""
+
+    #: Whether ``filter`` orders results by relevance
+    ranked = False
+
+    def filter(self, queryset, query):
+        """Return ``queryset`` narrowed to products matching ``query``"""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Rebuild the search index from the product table"""
+
+    def vocabulary(self):
+        """Yield ``(term, products using it)`` for every searchable word"""
+        raise NotImplementedError
+
+
+class ContainsSearchBackend(SearchBackend):
+    """Substring search with ``icontains``; works everywhere, scans every row"""
+
+    def filter(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query) |
+            Q(category__name__icontains=query)
+        )
+
+    def vocabulary(self):
+        counts = Counter()
+        for text in Product.objects.values_list('name', 'description', 'category__name').iterator():
+            counts.update(set(TOKEN_RE.findall(' '.join(text).lower())))
+        return counts.items()
+
+
+class SQLiteFTSSearchBackend(SearchBackend):
+    """Ranked prefix search over the FTS5 shadow table"""
+
+    ranked = True
+
+    def match_expression(self, query):
+        """Turn free text into an FTS5 query: every word must match as a prefix"""
+        tokens = TOKEN_RE.findall(query.lower())
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def filter(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return ContainsSearchBackend().filter(queryset, query)
+
+        # Join the shadow table (ProductSearchEntry) so SQLite drives the query
+        # from the MATCH and reads bm25 once per hit rather than re-running it
+        # per product row, as a correlated subquery would.
+        weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+        return queryset.filter(search_entry__isnull=False).filter(
+            RawSQL(f'{FTS_TABLE} MATCH %s', [expression], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(f'bm25({FTS_TABLE}, {weights})', [], output_field=FloatField())
+        ).order_by('search_rank', '-created_at')
+
+    def rebuild(self):
+        product_table, category_table = Product._meta.db_table, Category._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, name, description, category) '
+                f'SELECT product.id, product.name, product.description, category.name '
+                f'FROM {product_table} product JOIN {category_table} category ON category.id = product.category_id'
+            )
+
+    def vocabulary(self):
+        # fts5vocab reads the terms straight out of the index (migration 0008)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT term, doc FROM {VOCAB_TABLE}')
+            yield from cursor
+
+
+@lru_cache(maxsize=None)
+def _backend_for(path, vendor):
+    if path:
+        return import_string(path)()
+    if vendor == 'sqlite':
+        return SQLiteFTSSearchBackend()
+    return ContainsSearchBackend()
+
+
+def get_search_backend():
+    """Return the configured backend, or the best one for the current database"""
+    return _backend_for(getattr(settings, 'PRODUCT_SEARCH_BACKEND', None), connection.vendor)
@@ -0,0 +1,160 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from ecommerce import page_cache
+
+from . import categories, orders, result_cache, rollups
+from .fragments import product_fragments
+from .fuzzy import fuzzy_matcher, search_text
+from .models import Category, Product, Customer, Order, OrderItem
+from .suggest import product_suggestions
+
+# Sent after set based product writes (imports, bulk actions) that bypass the
+# per-row model signals, so derived data can catch up in one go.
+products_bulk_changed = Signal()
+
+# An order loaded with deferred fields, whose earnings are not known
+UNKNOWN = object()
+
+
+@receiver(post_init, sender=Product)
+def remember_product_state(sender, instance, **kwargs):
+    """Remember the loaded is_active flag, category and text so saves can report a delta"""
+    # Read through __dict__ so a deferred field is not fetched per instance.
+    instance._loaded_is_active = instance.__dict__.get('is_active') if instance.pk else False
+    instance._loaded_category_id = instance.__dict__.get('category_id') if instance.pk else None
+    instance._loaded_search_text = search_text(instance) if instance.pk else ()
+
+
+def _active_delta(instance, now_active):
+    if instance._loaded_is_active is None:
+        return None
+    return int(now_active) - int(instance._loaded_is_active)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    """Keep the product rollups, category counts and cached pages in step with product saves"""
+    delta = _active_delta(instance, instance.is_active)
+    if delta is None:
+        rollups.rebuild()
+    else:
+        rollups.products_changed(delta)
+    instance._loaded_is_active = instance.is_active
+    if created or instance._loaded_category_id is not None:
+        categories.product_moved(instance._loaded_category_id, instance.category_id)
+    else:
+        categories.recount()
+    instance._loaded_category_id = instance.__dict__.get('category_id')
+    product_fragments.discard(instance.pk)
+    product_suggestions.product_saved(instance)
+    fuzzy_matcher.product_saved(instance, instance._loaded_search_text)
+    instance._loaded_search_text = search_text(instance)
+    result_cache.invalidate()
+    page_cache.invalidate()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    """Uncount deleted products and drop their cached pages"""
+    delta = _active_delta(instance, False)
+    if delta is None:
+        rollups.rebuild()
+    else:
+        rollups.products_changed(delta)
+    category_id = instance.__dict__.get('category_id')
+    if category_id is None:
+        categories.recount()
+    else:
+        categories.product_moved(category_id, None)
+    product_fragments.discard(instance.pk)
+    product_suggestions.product_deleted(instance.pk)
+    fuzzy_matcher.product_deleted(instance)
+    result_cache.invalidate()
+    page_cache.invalidate()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    """Reload the category tree and drop pages that show category names"""
+    categories.invalidate()
+    product_fragments.clear()
+    product_suggestions.invalidate()
+    fuzzy_matcher.invalidate()
+    result_cache.invalidate()
+    page_cache.invalidate()
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, created, **kwargs):
+    """Count newly created customers"""
+    if created:
+        rollups.customer_added(instance)
+
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted(sender, instance, **kwargs):
+    """Uncount deleted customers"""
+    rollups.customer_removed(instance)
+
+
+def _order_earnings(order):
+    """The ``(day, amount)`` an order adds to earnings, None if nothing, or UNKNOWN if a field was deferred"""
+    values = order.__dict__
+    if not all(field in values for field in ('status', 'placed_at', 'total')):
+        return UNKNOWN
+    if values['status'] in Order.EARNING_STATUSES:
+        return values['placed_at'].date(), values['total']
+    return None
+
+
+@receiver(post_init, sender=Order)
+def remember_order_state(sender, instance, **kwargs):
+    """Remember what the loaded order adds to earnings so saves can move the difference"""
+    instance._loaded_earnings = _order_earnings(instance) if instance.pk else None
+
+
+def _order_moved(instance, now):
+    if UNKNOWN in (instance._loaded_earnings, now):
+        rollups.rebuild_earnings()
+    else:
+        rollups.order_changed(instance._loaded_earnings, now)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, **kwargs):
+    """Move the order's earnings as its status, total or day change"""
+    now = _order_earnings(instance)
+    _order_moved(instance, now)
+    instance._loaded_earnings = now
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    """Take a deleted order's earnings back out"""
+    # What the order holds now, which refresh_from_db keeps current
+    instance._loaded_earnings = _order_earnings(instance)
+    _order_moved(instance, None)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, origin=None, **kwargs):
+    """Re-sum the order of an item edited on its own"""
+    # Items deleted along with their order are accounted for by order_deleted.
+    if isinstance(origin, Order) or getattr(origin, 'model', None) is Order:
+        return
+    orders.refresh_total(instance.order_id)
+
+
+@receiver(products_bulk_changed)
+def products_bulk_written(sender, **kwargs):
+    """Recount the product rollup and categories and drop cached pages after a set based write"""
+    rollups.rebuild()
+    categories.recount()
+    product_fragments.clear()
+    product_suggestions.invalidate()
+    fuzzy_matcher.invalidate()
+    result_cache.invalidate()
+    page_cache.invalidate()
@@ -0,0 +1,165 @@
+"""In-process prefix index for the dashboard search typeahead.
+
+Every word position of a product name ("organic whole milk", "whole milk",
+"milk") and every category is kept in one sorted list, so a prefix lookup is a
+binary search followed by a short scan and never touches the database. The
+index is built on the first lookup from the newest ``PRODUCT_SUGGEST_MAX_PRODUCTS``
+products. The ``Product`` signals in ``signals.py`` update it in place, set
+based writes mark it stale, and it is rebuilt after
+``PRODUCT_SUGGEST_MAX_AGE`` seconds so other processes' writes show up too.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import categories
+from .models import Product
+from .search import TOKEN_RE
+
+CATEGORY = 'category'
+
+
+def normalize(text):
+    return ' '.join(TOKEN_RE.findall(text.lower()))
+
+
+def _keys(text):
+    """Every suffix of ``text`` that starts at a word"""
+    words = normalize(text).split()
+    return [' '.join(words[index:]) for index in range(len(words))]
+
+
+class PrefixIndex:
+    """Sorted ``(key, kind, id)`` entries answering prefix lookups"""
+
+    def __init__(self, max_products):
+        self.max_products = max_products
+        self._entries = []
+        self._products = OrderedDict()  # pk -> (name, category, keys), oldest first
+        self._categories = {}  # category -> keys
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._products)
+
+    def load(self, rows):
+        """Replace the contents with ``(pk, name, category)`` rows, newest first"""
+        products = OrderedDict()
+        entries = []
+        for pk, name, category in rows:
+            if len(products) >= self.max_products:
+                break
+            keys = _keys(name)
+            products[pk] = (name, category, keys)
+            entries.extend((key, '', pk) for key in keys)
+        products = OrderedDict(reversed(products.items()))
+        categories = {category: _keys(category) for _, category, _ in products.values()}
+        entries.extend((key, CATEGORY, category) for category, keys in categories.items() for key in keys)
+        entries.sort()
+        with self._lock:
+            self._entries, self._products, self._categories = entries, products, categories
+
+    def add(self, pk, name, category):
+        """Index a new or changed product, evicting the oldest one when full"""
+        with self._lock:
+            current = self._products.get(pk)
+            if current and current[:2] == (name, category):
+                return
+            self._remove(pk)
+            while len(self._products) >= self.max_products:
+                self._remove(next(iter(self._products)))
+            keys = _keys(name)
+            self._products[pk] = (name, category, keys)
+            for key in keys:
+                insort(self._entries, (key, '', pk))
+            if category not in self._categories:
+                self._categories[category] = _keys(category)
+                for key in self._categories[category]:
+                    insort(self._entries, (key, CATEGORY, category))
+
+    def discard(self, pk):
+        with self._lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        product = self._products.pop(pk, None)
+        if product is None:
+            return
+        for key in product[2]:
+            index = bisect_left(self._entries, (key, '', pk))
+            if index < len(self._entries) and self._entries[index] == (key, '', pk):
+                del self._entries[index]
+
+    def lookup(self, prefix, limit=10):
+        """Return ``(products, categories)`` whose name has a word starting with ``prefix``"""
+        prefix = normalize(prefix)
+        products, categories = [], []
+        if not prefix:
+            return products, categories
+        with self._lock:
+            index = bisect_left(self._entries, (prefix,))
+            seen = set()
+            while index < len(self._entries) and len(products) < limit:
+                key, kind, value = self._entries[index]
+                if not key.startswith(prefix):
+                    break
+                index += 1
+                if kind == CATEGORY:
+                    if value not in categories and len(categories) < limit:
+                        categories.append(value)
+                elif value not in seen:
+                    seen.add(value)
+                    name, category, _ = self._products[value]
+                    products.append({'id': value, 'name': name, 'category': category})
+        return products, categories
+
+
+class ProductSuggestions:
+    """The process-wide product prefix index, built on first use"""
+
+    def __init__(self):
+        self._index = None
+        self._built = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        max_age = getattr(settings, 'PRODUCT_SUGGEST_MAX_AGE', 300)
+        with self._lock:
+            if self._index is None or time.monotonic() - self._built > max_age:
+                max_products = getattr(settings, 'PRODUCT_SUGGEST_MAX_PRODUCTS', 50000)
+                index = PrefixIndex(max_products)
+                index.load(
+                    Product.objects.order_by('-created_at', '-id')
+                    .values_list('pk', 'name', 'category__name')[:max_products]
+                    .iterator()
+                )
+                self._index, self._built = index, time.monotonic()
+            return self._index
+
+    def lookup(self, prefix, limit=10):
+        return self.index().lookup(prefix, limit)
+
+    def product_saved(self, product):
+        """Update a built index after ``product`` was saved"""
+        index = self._index
+        if index is None:
+            return
+        if 'name' in product.__dict__ and 'category_id' in product.__dict__:
+            index.add(product.pk, product.name, categories.tree().name(product.category_id))
+        else:
+            self.invalidate()
+
+    def product_deleted(self, pk):
+        if self._index is not None:
+            self._index.discard(pk)
+
+    def invalidate(self):
+        """Rebuild on the next lookup"""
+        with self._lock:
+            self._index = None
+
+
+product_suggestions = ProductSuggestions()
@@ -0,0 +1,50 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from admin_dashboard.images import current_variants
+
+register = template.Library()
+
+
+def _srcset(paths):
+    return ', '.join(
+        f'{default_storage.url(path)} {width}w'
+        for width, path in sorted(paths.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def product_picture(product, sizes='100vw', css_class='', width=None):
+    """
+    Render a product image as a <picture> with WebP and fallback srcsets.
+
+    ``width`` picks the fallback ``src`` for browsers without srcset support;
+    it defaults to the largest derivative. Products whose derivatives have not
+    been rendered yet get the original upload.
+    """
+    if not product.image:
+        return ''
+
+    variants = current_variants(product)
+    if not variants:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async" />',
+            product.image.url, product.name, css_class
+        )
+
+    fallback = variants['fallback']
+    widths = sorted(int(w) for w in fallback)
+    chosen = widths[-1]
+    if width is not None:
+        chosen = next((w for w in widths if w >= int(width)), chosen)
+
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}" />'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async" />'
+        '</picture>',
+        _srcset(variants['webp']), sizes,
+        default_storage.url(fallback[str(chosen)]), _srcset(fallback), sizes,
+        product.name, css_class
+    )
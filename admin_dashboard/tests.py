@@ -1,14 +1,59 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+import asyncio
+import csv
+import json
+import os
+import re
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.text import slugify
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
-from .models import Product
+from .models import Category, Product, Customer, DashboardStats, Order, OrderItem
+from . import categories, result_cache, rollups
+from .search import FTS_TABLE, ContainsSearchBackend, SQLiteFTSSearchBackend
+from .pagination import KeysetPaginator
+from .importers import ProductImporter
+from .images import build_derivatives, current_variants
+from .fragments import product_fragments
+from .concurrency import run_queries
+from .live import KPIBroadcaster
+from .query_budget import QueryBudgetMixin
+from .sample_data import seed_customers, seed_products
+from .orders import place_order
+from .categories import DEFAULT_CATEGORIES
+from .suggest import PrefixIndex, product_suggestions
+from .fuzzy import TrigramIndex, fuzzy_matcher, trigrams
+from .result_cache import product_results
+from .facets import facet_counts
+from .signals import products_bulk_changed
+from .management.commands.benchmark_routes import build_cases, discover_routes
+from ecommerce import urls as project_urls
+from ecommerce.testing import TestCase, TransactionTestCase
+from homepage.catalog import storefront_blocks
+from . import views
 from .forms import ProductForm
 import tempfile
 from PIL import Image
 import io
 
 
+def get_category(name):
+    """Return the category called ``name``, creating it if needed"""
+    return Category.objects.get_or_create(name=name, defaults={'slug': slugify(name)})[0]
+
+
 class ProductCRUDTestCase(TestCase):
     def setUp(self):
         """Set up test data"""
@@ -25,7 +70,7 @@ class ProductCRUDTestCase(TestCase):
             name='Test Product',
             description='Test Description',
             price=19.99,
-            category='Snacks & Munchies',
+            category=get_category('Snacks & Munchies'),
             stock_quantity=100,
             status='active'
         )
@@ -61,7 +106,7 @@ class ProductCRUDTestCase(TestCase):
             'name': 'New Test Product',
             'description': 'New Test Description',
             'price': 29.99,
-            'category': 'Bakery & Biscuits',
+            'category': get_category('Bakery & Biscuits').pk,
             'stock_quantity': 50,
             'status': 'active'
         }
@@ -91,7 +136,7 @@ class ProductCRUDTestCase(TestCase):
             'name': 'Updated Test Product',
             'description': 'Updated Description',
             'price': 39.99,
-            'category': 'Dairy, Bread & Eggs',
+            'category': get_category('Dairy, Bread & Eggs').pk,
             'stock_quantity': 75,
             'status': 'draft'
         }
@@ -126,7 +171,7 @@ class ProductCRUDTestCase(TestCase):
             name='Apple Juice',
             description='Fresh apple juice',
             price=5.99,
-            category='Tea, Coffee & Drinks',
+            category=get_category('Tea, Coffee & Drinks'),
             stock_quantity=30,
             status='active'
         )
@@ -144,7 +189,7 @@ class ProductCRUDTestCase(TestCase):
             name='Draft Product',
             description='Draft product',
             price=15.99,
-            category='Snacks & Munchies',
+            category=get_category('Snacks & Munchies'),
             stock_quantity=20,
             status='draft'
         )
@@ -161,7 +206,7 @@ class ProductCRUDTestCase(TestCase):
             'name': '',  # Required field
             'description': 'Test',
             'price': -10,  # Invalid price
-            'category': 'Snacks & Munchies',
+            'category': get_category('Snacks & Munchies').pk,
             'stock_quantity': -5,  # Invalid stock
             'status': 'active'
         }
@@ -178,7 +223,7 @@ class ProductCRUDTestCase(TestCase):
             'name': 'Product with Image',
             'description': 'Product with test image',
             'price': 25.99,
-            'category': 'Fruits & Vegetables',
+            'category': get_category('Fruits & Vegetables').pk,
             'stock_quantity': 40,
             'status': 'active',
             'image': test_image
@@ -212,3 +257,1370 @@ class ProductModelTestCase(TestCase):
         """Test product status display property"""
         product = Product(status='active')
         self.assertEqual(product.status_display, 'Active')
+
+
+class DashboardRollupTestCase(TestCase):
+    def setUp(self):
+        """Set up a logged in staff user"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        self.client.login(username='staff', password='testpass123')
+
+    def create_customer(self, username):
+        user = User.objects.create(username=username, first_name=username.title())
+        return Customer.objects.create(user=user)
+
+    def create_product(self, name, is_active=True):
+        return Product.objects.create(
+            name=name,
+            description='Rollup product',
+            price=9.99,
+            category=get_category('Snacks & Munchies'),
+            stock_quantity=10,
+            is_active=is_active
+        )
+
+    def test_customer_signals_update_todays_row(self):
+        """Test customers are counted incrementally"""
+        self.create_customer('alice')
+        bob = self.create_customer('bob')
+        stats = DashboardStats.objects.get(date=timezone.now().date())
+        self.assertEqual(stats.total_customers, 2)
+        self.assertEqual(stats.new_customers, 2)
+
+        bob.user.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.total_customers, 1)
+        self.assertEqual(stats.new_customers, 1)
+
+    def test_product_signals_track_active_total(self):
+        """Test active product total follows creates, toggles and deletes"""
+        product = self.create_product('Milk')
+        self.create_product('Bread')
+        self.create_product('Hidden', is_active=False)
+        self.assertEqual(rollups.snapshot()['total_products'], 2)
+
+        product.is_active = False
+        product.save()
+        self.assertEqual(rollups.snapshot()['total_products'], 1)
+
+        Product.objects.get(name='Bread').delete()
+        self.assertEqual(rollups.snapshot()['total_products'], 0)
+
+    def test_snapshot_carries_previous_day_forward(self):
+        """Test a missing row for today is derived from the latest row"""
+        today = timezone.now().date()
+        DashboardStats.objects.create(
+            date=today - timezone.timedelta(days=1),
+            daily_earnings=100,
+            monthly_earnings=250,
+            new_customers=3,
+            total_customers=40,
+            total_products=12
+        )
+        stats = rollups.snapshot(today)
+        self.assertEqual(stats['total_customers'], 40)
+        self.assertEqual(stats['new_customers_2_days'], 3)
+        self.assertEqual(stats['total_products'], 12)
+        expected_monthly = 250 if today.day > 1 else 0
+        self.assertEqual(stats['monthly_earnings'], expected_monthly)
+        self.assertFalse(DashboardStats.objects.filter(date=today).exists())
+
+    def test_dashboard_reads_without_writing(self):
+        """Test dashboard GET does not create stats rows and reads them in one query"""
+        for i in range(3):
+            self.create_customer(f'customer{i}')
+        DashboardStats.objects.all().delete()
+        rollups.rebuild()
+        self.client.get(reverse('dashboard'))
+
+        with self.assertNumQueries(3):
+            # session, user, stats rollup
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_customers'], 3)
+        self.assertEqual(DashboardStats.objects.count(), 1)
+
+
+class ProductSearchBackendTestCase(TestCase):
+    def setUp(self):
+        """Set up a small catalog"""
+        self.backend = SQLiteFTSSearchBackend()
+        self.juice = Product.objects.create(
+            name='Apple Juice', description='Pressed from fresh fruit',
+            price=5.99, category=get_category('Tea, Coffee & Drinks'), stock_quantity=30
+        )
+        self.pie = Product.objects.create(
+            name='Bakery Pie', description='Filled with apple slices',
+            price=7.49, category=get_category('Bakery & Biscuits'), stock_quantity=12
+        )
+        self.chips = Product.objects.create(
+            name='Potato Chips', description='Salted and crunchy',
+            price=1.99, category=get_category('Snacks & Munchies'), stock_quantity=80
+        )
+
+    def search(self, query):
+        return list(self.backend.filter(Product.objects.all(), query))
+
+    def test_prefix_matching(self):
+        """Test partial words match as prefixes"""
+        self.assertEqual(self.search('pot'), [self.chips])
+        self.assertEqual(self.search('SNACK'), [self.chips])
+
+    def test_name_matches_rank_first(self):
+        """Test a hit in the short name outranks a hit in the description"""
+        self.assertEqual(self.search('apple'), [self.juice, self.pie])
+
+    def test_all_words_must_match(self):
+        """Test multi word queries are ANDed"""
+        self.assertEqual(self.search('apple slices'), [self.pie])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test the shadow table is kept in sync by the triggers"""
+        self.chips.name = 'Tortilla Crisps'
+        self.chips.save()
+        self.assertEqual(self.search('potato'), [])
+        self.assertEqual(self.search('tortilla'), [self.chips])
+
+        self.chips.delete()
+        self.assertEqual(self.search('tortilla'), [])
+
+    def test_bulk_writes_are_indexed(self):
+        """Test rows written without model signals are searchable"""
+        Product.objects.filter(pk=self.pie.pk).update(name='Cherry Tart')
+        self.assertEqual(self.search('cherry'), [self.pie])
+
+    def test_punctuation_only_query_falls_back(self):
+        """Test a query without words uses the substring filter"""
+        self.assertEqual(len(self.search('&')), 3)
+        self.assertEqual(self.search('& Biscuits'), [self.pie])
+
+    def test_contains_backend(self):
+        """Test the portable fallback backend"""
+        results = ContainsSearchBackend().filter(Product.objects.all(), 'crunch')
+        self.assertEqual(list(results), [self.chips])
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        """Set up 25 products sharing a timestamp so ties are broken by id"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        self.client.login(username='staff', password='testpass123')
+        Product.objects.bulk_create([
+            Product(
+                name=f'Product {i:02d}',
+                description='Paged product',
+                price=1,
+                category=get_category('Snacks & Munchies' if i % 2 else 'Sweet Tooth'),
+                status='active'
+            )
+            for i in range(25)
+        ])
+        Product.objects.update(created_at=timezone.now())
+        self.newest_first = list(Product.objects.order_by('-created_at', '-pk'))
+        # Warm the category tree so only the view's own queries are counted
+        categories.tree()
+
+    def test_walk_forward_and_back(self):
+        """Test next and previous cursors visit every row exactly once"""
+        paginator = KeysetPaginator(Product.objects.all(), 10)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        self.assertEqual(list(first) + list(second) + list(third), self.newest_first)
+
+        back = paginator.get_page(third.prev_cursor)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(list(paginator.get_page(back.prev_cursor)), list(first))
+        self.assertFalse(paginator.get_page(back.prev_cursor).has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Test tampered cursors fall back to the first page"""
+        page = KeysetPaginator(Product.objects.all(), 10).get_page('not-a-cursor')
+        self.assertEqual(list(page), self.newest_first[:10])
+
+    def test_products_list_cursor_keeps_filters(self):
+        """Test cursor pages respect the category filter"""
+        response = self.client.get(reverse('products_list'), {'category': 'sweet-tooth'})
+        page = response.context['page_obj']
+        self.assertTrue(response.context['cursor_pagination'])
+        self.assertEqual(response.context['total_products'], 13)
+        self.assertContains(response, f'?cursor={page.next_cursor}&category=sweet-tooth')
+
+        response = self.client.get(reverse('products_list'), {'category': 'sweet-tooth', 'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertTrue(all(p.category.name == 'Sweet Tooth' for p in response.context['page_obj']))
+
+    def test_products_list_query_count_is_flat(self):
+        """Test a deep cursor page runs the same queries as the first page"""
+        self.client.get(reverse('products_list'))
+        # Start a new result cache generation so both pages are fetched
+        result_cache.invalidate()
+        with self.assertNumQueries(5):
+            # session, user, page rows, one count, facet counts
+            first = self.client.get(reverse('products_list'))
+        result_cache.invalidate()
+        with self.assertNumQueries(5):
+            self.client.get(reverse('products_list'), {'cursor': first.context['page_obj'].next_cursor})
+
+    def test_numbered_pages_still_work(self):
+        """Test ?page= keeps offset pagination with a single count"""
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('products_list'), {'page': 3})
+        self.assertFalse(response.context['cursor_pagination'])
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+
+class QueryPlanTestCase(TestCase):
+    """Run EXPLAIN QUERY PLAN over every catalog query a view issues"""
+
+    TABLES = ('admin_dashboard_product', 'admin_dashboard_customer')
+    FULL_SCAN = re.compile(r'^SCAN (admin_dashboard_product|admin_dashboard_customer)$')
+
+    def setUp(self):
+        """Set up a logged in user and a little data in every table"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        self.client.login(username='staff', password='testpass123')
+        for i in range(3):
+            Customer.objects.create(user=User.objects.create(username=f'customer{i}'))
+            Product.objects.create(
+                name=f'Planned {i}', description='Plan product', price=2,
+                category=get_category('Sweet Tooth'), stock_quantity=5
+            )
+        self.product = Product.objects.first()
+
+    def query_plans(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if sql.startswith('SELECT') and any(table in sql for table in self.TABLES):
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return response, plans
+
+    def assertNoFullScans(self, url, params=None):
+        response, plans = self.query_plans(url, params)
+        for sql, plan in plans:
+            for step in plan:
+                self.assertIsNone(self.FULL_SCAN.match(step), f'Full scan in {plan} for {sql}')
+                # Sorting every match is only expected when ordering by search rank
+                if FTS_TABLE not in sql:
+                    self.assertNotIn('TEMP B-TREE', step, f'Unindexed sort in {plan} for {sql}')
+        return response
+
+    def test_dashboard(self):
+        self.assertNoFullScans(reverse('dashboard'))
+
+    def test_products_list_filters(self):
+        for params in [
+            {},
+            {'status': 'active'},
+            {'category': 'sweet-tooth'},
+            {'status': 'draft', 'category': 'sweet-tooth'},
+            {'search': 'planned'},
+            {'page': 1},
+        ]:
+            with self.subTest(params=params):
+                self.assertNoFullScans(reverse('products_list'), params)
+
+    def test_products_list_cursor_pages(self):
+        Product.objects.bulk_create([
+            Product(name=f'Extra {i}', description='x', price=1, category=get_category('Sweet Tooth'))
+            for i in range(20)
+        ])
+        first = self.client.get(reverse('products_list'), {'category': 'sweet-tooth'})
+        cursor = first.context['page_obj'].next_cursor
+        self.assertNoFullScans(reverse('products_list'), {'category': 'sweet-tooth', 'cursor': cursor})
+        self.assertNoFullScans(reverse('products_list'), {'cursor': cursor})
+
+    def test_customers_list(self):
+        self.assertNoFullScans(reverse('customers_list'))
+
+    def test_product_detail(self):
+        self.assertNoFullScans(reverse('product_detail', kwargs={'pk': self.product.pk}))
+        self.assertNoFullScans(reverse('edit_product', kwargs={'pk': self.product.pk}))
+
+
+class CustomerListExportTestCase(TestCase):
+    def setUp(self):
+        """Set up a logged in user and a few customers"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        self.client.login(username='staff', password='testpass123')
+        for first, last, phone in [('Bonnie', 'Howe', '555-0101'), ('Judy', 'Nelson', ''), ('John', 'Mattox', '555-0199')]:
+            user = User.objects.create(
+                username=first.lower(), first_name=first, last_name=last,
+                email=f'{first.lower()}@example.com'
+            )
+            Customer.objects.create(user=user, phone=phone)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_customers'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_customers_list_renders_and_filters(self):
+        """Test the customer list shows rows and applies the search"""
+        response = self.client.get(reverse('customers_list'))
+        self.assertContains(response, 'bonnie@example.com')
+        self.assertEqual(response.context['total_customers'], 3)
+
+        response = self.client.get(reverse('customers_list'), {'search': 'mattox'})
+        self.assertContains(response, 'john@example.com')
+        self.assertNotContains(response, 'bonnie@example.com')
+        self.assertEqual(response.context['total_customers'], 1)
+
+    def test_customers_list_is_paginated(self):
+        """Test the list renders one page and a next cursor"""
+        Customer.objects.bulk_create([
+            Customer(user=User.objects.create(username=f'bulk{i}')) for i in range(25)
+        ])
+        response = self.client.get(reverse('customers_list'))
+        self.assertEqual(len(response.context['customers']), 20)
+        self.assertTrue(response.context['page_obj'].has_next())
+
+    def test_csv_export(self):
+        """Test the CSV export streams a header and one line per customer"""
+        lines = self.export(format='csv').splitlines()
+        self.assertEqual(lines[0], 'id,first_name,last_name,email,phone,address,date_of_birth,joined')
+        self.assertEqual(len(lines), 4)
+        self.assertIn('Bonnie,Howe,bonnie@example.com,555-0101', lines[1])
+
+    def test_jsonl_export_respects_filters(self):
+        """Test the JSONL export applies the list filters"""
+        lines = self.export(format='jsonl', search='555-01').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['first_name'] for r in records], ['Bonnie', 'John'])
+        self.assertEqual(set(records[0]), {'id', 'first_name', 'last_name', 'email', 'phone', 'address', 'date_of_birth', 'joined'})
+
+    def test_export_uses_one_query(self):
+        """Test the export reads customers with a single projected query"""
+        response = self.client.get(reverse('export_customers'), {'format': 'csv'})
+        with self.assertNumQueries(1):
+            content = b''.join(response.streaming_content)
+        self.assertEqual(len(content.splitlines()), 4)
+
+
+class ProductImportTestCase(TestCase):
+    CSV_FEED = (
+        'sku,name,description,price,category,stock_quantity,status\n'
+        'SKU-1,Whole Milk,Fresh milk,3.99,"Dairy, Bread & Eggs",50,active\n'
+        'SKU-2,Rye Bread,Sourdough rye,4.50,"Dairy, Bread & Eggs",20,draft\n'
+        'SKU-3,X,Too short,-1,Unknown,-5,active\n'
+        ',Oat Cookies,Crunchy oat cookies,2.25,Bakery & Biscuits,,\n'
+    )
+
+    def setUp(self):
+        """Set up a logged in user"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        self.client.login(username='staff', password='testpass123')
+
+    def run_import(self, content, file_format='csv', **kwargs):
+        return ProductImporter(**kwargs).run(io.StringIO(content), file_format)
+
+    def test_csv_import_validates_and_creates(self):
+        """Test valid rows are created and invalid ones reported with their line"""
+        result = self.run_import(self.CSV_FEED)
+        self.assertEqual((result.created, result.updated), (3, 0))
+        self.assertEqual(len(result.errors), 1)
+        line_number, errors = result.errors[0]
+        self.assertEqual(line_number, 4)
+        self.assertEqual(set(errors), {'name', 'price', 'category', 'stock_quantity'})
+        self.assertEqual(errors['price'], 'Price must be greater than 0.')
+
+        cookies = Product.objects.get(name='Oat Cookies')
+        self.assertIsNone(cookies.sku)
+        self.assertEqual((cookies.stock_quantity, cookies.status), (0, 'active'))
+
+    def test_reimport_upserts_on_sku(self):
+        """Test rows with a known SKU update the existing product"""
+        self.run_import(self.CSV_FEED)
+        milk = Product.objects.get(sku='SKU-1')
+        feed = (
+            '{"sku": "SKU-1", "name": "Whole Milk", "description": "Fresh milk", "price": "4.29",'
+            ' "category": "Dairy, Bread & Eggs", "stock_quantity": 80}\n'
+            '\n'
+            'not json\n'
+            '{"sku": "SKU-9", "name": "Paneer", "description": "Soft paneer", "price": 6,'
+            ' "category": "Dairy, Bread & Eggs", "stock_quantity": 5}\n'
+        )
+        result = self.run_import(feed, 'jsonl', batch_size=2)
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual(result.errors, [(3, {'row': 'Could not parse this line.'})])
+
+        milk_after = Product.objects.get(sku='SKU-1')
+        self.assertEqual(milk_after.pk, milk.pk)
+        self.assertEqual((str(milk_after.price), milk_after.stock_quantity), ('4.29', 80))
+        self.assertEqual(milk_after.created_at, milk.created_at)
+
+    def test_duplicate_skus_in_a_batch_keep_the_last_row(self):
+        """Test repeated SKUs in one batch resolve to the later row"""
+        feed = (
+            'sku,name,description,price,category,stock_quantity\n'
+            'DUP,First,First row,1,Sweet Tooth,1\n'
+            'DUP,Second,Second row,2,Sweet Tooth,2\n'
+        )
+        result = self.run_import(feed)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(Product.objects.get(sku='DUP').name, 'Second')
+
+    def test_dry_run_writes_nothing(self):
+        """Test a dry run only validates"""
+        result = self.run_import(self.CSV_FEED, dry_run=True)
+        self.assertEqual(result.created, 3)
+        self.assertFalse(Product.objects.exists())
+
+    def test_import_refreshes_rollups(self):
+        """Test the active product rollup sees bulk imported rows"""
+        self.run_import(self.CSV_FEED)
+        self.assertEqual(rollups.snapshot()['total_products'], 3)
+
+    def test_dashboard_upload(self):
+        """Test the dashboard import view"""
+        upload = SimpleUploadedFile('feed.csv', self.CSV_FEED.encode(), content_type='text/csv')
+        response = self.client.post(reverse('import_products'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Imported 3 products (3 new, 0 updated).')
+        self.assertContains(response, 'Price must be greater than 0.')
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_unreadable_feeds_are_reported(self):
+        """Test non UTF-8 and malformed CSV feeds become form and command errors"""
+        latin1 = 'sku,name,description,price,category,stock_quantity\nL-1,Crème,Brûlée,2,Sweet Tooth,1\n'
+        upload = SimpleUploadedFile('feed.csv', latin1.encode('latin-1'), content_type='text/csv')
+        response = self.client.post(reverse('import_products'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'The file is not UTF-8 encoded')
+        self.assertFalse(Product.objects.exists())
+
+        oversized = 'sku,name\nX,"' + 'x' * (csv.field_size_limit() + 1) + '"\n'
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as feed:
+            feed.write(oversized)
+        self.addCleanup(os.remove, feed.name)
+        with self.assertRaisesMessage(CommandError, 'The file is not valid CSV'):
+            call_command('import_products', feed.name, stdout=io.StringIO())
+
+
+class BulkProductActionTestCase(TestCase):
+    def setUp(self):
+        """Set up a logged in user and a mixed catalog"""
+        self.client = Client()
+        self.user = User.objects.create_user(username='staff', password='testpass123')
+        self.client.login(username='staff', password='testpass123')
+        self.products = [
+            Product.objects.create(
+                name=f'{kind} {i}', description='Bulk product', price=3,
+                category=get_category('Sweet Tooth' if kind == 'Candy' else 'Frozen Veg'),
+                stock_quantity=10, status='active'
+            )
+            for kind in ('Candy', 'Peas') for i in range(3)
+        ]
+        self.candy_ids = [p.pk for p in self.products[:3]]
+
+    def post(self, data, ajax=True):
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if ajax else {}
+        return self.client.post(reverse('bulk_product_action'), data, **headers)
+
+    def test_deactivate_selected_ids(self):
+        """Test deactivating a list of IDs in one request"""
+        response = self.post({'action': 'deactivate', 'ids': self.candy_ids[:2]})
+        self.assertEqual(response.json()['affected'], 2)
+        self.assertEqual(Product.objects.filter(is_active=False).count(), 2)
+        self.assertEqual(rollups.snapshot()['total_products'], 4)
+
+    def test_adjust_stock_is_set_based_and_floored(self):
+        """Test stock adjustments run as one UPDATE and never go negative"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.post({'action': 'adjust_stock', 'stock_delta': -15, 'ids': self.candy_ids})
+        self.assertEqual(response.json()['affected'], 3)
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "admin_dashboard_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(Product.objects.filter(pk__in=self.candy_ids).values_list('stock_quantity', flat=True)), {0})
+
+        self.post({'action': 'adjust_stock', 'stock_delta': 5, 'ids': self.candy_ids})
+        self.assertEqual(Product.objects.get(pk=self.candy_ids[0]).stock_quantity, 5)
+
+    def test_select_all_matching_filter(self):
+        """Test select_all applies to every product matching the filters"""
+        response = self.post({
+            'action': 'set_status', 'status': 'draft', 'select_all': 'on',
+            'filter-search': 'peas', 'filter-category': 'frozen-veg',
+        })
+        self.assertEqual(response.json()['affected'], 3)
+        self.assertEqual(
+            set(Product.objects.filter(status='draft').values_list('name', flat=True)),
+            {'Peas 0', 'Peas 1', 'Peas 2'}
+        )
+
+    def test_change_category_and_delete(self):
+        """Test category changes and deletes"""
+        self.post({'action': 'set_category', 'category': get_category('Instant Food').pk, 'ids': self.candy_ids})
+        self.assertEqual(Product.objects.filter(category=get_category('Instant Food')).count(), 3)
+
+        response = self.post({'action': 'delete', 'select_all': 'on', 'filter-category': 'instant-food'})
+        self.assertEqual(response.json()['affected'], 3)
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(rollups.snapshot()['total_products'], 3)
+
+    def test_delete_keeps_order_lines_of_ordered_products(self):
+        """Test deleting ordered products detaches their order lines"""
+        order = place_order(None, [(Product.objects.get(pk=self.candy_ids[0]), 1)])
+        response = self.post({'action': 'delete', 'ids': self.candy_ids[:1]})
+        self.assertEqual(response.json()['affected'], 1)
+        item = order.items.get()
+        self.assertIsNone(item.product_id)
+        self.assertEqual(item.product_name, 'Candy 0')
+        self.assertEqual(Order.objects.get().total, 3)
+
+    def test_delete_drops_the_products_words_from_the_fuzzy_index(self):
+        """Test bulk deletes go through post_delete like single deletes"""
+        fuzzy_matcher.invalidate()
+        self.addCleanup(fuzzy_matcher.invalidate)
+        index = fuzzy_matcher.index()
+        self.post({'action': 'delete', 'ids': self.candy_ids})
+        self.assertIs(fuzzy_matcher.index(), index)
+        self.assertNotIn('candy', index._frequency)
+
+    def test_invalid_requests(self):
+        """Test missing selections and values are rejected"""
+        response = self.post({'action': 'set_status', 'ids': self.candy_ids})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json()['errors'])
+
+        response = self.post({'action': 'delete'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post({'action': 'delete', 'select_all': 'on', 'filter-status': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.objects.count(), 6)
+
+    def test_form_post_redirects_with_message(self):
+        """Test a regular form post redirects back to the filtered list"""
+        response = self.post({'action': 'activate', 'ids': self.candy_ids, 'filter-status': 'active'}, ajax=False)
+        self.assertRedirects(response, reverse('products_list') + '?status=active')
+
+    def test_toggle_product_status(self):
+        """Test the single product toggle flips the flag in the database"""
+        url = reverse('toggle_product_status', kwargs={'pk': self.candy_ids[0]})
+        response = self.client.post(url)
+        self.assertEqual(response.json()['is_active'], False)
+        self.assertEqual(rollups.snapshot()['total_products'], 5)
+        response = self.client.post(url)
+        self.assertEqual(response.json()['is_active'], True)
+        self.assertEqual(rollups.snapshot()['total_products'], 6)
+
+        response = self.client.post(reverse('toggle_product_status', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_toggle_drops_the_product_from_the_storefront(self):
+        """Test a deactivated product leaves the cached storefront blocks and pages"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.assertIn('Candy 0', self.client.get(reverse('home')).content.decode())
+        with mock.patch.object(rollups, 'rebuild') as rebuild:
+            self.client.post(reverse('toggle_product_status', kwargs={'pk': self.candy_ids[0]}))
+        # One product moves the rollups by a delta rather than recounting
+        rebuild.assert_not_called()
+        featured = [product.name for product in storefront_blocks()['featured']]
+        self.assertNotIn('Candy 0', featured)
+        self.assertNotContains(self.client.get(reverse('home')), 'Candy 0')
+
+
+@override_settings(PRODUCT_IMAGE_ASYNC=False)
+class ProductImageDerivativeTestCase(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.settings_override = override_settings(MEDIA_ROOT=media.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        User.objects.create_user(username='imager', password='testpass123')
+        self.client = Client()
+        self.client.login(username='imager', password='testpass123')
+
+    def upload(self, size=(800, 600), mode='RGB', image_format='JPEG', name='photo.jpg'):
+        buffer = io.BytesIO()
+        Image.new(mode, size, 'red').save(buffer, image_format)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+    def create(self, **upload_kwargs):
+        data = {
+            'name': 'Pictured Product',
+            'description': 'Has a photo',
+            'price': 5,
+            'category': get_category('Snacks & Munchies').pk,
+            'stock_quantity': 3,
+            'status': 'active',
+            'image': self.upload(**upload_kwargs),
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('create_product'), data)
+        self.assertEqual(response.status_code, 302)
+        return Product.objects.get(name='Pictured Product')
+
+    def test_upload_renders_derivatives_after_commit(self):
+        """Saving the form records resized JPEG and WebP renditions without upscaling"""
+        product = self.create()
+        variants = current_variants(product)
+        self.assertIsNotNone(variants)
+        self.assertEqual(sorted(variants['webp'], key=int), ['160', '320', '640'])
+        with Image.open(f"{settings.MEDIA_ROOT}/{variants['webp']['320']}") as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (320, 240)))
+        self.assertTrue(variants['fallback']['640'].endswith('.jpg'))
+
+    def test_transparent_upload_keeps_png_fallback(self):
+        product = self.create(mode='RGBA', image_format='PNG', name='logo.png', size=(200, 100))
+        variants = current_variants(product)
+        self.assertEqual(list(variants['fallback']), ['160'])
+        self.assertTrue(variants['fallback']['160'].endswith('.png'))
+
+    def test_stale_render_is_discarded(self):
+        """A render for an image that has since been replaced is not recorded"""
+        product = self.create()
+        old_name = product.image.name
+        product.image = 'products/other.jpg'
+        product.save()
+        self.assertIsNone(build_derivatives(product.pk, old_name))
+        self.assertIsNone(current_variants(Product.objects.get(pk=product.pk)))
+
+    def test_storefront_picks_up_derivatives(self):
+        """Recording the derivatives refreshes the cached storefront"""
+        cache.clear()
+        self.addCleanup(cache.clear)
+        product = self.create()
+        Product.objects.filter(pk=product.pk).update(image_variants=None)
+        self.assertNotContains(self.client.get(reverse('home')), 'image/webp')
+        with mock.patch.object(rollups, 'rebuild') as rebuild:
+            build_derivatives(product.pk, product.image.name)
+        rebuild.assert_not_called()
+        self.assertContains(self.client.get(reverse('home')), '<source type="image/webp"')
+
+    def test_detail_page_serves_srcset(self):
+        product = self.create()
+        response = self.client.get(reverse('product_detail', args=[product.pk]))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, '320w')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_backfill_command_renders_missing_derivatives(self):
+        product = self.create()
+        Product.objects.filter(pk=product.pk).update(image_variants=None)
+        call_command('build_image_derivatives', workers=1, stdout=io.StringIO())
+        self.assertIsNotNone(current_variants(Product.objects.get(pk=product.pk)))
+
+    def test_picture_falls_back_to_original_without_derivatives(self):
+        product = self.create()
+        Product.objects.filter(pk=product.pk).update(image_variants=None)
+        response = self.client.get(reverse('products_list'))
+        self.assertContains(response, product.image.url)
+        self.assertNotContains(response, 'image/webp')
+
+
+class ProductDetailCachingTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='viewer', password='testpass123')
+        self.client = Client()
+        self.client.login(username='viewer', password='testpass123')
+        self.product = Product.objects.create(
+            name='Cached Product', description='d', price=3, category=get_category('Snacks & Munchies'), stock_quantity=1
+        )
+        self.url = reverse('product_detail', args=[self.product.pk])
+        product_fragments.clear()
+
+    def test_validators_come_from_updated_at(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Cached Product')
+        self.assertIn('ETag', response)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        with CaptureQueriesContext(connection) as queries:
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertFalse(any(query['sql'].startswith('SELECT "admin_dashboard_product"."id"') for query in queries))
+
+        by_date = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(by_date.status_code, 304)
+
+    def test_fragment_is_rendered_once_per_version(self):
+        self.client.get(self.url)
+        hits = product_fragments.hits
+        self.client.get(self.url)
+        self.assertEqual(product_fragments.hits, hits + 1)
+
+        self.product.name = 'Renamed Product'
+        self.product.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Renamed Product')
+        self.assertNotContains(response, 'Cached Product')
+
+    def test_edit_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.product.price = 4
+        self.product.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_missing_product_is_404(self):
+        self.assertEqual(self.client.get(reverse('product_detail', args=[999999])).status_code, 404)
+
+
+class AsyncURLConf:
+    """The project URLs with the dashboard listings routed to their async views"""
+    urlpatterns = [
+        path('dashboard/products/', views.products_list_async),
+        path('dashboard/customers/', views.customers_list_async),
+    ] + project_urls.urlpatterns
+
+
+# Worker thread connections can't see a TestCase transaction, so these run the
+# async views with their queries on the request's own connection.
+@override_settings(ROOT_URLCONF=AsyncURLConf, CONCURRENT_VIEW_QUERIES=False)
+class AsyncDashboardViewsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='async', password='testpass123')
+        for index in range(3):
+            Product.objects.create(
+                name=f'Async Product {index}', description='d', price=1, category=get_category('Snacks & Munchies')
+            )
+        rollups.rebuild()
+
+    async def test_async_views_render_the_same_pages(self):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+
+        response = await client.get('/dashboard/products/')
+        self.assertContains(response, 'Async Product 2')
+        self.assertEqual(response.context['total_products'], 3)
+
+        ranked = await client.get('/dashboard/products/', {'search': 'Async', 'page': '1'})
+        self.assertEqual(ranked.context['total_products'], 3)
+        self.assertFalse(ranked.context['cursor_pagination'])
+
+        response = await client.get('/dashboard/')
+        self.assertEqual(response.context['total_products'], 3)
+
+        response = await client.get('/dashboard/customers/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_customers'], 0)
+
+    async def test_async_views_require_login(self):
+        response = await AsyncClient().get('/dashboard/products/')
+        self.assertEqual(response.status_code, 302)
+
+
+class ConcurrentQueriesTestCase(TransactionTestCase):
+    async def test_queries_run_on_separate_threads(self):
+        category = await Category.objects.acreate(name='Threaded', slug='threaded')
+        await Product.objects.acreate(name='Threaded', description='d', price=1, category=category)
+
+        def slow_count():
+            time.sleep(0.2)
+            return threading.get_ident(), Product.objects.count()
+
+        started = time.perf_counter()
+        results = await run_queries({'first': slow_count, 'second': slow_count})
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(results['first'][1], 1)
+        self.assertEqual(results['second'][1], 1)
+        self.assertNotEqual(results['first'][0], results['second'][0])
+        self.assertLess(elapsed, 0.35)
+
+
+class LiveKPITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='live', password='testpass123')
+        self.client.force_login(self.user)
+        Product.objects.create(name='Live Product', description='d', price=1, category=get_category('Snacks & Munchies'))
+        rollups.rebuild()
+
+    def test_kpi_endpoint_reads_the_snapshot_once_per_interval(self):
+        response = self.client.get(reverse('dashboard_kpis'))
+        self.assertEqual(response.json()['total_products'], 1)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('dashboard_kpis'))
+        self.assertFalse([q for q in queries if 'dashboardstats' in q['sql'].lower()])
+
+    def test_kpi_endpoint_requires_login(self):
+        self.assertEqual(Client().get(reverse('dashboard_kpis')).status_code, 302)
+
+    def test_dashboard_links_the_kpi_endpoint(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'data-kpi-url="%s"' % reverse('dashboard_kpis'))
+        self.assertContains(response, 'data-kpi="total_customers"')
+
+    @override_settings(DASHBOARD_KPI_INTERVAL=0.01)
+    def test_broadcaster_computes_once_per_tick_for_all_subscribers(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {'total_products': 1 if len(calls) < 3 else 2}
+
+        broadcaster = KPIBroadcaster(fetch)
+
+        async def read(stream, count):
+            return [await stream.__anext__() for _ in range(count)]
+
+        async def main():
+            first, second = broadcaster.subscribe(), broadcaster.subscribe()
+            messages = await asyncio.gather(read(first, 4), read(second, 4))
+            self.assertEqual(broadcaster.subscribers, 2)
+            await first.aclose()
+            await second.aclose()
+            return messages
+
+        first, second = asyncio.run(main())
+        self.assertEqual(broadcaster.subscribers, 0)
+        # One computation per tick, however many clients are listening
+        self.assertEqual(len(calls), 3)
+        for messages in (first, second):
+            self.assertTrue(messages[0].startswith('retry: 10'))
+            self.assertEqual(messages[1], 'event: kpis\ndata: {"total_products": 1}\n\n')
+            self.assertEqual(messages[2], ': keep-alive\n\n')
+            self.assertEqual(messages[3], 'event: kpis\ndata: {"total_products": 2}\n\n')
+
+
+class PopulateSampleDataTestCase(TestCase):
+    def populate(self, **options):
+        call_command('populate_sample_data', stdout=io.StringIO(), **options)
+
+    def test_generates_valid_rows_and_a_consistent_history(self):
+        self.populate(products=60, customers=40, days=10, seed=7, batch_size=25)
+
+        self.assertEqual(Product.objects.count(), 60)
+        self.assertEqual(Customer.objects.count(), 40)
+        categories = set(DEFAULT_CATEGORIES)
+        statuses = {choice for choice, _ in Product.STATUS_CHOICES}
+        for category, status in Product.objects.values_list('category__name', 'status'):
+            self.assertIn(category, categories)
+            self.assertIn(status, statuses)
+
+        rows = list(DashboardStats.objects.order_by('date'))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(sum(row.new_customers for row in rows), 40)
+        self.assertEqual(rows[-1].date, timezone.now().date())
+        self.assertEqual(rows[-1].total_customers, 40)
+        self.assertEqual(rows[-1].total_products, Product.objects.filter(is_active=True).count())
+        # Earnings are exactly the generated orders that earn
+        self.assertEqual(Order.objects.count(), 300)
+        earned = Order.objects.filter(status__in=Order.EARNING_STATUSES).aggregate(total=Sum('total'))['total']
+        self.assertEqual(rows[-1].total_earnings, earned)
+        self.assertEqual(sum(row.daily_earnings for row in rows), earned)
+        # Sign-ups are spread over the window
+        day_ago = timezone.now() - timezone.timedelta(days=1)
+        for model in (Customer, Product, Order):
+            self.assertTrue(model.objects.filter(created_at__lt=day_ago, updated_at__lt=day_ago).exists())
+
+    def test_same_seed_yields_the_same_data(self):
+        self.populate(products=20, customers=10, days=5, seed=1)
+        first = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'category', 'status'))
+        Product.objects.all().delete()
+        User.objects.all().delete()
+
+        self.populate(products=20, customers=10, days=5, seed=1)
+        second = list(Product.objects.order_by('sku').values_list('sku', 'name', 'price', 'category', 'status'))
+        self.assertEqual(first, second)
+
+    def test_refuses_to_reuse_a_seed(self):
+        self.populate(products=1, customers=1, days=0, seed=2)
+        with self.assertRaises(CommandError):
+            self.populate(products=1, customers=1, days=0, seed=2)
+        self.populate(products=1, customers=1, days=0, seed=3)
+        self.assertEqual(Product.objects.count(), 2)
+
+
+class BenchmarkRoutesTestCase(TestCase):
+    def test_every_named_route_gets_a_case(self):
+        labels = {case.label.split(' ', 1)[1] for case in build_cases()}
+        for route, name in discover_routes():
+            if name and name != 'logout':
+                self.assertIn(name, labels)
+        paths = {case.label: case.path for case in build_cases()}
+        self.assertEqual(paths['GET product_detail'], '/dashboard/products/{pk}/')
+        self.assertEqual(paths['POST toggle_product_status'], '/dashboard/products/{pk}/toggle-status/')
+
+
+# (label, method, url name, takes a product id, query string, max queries, max rows fetched).
+# Every request also spends one query and row each on the session and the user.
+# products_list adds one facet query of at most categories x statuses (33) rows.
+# Saving a product loads and checks its category; deleting one moves its category count
+# and detaches its order lines.
+VIEW_BUDGETS = [
+    ('dashboard', 'get', 'dashboard', False, '', 3, 3),
+    ('products_list', 'get', 'products_list', False, '', 5, 47),
+    ('products_list search', 'get', 'products_list', False, '?search=organic', 5, 47),
+    ('products_list status', 'get', 'products_list', False, '?status=active', 5, 47),
+    ('products_list category', 'get', 'products_list', False, '?category=instant-food', 5, 47),
+    ('products_list status+category', 'get', 'products_list', False, '?status=active&category=instant-food', 5, 47),
+    ('products_list search+status+category', 'get', 'products_list', False,
+     '?search=organic&status=active&category=instant-food', 5, 47),
+    ('products_list page 2', 'get', 'products_list', False, '?page=2', 5, 47),
+    ('customers_list', 'get', 'customers_list', False, '', 4, 24),
+    ('customers_list search', 'get', 'customers_list', False, '?search=smith', 4, 24),
+    ('customers_list joined', 'get', 'customers_list', False, '?joined_from=2000-01-01&joined_to=2100-01-01', 4, 24),
+    ('product_detail', 'get', 'product_detail', True, '', 4, 4),
+    ('edit_product form', 'get', 'edit_product', True, '', 3, 3),
+    ('edit_product save', 'post', 'edit_product', True, '', 6, 5),
+    ('delete_product confirm', 'get', 'delete_product', True, '', 3, 3),
+    ('delete_product', 'post', 'delete_product', True, '', 8, 4),
+]
+
+
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='budget', password='testpass123')
+        self.client.force_login(self.user)
+
+    def prepare(self, method, name, takes_product, query):
+        """Return a function sending the request, with caches cleared to measure the uncached path"""
+        cache.clear()
+        product_fragments.clear()
+        categories.tree()
+        product = Product.objects.filter(is_active=True).order_by('pk').first()
+        url = reverse(name, args=[product.pk] if takes_product else []) + query
+        data = {}
+        if method == 'post' and name == 'edit_product':
+            data = {
+                'name': product.name, 'description': 'Budget', 'price': '1.00',
+                'category': product.category_id, 'stock_quantity': 1, 'status': 'active',
+            }
+        return lambda: getattr(self.client, method)(url, data)
+
+    def assertBudgetsHold(self, rows):
+        for label, method, name, takes_product, query, max_queries, max_rows in VIEW_BUDGETS:
+            with self.subTest(view=label, rows=rows):
+                send = self.prepare(method, name, takes_product, query)
+                with self.assertWithinBudget(f'{label} ({rows} rows)', max_queries, max_rows):
+                    response = send()
+                self.assertLess(response.status_code, 400)
+
+    def test_budgets_hold_from_10_to_10000_rows(self):
+        seed_products(10, seed=1)
+        seed_customers(10, seed=1)
+        rollups.rebuild()
+        self.assertBudgetsHold(10)
+
+        # Anything that scales with the data shows up as extra queries or rows.
+        seed_products(9990, seed=2)
+        seed_customers(9990, seed=2)
+        rollups.rebuild()
+        self.assertBudgetsHold(10000)
+
+
+class ProductSuggestTestCase(TestCase):
+    def setUp(self):
+        product_suggestions.invalidate()
+        self.addCleanup(product_suggestions.invalidate)
+        self.client = Client()
+        self.user = User.objects.create_user(username='suggest', password='testpass123')
+        self.client.force_login(self.user)
+        self.milk = Product.objects.create(
+            name='Organic Whole Milk', description='d', price=1, category=get_category('Dairy, Bread & Eggs')
+        )
+        self.chips = Product.objects.create(name='Salted Chips', description='d', price=1, category=get_category('Snacks & Munchies'))
+
+    def suggest(self, query):
+        return self.client.get(reverse('product_suggest'), {'q': query}).json()
+
+    def test_matches_any_word_prefix_and_categories(self):
+        data = self.suggest('who')
+        self.assertEqual([p['name'] for p in data['products']], ['Organic Whole Milk'])
+        self.assertEqual(data['products'][0]['url'], reverse('product_detail', args=[self.milk.pk]))
+        self.assertEqual(self.suggest('MILK')['products'][0]['id'], self.milk.pk)
+        self.assertEqual(self.suggest('snack')['categories'], ['Snacks & Munchies'])
+        self.assertEqual(self.suggest('zzz'), {'products': [], 'categories': []})
+
+    def test_lookups_do_not_touch_the_database(self):
+        self.suggest('org')
+        # Only the session and user lookups remain
+        with self.assertNumQueries(2):
+            self.suggest('salt')
+
+    def test_signals_keep_the_index_current(self):
+        self.suggest('org')
+        self.milk.name = 'Skimmed Milk'
+        self.milk.save()
+        self.assertEqual(self.suggest('org')['products'], [])
+        self.assertEqual(self.suggest('skim')['products'][0]['id'], self.milk.pk)
+
+        self.chips.delete()
+        self.assertEqual(self.suggest('salt')['products'], [])
+
+        Product.objects.filter(pk=self.milk.pk).update(name='Buttermilk')
+        products_bulk_changed.send(sender=Product)
+        self.assertEqual(self.suggest('butter')['products'][0]['id'], self.milk.pk)
+
+    def test_index_is_capped(self):
+        index = PrefixIndex(max_products=2)
+        index.load([(3, 'Cheese', 'Dairy'), (2, 'Chips', 'Snacks'), (1, 'Chocolate', 'Sweets')])
+        self.assertEqual(len(index), 2)
+        index.add(4, 'Chai', 'Tea')
+        products, _ = index.lookup('ch')
+        self.assertEqual(sorted(p['id'] for p in products), [3, 4])
+
+
+class FuzzySearchTestCase(TestCase):
+    def setUp(self):
+        fuzzy_matcher.invalidate()
+        self.addCleanup(fuzzy_matcher.invalidate)
+        self.client = Client()
+        self.user = User.objects.create_user(username='fuzzy', password='testpass123')
+        self.client.force_login(self.user)
+        self.broccoli = Product.objects.create(
+            name='Fresh Broccoli', description='Green florets', price=1, category=get_category('Fruits & Vegetables')
+        )
+        self.yogurt = Product.objects.create(
+            name='Greek Yogurt', description='Thick and creamy', price=2, category=get_category('Dairy, Bread & Eggs')
+        )
+
+    def test_trigram_similarity_ranks_candidates(self):
+        self.assertEqual(trigrams('ab'), {'  a', ' ab', 'ab '})
+        index = TrigramIndex()
+        index.load([('broccoli', 3), ('brown', 5), ('yogurt', 2), ('12', 9)])
+        self.assertEqual(index.similar('brocoli', limit=1)[0][0], 'broccoli')
+        self.assertEqual(index.correct('Brocoli 12'), 'broccoli 12')
+        # Known words and prefixes of them are left alone
+        self.assertIsNone(index.correct('broc yogurt'))
+        self.assertIsNone(index.correct('xyzzy'))
+
+    def test_misspelt_search_shows_corrected_results(self):
+        response = self.client.get(reverse('products_list'), {'search': 'yoghurt'})
+        self.assertEqual(response.context['corrected_query'], 'yogurt')
+        self.assertEqual([p.pk for p in response.context['products']], [self.yogurt.pk])
+        self.assertContains(response, 'Showing results for "<strong>yogurt</strong>"')
+
+        response = self.client.get(reverse('products_list'), {'search': 'broccoli'})
+        self.assertIsNone(response.context['corrected_query'])
+        self.assertNotContains(response, 'did-you-mean')
+
+    @override_settings(PRODUCT_SEARCH_BACKEND='admin_dashboard.search.ContainsSearchBackend')
+    def test_query_that_matches_is_not_corrected(self):
+        """A query that finds products as typed is searched as typed"""
+        response = self.client.get(reverse('products_list'), {'search': 'ccoli'})
+        self.assertIsNone(response.context['corrected_query'])
+        self.assertEqual([p.pk for p in response.context['products']], [self.broccoli.pk])
+        self.assertNotContains(response, 'did-you-mean')
+
+    def test_index_follows_product_writes(self):
+        self.assertEqual(fuzzy_matcher.similar('paneer'), [])
+        Product.objects.create(name='Malai Paneer', description='d', price=3, category=get_category('Dairy, Bread & Eggs'))
+        self.assertEqual(fuzzy_matcher.correct('panner'), 'paneer')
+
+        Product.objects.filter(pk=self.broccoli.pk).update(name='Fresh Cauliflower')
+        products_bulk_changed.send(sender=Product)
+        self.assertEqual(fuzzy_matcher.correct('cauliflour'), 'cauliflower')
+
+    def test_index_follows_edits_and_deletes(self):
+        """Saves only count changed words, and deleted products' words are dropped"""
+        index = fuzzy_matcher.index()
+        greek = index.similar('greek', limit=1)
+        for _ in range(3):
+            self.yogurt.save()
+        self.assertEqual(index.similar('greek', limit=1), greek)
+        self.assertEqual(index._frequency['greek'], 1)
+
+        self.yogurt.name = 'Greek Kefir'
+        self.yogurt.save()
+        self.assertNotIn('yogurt', index._frequency)
+        self.assertEqual(fuzzy_matcher.correct('kefer'), 'kefir')
+
+        self.broccoli.delete()
+        self.assertIs(fuzzy_matcher.index(), index)
+        self.assertEqual(index.similar('brocoli'), [])
+        self.assertIsNone(fuzzy_matcher.correct('brocoli'))
+
+
+class ProductResultCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='results', password='testpass123')
+        self.client.force_login(self.user)
+        for index in range(15):
+            Product.objects.create(
+                name=f'Cached Tea {index}', description='d', price=1, category=get_category('Tea, Coffee & Drinks')
+            )
+
+    def listing(self, **params):
+        return self.client.get(reverse('products_list'), params)
+
+    def test_repeated_search_is_served_from_ids(self):
+        first = self.listing(search='tea', status='')
+        before = product_results.stats()
+        # Session, user and one in_bulk for the page
+        with self.assertNumQueries(3):
+            second = self.listing(search='  TEA ')
+        self.assertEqual(product_results.stats()['hits'], before['hits'] + 1)
+        self.assertEqual(
+            [p.pk for p in second.context['products']], [p.pk for p in first.context['products']]
+        )
+        self.assertEqual(second.context['total_products'], 15)
+
+    def test_numbered_pages_keep_their_paginator(self):
+        self.listing(page=2)
+        response = self.listing(page=2)
+        page_obj = response.context['products']
+        self.assertEqual((page_obj.number, page_obj.paginator.num_pages, len(page_obj)), (2, 2, 5))
+        self.assertEqual(response.context['total_products'], 15)
+
+    def test_product_writes_start_a_new_generation(self):
+        self.listing(search='tea')
+        Product.objects.create(name='Fresh Tea', description='d', price=1, category=get_category('Tea, Coffee & Drinks'))
+        self.assertEqual(self.listing(search='tea').context['total_products'], 16)
+
+        Product.objects.filter(name='Fresh Tea').delete()
+        self.assertEqual(self.listing(search='tea').context['total_products'], 15)
+
+    def test_cursor_pages_keep_their_cursors(self):
+        first = self.listing(status='active')
+        second = self.listing(status='active')
+        self.assertTrue(second.context['cursor_pagination'])
+        self.assertEqual(second.context['products'].next_cursor, first.context['products'].next_cursor)
+        third = self.listing(status='active', cursor=second.context['products'].next_cursor)
+        self.assertEqual(len(third.context['products']), 5)
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_hits_and_misses_reach_the_request_metrics(self):
+        client = Client()
+        client.force_login(self.user)
+        with self.assertLogs('ecommerce.requests', 'INFO') as logs:
+            client.get(reverse('products_list'), {'status': 'active'})
+            response = client.get(reverse('products_list'), {'status': 'active'})
+        self.assertIn('cache;desc="product_results 1 hits, 0 misses"', response['Server-Timing'])
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record['cache']['product_results'], {'hits': 1, 'misses': 0})
+
+
+class ProductFacetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='facets', password='testpass123')
+        self.client.force_login(self.user)
+        for name, category, status in [
+            ('Green Tea', 'Tea, Coffee & Drinks', 'active'),
+            ('Black Tea', 'Tea, Coffee & Drinks', 'draft'),
+            ('Tea Biscuits', 'Bakery & Biscuits', 'active'),
+            ('Butter Cookies', 'Bakery & Biscuits', 'active'),
+        ]:
+            Product.objects.create(name=name, description='d', price=1, category=get_category(category), status=status)
+
+    def test_each_facet_honours_the_other_filter(self):
+        grid = [(1, 'active', 3), (1, 'draft', 1), (2, 'active', 2)]
+        categories, statuses = facet_counts(grid, status='active')
+        self.assertEqual(categories, {1: 3, 2: 2})
+        self.assertEqual(statuses, {'active': 5, 'draft': 1})
+        categories, statuses = facet_counts(grid, category_ids=[2])
+        self.assertEqual(categories, {1: 4, 2: 2})
+        self.assertEqual(statuses, {'active': 2})
+
+    def test_dropdowns_show_counts_for_the_search(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('products_list'), {'search': 'tea', 'status': 'active'})
+        self.assertEqual(sum('GROUP BY' in query['sql'] for query in queries.captured_queries), 1)
+        self.assertEqual(response.context['category_counts'], {'tea-coffee-drinks': 1, 'bakery-biscuits': 1})
+        self.assertEqual(response.context['status_counts'], {'active': 2, 'draft': 1})
+        self.assertContains(response, 'Bakery &amp; Biscuits (1)</option>')
+        self.assertContains(response, 'All Status (3)</option>')
+
+        # Other filters on the same search reuse the cached counts
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('products_list'), {'search': 'tea', 'status': 'draft'})
+        self.assertFalse(any('GROUP BY' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(response.context['category_counts'], {'tea-coffee-drinks': 1})
+
+    def test_product_writes_refresh_the_counts(self):
+        self.client.get(reverse('products_list'))
+        Product.objects.create(name='Frozen Peas', description='d', price=1, category=get_category('Frozen Veg'))
+        response = self.client.get(reverse('products_list'))
+        self.assertEqual(response.context['category_counts']['frozen-veg'], 1)
+
+
+class CategoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        categories.invalidate()
+        self.client = Client()
+        self.user = User.objects.create_user(username='categories', password='testpass123')
+        self.client.force_login(self.user)
+        self.snacks = get_category('Snacks & Munchies')
+        self.chips = Category.objects.create(name='Potato Chips', slug='potato-chips', parent=self.snacks)
+
+    def count(self, category):
+        category.refresh_from_db(fields=['product_count'])
+        return category.product_count
+
+    def test_product_counts_follow_saves_moves_and_deletes(self):
+        product = Product.objects.create(name='Nachos', description='d', price=1, category=self.snacks)
+        self.assertEqual(self.count(self.snacks), 1)
+
+        product.category = self.chips
+        product.save()
+        self.assertEqual((self.count(self.snacks), self.count(self.chips)), (0, 1))
+
+        product.delete()
+        self.assertEqual(self.count(self.chips), 0)
+
+    def test_bulk_writes_recount(self):
+        Product.objects.bulk_create(
+            [Product(name=f'Crisp {index}', description='d', price=1, category=self.chips) for index in range(3)]
+        )
+        products_bulk_changed.send(sender=Product)
+        self.assertEqual(self.count(self.chips), 3)
+        self.assertEqual(categories.tree().by_slug['snacks-munchies'].total_count, 3)
+
+    def test_tree_is_cached_until_a_category_changes(self):
+        tree = categories.tree()
+        self.assertEqual(tree.by_slug['potato-chips'].parent_id, self.snacks.pk)
+        with self.assertNumQueries(0):
+            categories.tree()
+        self.chips.name = 'Crisps'
+        self.chips.save()
+        self.assertEqual(categories.tree().name(self.chips.pk), 'Crisps')
+
+    def test_parent_filter_includes_children(self):
+        Product.objects.create(name='Salted Crisps', description='d', price=1, category=self.chips)
+        Product.objects.create(name='Roasted Peanuts', description='d', price=1, category=self.snacks)
+        Product.objects.create(name='Frozen Peas', description='d', price=1, category=get_category('Frozen Veg'))
+        response = self.client.get(reverse('products_list'), {'category': 'snacks-munchies'})
+        self.assertEqual(response.context['total_products'], 2)
+        self.assertEqual(response.context['category_counts']['snacks-munchies'], 2)
+        self.assertEqual(response.context['category_counts']['potato-chips'], 1)
+        self.assertContains(response, 'All Categories (3)</option>')
+
+        response = self.client.get(reverse('products_list'), {'category': 'potato-chips'})
+        self.assertEqual([p.name for p in response.context['page_obj']], ['Salted Crisps'])
+
+    def test_search_matches_category_names(self):
+        product = Product.objects.create(name='Salted Crisps', description='d', price=1, category=self.chips)
+        backend = SQLiteFTSSearchBackend()
+        self.assertEqual(list(backend.filter(Product.objects.all(), 'potato')), [product])
+        self.chips.name = 'Kettle Chips'
+        self.chips.save()
+        self.assertEqual(list(backend.filter(Product.objects.all(), 'kettle')), [product])
+        self.assertFalse(backend.filter(Product.objects.all(), 'potato').exists())
+
+
+class OrderLedgerTestCase(TestCase):
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.milk = Product.objects.create(
+            name='Milk', description='d', price=Decimal('2.50'), category=get_category('Dairy, Bread & Eggs')
+        )
+        self.bread = Product.objects.create(
+            name='Bread', description='d', price=Decimal('4.00'), category=get_category('Dairy, Bread & Eggs')
+        )
+
+    def stats(self, day=None):
+        return DashboardStats.objects.get(date=day or self.today)
+
+    def earnings(self, day=None):
+        row = self.stats(day)
+        return row.daily_earnings, row.monthly_earnings, row.total_earnings
+
+    def test_placed_orders_add_their_total(self):
+        order = place_order(None, [(self.milk, 2), (self.bread, 1)])
+        self.assertEqual(order.total, Decimal('9.00'))
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(self.earnings(), (9, 9, 9))
+
+        place_order(None, [(self.bread, 1)], status='pending')
+        self.assertEqual(self.earnings(), (9, 9, 9))
+
+        with self.assertNumQueries(6):
+            # savepoint, the order, today's row check, one UPDATE, the items, release
+            place_order(None, [(self.milk, 1)])
+        self.assertEqual(self.earnings(), (Decimal('11.50'), Decimal('11.50'), Decimal('11.50')))
+
+    def test_status_changes_move_earnings(self):
+        order = place_order(None, [(self.bread, 2)], status='pending')
+        order.status = 'paid'
+        order.save()
+        self.assertEqual(self.earnings(), (8, 8, 8))
+
+        order.status = 'refunded'
+        order.save()
+        self.assertEqual(self.earnings(), (0, 0, 0))
+
+    def test_backdated_orders_update_later_running_totals(self):
+        place_order(None, [(self.milk, 1)])
+        two_days_ago = self.today - timezone.timedelta(days=2)
+        place_order(None, [(self.bread, 1)], placed_at=rollups.day_start(two_days_ago))
+        self.assertEqual(self.stats(two_days_ago).daily_earnings, 4)
+        self.assertEqual(self.stats(two_days_ago).total_earnings, 4)
+        self.assertEqual(self.stats().total_earnings, Decimal('6.50'))
+        expected_monthly = Decimal('6.50') if two_days_ago.month == self.today.month else Decimal('2.50')
+        self.assertEqual(self.stats().monthly_earnings, expected_monthly)
+
+    def test_item_edits_and_deletes_resum_the_order(self):
+        order = place_order(None, [(self.milk, 1), (self.bread, 1)])
+        item = order.items.get(product=self.milk)
+        item.quantity = 3
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total, Decimal('11.50'))
+        self.assertEqual(self.stats().daily_earnings, Decimal('11.50'))
+
+        item.delete()
+        self.assertEqual(self.stats().daily_earnings, 4)
+        order.refresh_from_db()
+
+        order.delete()
+        self.assertEqual(self.earnings(), (0, 0, 0))
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+        for days_ago in (40, 3, 0):
+            place_order(
+                None, [(self.milk, days_ago + 1)],
+                placed_at=rollups.day_start(self.today - timezone.timedelta(days=days_ago)),
+            )
+        incremental = list(DashboardStats.objects.values_list('date', 'daily_earnings', 'monthly_earnings', 'total_earnings'))
+
+        DashboardStats.objects.update(daily_earnings=0, monthly_earnings=0, total_earnings=0)
+        start = self.today - timezone.timedelta(days=60)
+        # The ledger, the row before the range, the range and one write each
+        with self.assertNumQueries(7):
+            rollups.rebuild_earnings(start)
+        rebuilt = list(DashboardStats.objects.values_list('date', 'daily_earnings', 'monthly_earnings', 'total_earnings'))
+        self.assertEqual(rebuilt, incremental)
+        self.assertEqual(rebuilt[0][3], Decimal('2.50') * (41 + 4 + 1))
+
+    def test_rebuilding_part_of_the_history_shifts_later_rows(self):
+        week_ago = self.today - timezone.timedelta(days=7)
+        place_order(None, [(self.milk, 1)], placed_at=rollups.day_start(week_ago))
+        place_order(None, [(self.bread, 1)])
+        # An order written without signals
+        Order.objects.bulk_create([Order(status='paid', total=Decimal('10.00'), placed_at=rollups.day_start(week_ago))])
+
+        rollups.rebuild_earnings(week_ago, week_ago)
+        self.assertEqual(self.stats(week_ago).daily_earnings, Decimal('12.50'))
+        self.assertEqual(self.stats().total_earnings, Decimal('16.50'))
+
+    def test_rebuild_earnings_command(self):
+        Order.objects.bulk_create([Order(status='delivered', total=Decimal('5.00'))])
+        out = io.StringIO()
+        call_command('rebuild_earnings', stdout=out)
+        self.assertIn('Rebuilt earnings', out.getvalue())
+        self.assertEqual(self.stats().total_earnings, 5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_earnings', '--start', '2026-02-30')
@@ -1,19 +1,33 @@
+from django.conf import settings
 from django.urls import path
 from django.shortcuts import redirect
 from . import views
 
+# Under ASGI the listing pages run their independent queries concurrently;
+# WSGI workers keep the plain sync views.
+ASYNC = settings.ASYNC_VIEWS
+
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('kpis/', views.dashboard_kpis, name='dashboard_kpis'),
 
     # Product URLs
-    path('products/', views.products_list, name='products_list'),
+    path('products/', views.products_list_async if ASYNC else views.products_list, name='products_list'),
     path('products.html', lambda request: redirect('products_list', permanent=True)),
     path('products/create/', views.create_product, name='create_product'),
+    path('products/import/', views.import_products, name='import_products'),
+    path('products/suggest/', views.product_suggest, name='product_suggest'),
     path('products/<int:pk>/', views.product_detail, name='product_detail'),
     path('products/<int:pk>/edit/', views.edit_product, name='edit_product'),
     path('products/<int:pk>/delete/', views.delete_product, name='delete_product'),
     path('products/<int:pk>/toggle-status/', views.toggle_product_status, name='toggle_product_status'),
+    path('products/bulk-action/', views.bulk_product_action, name='bulk_product_action'),
 
     # Customer URLs
-    path('customers/', views.customers_list, name='customers_list'),
+    path('customers/', views.customers_list_async if ASYNC else views.customers_list, name='customers_list'),
+    path('customers/export/', views.export_customers, name='export_customers'),
 ]
+
+# A long-lived stream would pin a WSGI worker, so WSGI clients poll dashboard_kpis instead.
+if ASYNC:
+    urlpatterns.append(path('kpis/stream/', views.dashboard_kpi_stream, name='dashboard_kpi_stream'))
@@ -1,70 +1,91 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.urls import reverse
+from urllib.parse import urlencode
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
+from django.db import transaction
+from django.db.models import Q, Case, When, Value
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.http import JsonResponse
-from datetime import datetime, timedelta
-from .models import Product, Customer, DashboardStats
-from .forms import ProductForm, ProductSearchForm
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from datetime import timedelta
+from ecommerce import page_cache
+from homepage import catalog
+from .models import Product, Customer
+from .forms import ProductForm, ProductSearchForm, CustomerSearchForm, ProductImportForm, ProductBulkActionForm
+from . import rollups
+from .search import get_search_backend
+from .pagination import KeysetPaginator
+from .exports import EXPORT_FORMATS, customer_lines
+from .importers import FeedError, ProductImporter
+from .concurrency import run_queries, run_queries_sync
+from .live import broadcaster, current_kpis
+from .suggest import product_suggestions
+from .fuzzy import fuzzy_matcher
+from .result_cache import product_results
+from .facets import facet_counts, facet_grid, label_choices
+from .categories import tree as category_tree
+from .fragments import ProductValidators, product_fragment, product_fragments, product_version
+from .bulk_actions import ACTION_CHOICES, ACTION_VALUE_FIELDS, apply_bulk_action
 
 # Create your views here.
 
-@login_required(login_url='/auth/login/')
-def dashboard(request):
-    """Dashboard view with dynamic statistics"""
-
-    # Calculate dashboard statistics
-    today = timezone.now().date()
-    two_days_ago = today - timedelta(days=2)
-    current_month = today.replace(day=1)
-
-    # Get or create today's stats
-    stats, created = DashboardStats.objects.get_or_create(
-        date=today,
-        defaults={
-            'total_earnings': 0,
-            'daily_earnings': 0,
-            'new_customers': 0,
-            'total_customers': Customer.objects.count()
-        }
-    )
+PRODUCTS_PER_PAGE = 10
+CUSTOMERS_PER_PAGE = 20
+IMPORT_ERRORS_SHOWN = 100
+SUGGESTIONS_SHOWN = 8
+SUGGESTIONS_MAX = 20
+DETAIL_CACHE_CONTROL = 'private, no-cache'
 
-    # Calculate monthly earnings (sum of all daily earnings this month)
-    monthly_earnings = DashboardStats.objects.filter(
-        date__gte=current_month
-    ).aggregate(total=Sum('daily_earnings'))['total'] or 0
 
-    # Calculate new customers in last 2 days
-    new_customers_2_days = Customer.objects.filter(
-        created_at__date__gte=two_days_ago
-    ).count()
+def _filter_query(request):
+    """Return the current query string without its pagination parameters"""
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('cursor', None)
+    return query.urlencode()
 
-    # Total customers
-    total_customers = Customer.objects.count()
-
-    # Total products
-    total_products = Product.objects.filter(is_active=True).count()
-
-    # Recent customers (last 5)
-    recent_customers = Customer.objects.select_related('user').order_by('-created_at')[:5]
-
-    # Recent products (last 5)
-    recent_products = Product.objects.filter(is_active=True).order_by('-created_at')[:5]
 
+@login_required(login_url='/auth/login/')
+def dashboard(request):
+    """Dashboard view with dynamic statistics"""
+    # Read the precomputed KPI rollups instead of aggregating per request;
+    # a single read, so there is nothing for an async view to overlap.
+    today = timezone.now().date()
     context = {
-        'monthly_earnings': monthly_earnings,
-        'total_customers': total_customers,
-        'new_customers_2_days': new_customers_2_days,
-        'total_products': total_products,
-        'recent_customers': recent_customers,
-        'recent_products': recent_products,
+        # Recent customers and products (last 5), evaluated by the template
+        'recent_customers': Customer.objects.select_related('user').order_by('-created_at')[:5],
+        'recent_products': Product.objects.filter(is_active=True).order_by('-created_at')[:5],
         'today': today,
+        'kpi_url': reverse('dashboard_kpis'),
+        'kpi_stream_url': reverse('dashboard_kpi_stream') if settings.ASYNC_VIEWS else '',
+        'kpi_interval': settings.DASHBOARD_KPI_INTERVAL,
+        **rollups.snapshot(today),
     }
-
     return render(request, 'dashboard/index.html', context)
 
+
+@login_required(login_url='/auth/login/')
+def dashboard_kpis(request):
+    """Current dashboard KPIs as JSON"""
+    response = JsonResponse(current_kpis())
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+@login_required(login_url='/auth/login/')
+async def dashboard_kpi_stream(request):
+    """Server-Sent Events stream of the dashboard KPIs (ASGI only)"""
+    response = StreamingHttpResponse(broadcaster.subscribe(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required(login_url='/auth/login/')
 def create_product(request):
     """Create new product view"""
@@ -87,10 +108,43 @@ def create_product(request):
     return render(request, 'dashboard/add-product.html', context)
 
 @login_required(login_url='/auth/login/')
-def products_list(request):
-    """List all products with search and filtering"""
-    search_form = ProductSearchForm(request.GET)
-    products = Product.objects.all().order_by('-created_at')
+def import_products(request):
+    """Upload a CSV or JSON Lines product feed"""
+    result = None
+    if request.method == 'POST':
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                result = ProductImporter().run_upload(
+                    form.cleaned_data['file'], form.cleaned_data.get('format') or None
+                )
+            except FeedError as error:
+                form.add_error('file', str(error))
+                result = error.result
+            if result.imported:
+                messages.success(
+                    request,
+                    f'Imported {result.imported} products ({result.created} new, {result.updated} updated).'
+                )
+            if result.errors:
+                messages.error(request, f'{len(result.errors)} rows were rejected.')
+        else:
+            messages.error(request, 'Please correct the errors below.')
+    else:
+        form = ProductImportForm()
+
+    context = {
+        'form': form,
+        'result': result,
+        'row_errors': result.errors[:IMPORT_ERRORS_SHOWN] if result else [],
+    }
+    return render(request, 'dashboard/import-products.html', context)
+
+def _filtered_products(data, prefix=None):
+    """Return the product search form, the products it selects, the search text and its spelling correction"""
+    search_form = ProductSearchForm(data, prefix=prefix)
+    products = Product.objects.select_related('category').order_by('-created_at')
+    search_query = corrected_query = None
 
     # Apply search and filters
     if search_form.is_valid():
@@ -98,40 +152,170 @@ def products_list(request):
         status_filter = search_form.cleaned_data.get('status')
         category_filter = search_form.cleaned_data.get('category')
 
-        if search_query:
-            products = products.filter(
-                Q(name__icontains=search_query) |
-                Q(description__icontains=search_query) |
-                Q(category__icontains=search_query)
-            )
-
         if status_filter:
             products = products.filter(status=status_filter)
 
         if category_filter:
-            products = products.filter(category=category_filter)
+            # A parent category also lists the products of its descendants
+            products = products.filter(category__in=category_tree().by_slug[category_filter].descendant_ids())
+
+        if search_query:
+            search_backend = get_search_backend()
+            searched = search_backend.filter(products, search_query)
+            # Misspelt words are swapped for their closest vocabulary match, but
+            # only when the query as typed finds nothing.
+            corrected_query = fuzzy_matcher.correct(search_query)
+            if corrected_query and not searched.exists():
+                searched = search_backend.filter(products, corrected_query)
+            else:
+                corrected_query = None
+            products = searched
+
+    return search_form, products, search_query, corrected_query
+
+
+def _fetched_page(paginator, number):
+    """Return a numbered page with its rows already loaded"""
+    page = paginator.get_page(number)
+    page.object_list = list(page.object_list)
+    return page
+
+
+def _products_list_plan(request):
+    """Return the products_list context and the independent queries it still needs"""
+    search_form, products, search_query, corrected_query = _filtered_products(request.GET)
+    search_backend = get_search_backend()
+
+    # Pagination: cursor based by default so deep pages cost the same as the
+    # first one; ?page=N and relevance ranked search results use numbered pages.
+    ranked_search = bool(search_query) and search_backend.ranked
+    use_cursor = 'page' not in request.GET and ('cursor' in request.GET or not ranked_search)
+    position = request.GET.get('cursor') if use_cursor else request.GET.get('page')
+
+    # Repeated searches are answered from the result cache: one in_bulk
+    # instead of the search, the page and the count.
+    result_key = entry = None
+    if search_form.is_valid():
+        result_key = product_results.key(search_form.cleaned_data, position, use_cursor)
+        entry = product_results.get(result_key)
+
+    total = None
+    if entry is not None:
+        result_key, total = None, entry['total']
+        queries = {'page_obj': lambda: product_results.page(entry, products, PRODUCTS_PER_PAGE)}
+    elif use_cursor:
+        paginator = KeysetPaginator(products, PRODUCTS_PER_PAGE)
+        queries = {
+            'page_obj': lambda: paginator.get_page(position),
+            'total_products': products.count,
+        }
+    else:
+        # Paginator counts before it slices, so this stays one unit of work.
+        paginator = Paginator(products, PRODUCTS_PER_PAGE)
+        queries = {'page_obj': lambda: _fetched_page(paginator, position)}
 
-    # Pagination
-    paginator = Paginator(products, 10)  # Show 10 products per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Filter dropdown counts for the current search, from one cached GROUP BY
+    searched = Product.objects.all()
+    if search_query:
+        searched = search_backend.filter(searched, corrected_query or search_query)
+    queries['facet_grid'] = lambda: facet_grid(searched, corrected_query or search_query)
 
     context = {
-        'products': page_obj,
         'search_form': search_form,
-        'total_products': products.count(),
-        'page_obj': page_obj,
+        'cursor_pagination': use_cursor,
+        'page_range': None,
+        'total_products': total,
+        'result_key': result_key,
+        'filter_query': _filter_query(request),
+        'bulk_form': ProductBulkActionForm(),
+        'search_query': search_query,
+        'corrected_query': corrected_query,
+        # Loaded here so the async view never queries it on the event loop
+        'category_tree': category_tree(),
     }
+    return context, queries
+
+
+def _products_list_context(context, results):
+    page_obj = results['page_obj']
+    context = {**context, **results, 'products': page_obj}
+    if not context['cursor_pagination']:
+        paginator = page_obj.paginator
+        context['total_products'] = paginator.count
+        context['page_range'] = paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1)
+    filters = context['search_form'].cleaned_data if context['search_form'].is_valid() else {}
+    tree = context.pop('category_tree')
+    selected = tree.by_slug[filters['category']].descendant_ids() if filters.get('category') else None
+    categories, statuses = facet_counts(context.pop('facet_grid'), filters.get('status'), selected)
+    matching = sum(categories.values())
+    categories = tree.rollup(categories)
+    label_choices(context['search_form'].fields['category'], categories, matching)
+    label_choices(context['search_form'].fields['status'], statuses, sum(statuses.values()))
+    context.update(category_counts=categories, status_counts=statuses)
+    result_key = context.pop('result_key')
+    if result_key:
+        product_results.store(result_key, page_obj, context['total_products'])
+    return context
+
+
+@login_required(login_url='/auth/login/')
+def products_list(request):
+    """List all products with search and filtering"""
+    context, queries = _products_list_plan(request)
+    context = _products_list_context(context, run_queries_sync(queries))
     return render(request, 'dashboard/products.html', context)
 
+
+@login_required(login_url='/auth/login/')
+async def products_list_async(request):
+    """List products for ASGI, fetching the page and the total concurrently"""
+    # Building the spelling index on first use queries the database
+    context, queries = await sync_to_async(_products_list_plan)(request)
+    context = _products_list_context(context, await run_queries(queries))
+    return await sync_to_async(render)(request, 'dashboard/products.html', context)
+
+@login_required(login_url='/auth/login/')
+def product_suggest(request):
+    """Typeahead suggestions for the product search box, served from the prefix index"""
+    try:
+        limit = min(max(int(request.GET.get('limit', SUGGESTIONS_SHOWN)), 1), SUGGESTIONS_MAX)
+    except ValueError:
+        limit = SUGGESTIONS_SHOWN
+    products, categories = product_suggestions.lookup(request.GET.get('q', ''), limit)
+    for product in products:
+        product['url'] = reverse('product_detail', args=[product['id']])
+    response = JsonResponse({'products': products, 'categories': categories})
+    response['Cache-Control'] = 'private, max-age=30'
+    return response
+
+
 @login_required(login_url='/auth/login/')
 def product_detail(request, pk):
     """Product detail view"""
-    product = get_object_or_404(Product, pk=pk)
+    updated_at = product_version(pk)
+    if updated_at is None:
+        raise Http404('No Product matches the given query.')
+
+    # The page header shows the signed-in user and any pending messages.
+    validators = ProductValidators('dashboard', pk, updated_at, request.user.pk)
+    if not len(messages.get_messages(request)):
+        not_modified = validators.not_modified(request)
+        if not_modified is not None:
+            return validators.apply(not_modified, DETAIL_CACHE_CONTROL)
+
+    def render_content():
+        product = get_object_or_404(Product.objects.select_related('category'), pk=pk)
+        return product.name, mark_safe(
+            render_to_string('dashboard/product-detail-content.html', {'product': product})
+        )
+
+    product_name, detail_content = product_fragment('dashboard', pk, updated_at, render_content)
     context = {
-        'product': product,
+        'product_name': product_name,
+        'detail_content': detail_content,
     }
-    return render(request, 'dashboard/product-detail.html', context)
+    response = render(request, 'dashboard/product-detail.html', context)
+    return validators.apply(response, DETAIL_CACHE_CONTROL)
 
 
 @login_required(login_url='/auth/login/')
@@ -162,7 +346,7 @@ def edit_product(request, pk):
 @login_required(login_url='/auth/login/')
 def delete_product(request, pk):
     """Delete product view"""
-    product = get_object_or_404(Product, pk=pk)
+    product = get_object_or_404(Product.objects.select_related('category'), pk=pk)
 
     if request.method == 'POST':
         product_name = product.name
@@ -180,25 +364,146 @@ def delete_product(request, pk):
 def toggle_product_status(request, pk):
     """Toggle product active status via AJAX"""
     if request.method == 'POST':
-        product = get_object_or_404(Product, pk=pk)
-        product.is_active = not product.is_active
-        product.save()
+        # Flip the flag in the database so concurrent toggles cannot overwrite each other
+        with transaction.atomic():
+            updated = Product.objects.filter(pk=pk).update(
+                is_active=Case(When(is_active=True, then=Value(False)), default=Value(True)),
+                updated_at=timezone.now()
+            )
+            if not updated:
+                raise Http404('No Product matches the given query.')
+            name, is_active = Product.objects.filter(pk=pk).values_list('name', 'is_active').get()
+        rollups.products_changed(1 if is_active else -1)
+        # The UPDATE sends no post_save: drop the product's cached fragment and
+        # the storefront blocks and pages that list it.
+        product_fragments.discard(pk)
+        catalog.refresh()
+        page_cache.invalidate()
 
         return JsonResponse({
             'success': True,
-            'is_active': product.is_active,
-            'message': f'Product "{product.name}" {"activated" if product.is_active else "deactivated"} successfully!'
+            'is_active': is_active,
+            'message': f'Product "{name}" {"activated" if is_active else "deactivated"} successfully!'
         })
 
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
 
 @login_required(login_url='/auth/login/')
-def customers_list(request):
-    """List all customers"""
-    customers = Customer.objects.select_related('user').order_by('-created_at')
+def bulk_product_action(request):
+    """Apply one action to the selected products, or to every product matching the filters"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
+
+    wants_json = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    form = ProductBulkActionForm(request.POST)
+    # The listing filters travel with the form under a prefix so they do not
+    # clash with the action's own status and category fields.
+    search_form, filtered, _, _ = _filtered_products(request.POST, prefix='filter')
+    filter_query = ''
+    if search_form.is_valid():
+        filter_query = urlencode({key: value for key, value in search_form.cleaned_data.items() if value})
+    elif form.is_valid() and form.cleaned_data['select_all']:
+        form.add_error(None, 'The current filters are invalid.')
+
+    if not form.is_valid():
+        errors = {field: [str(e) for e in errs] for field, errs in form.errors.items()}
+        if wants_json:
+            return JsonResponse({'success': False, 'errors': errors}, status=400)
+        messages.error(request, ' '.join(message for errs in errors.values() for message in errs))
+        return redirect(f"{reverse('products_list')}?{filter_query}")
+
+    action = form.cleaned_data['action']
+    value_field = ACTION_VALUE_FIELDS.get(action)
+    products = filtered if form.cleaned_data['select_all'] else filtered.filter(pk__in=form.cleaned_data['ids'])
+    affected = apply_bulk_action(products, action, form.cleaned_data.get(value_field) if value_field else None)
+
+    message = f'{dict(ACTION_CHOICES)[action]}: {affected} product{"s" if affected != 1 else ""} affected.'
+    if wants_json:
+        return JsonResponse({'success': True, 'action': action, 'affected': affected, 'message': message})
+    messages.success(request, message)
+    return redirect(f"{reverse('products_list')}?{filter_query}")
+
+
+def _filtered_customers(request):
+    """Return the customer search form, the customers it selects and whether any filter applied"""
+    search_form = CustomerSearchForm(request.GET)
+    customers = Customer.objects.all()
+    filtered = False
+
+    if search_form.is_valid():
+        search_query = search_form.cleaned_data.get('search')
+        joined_from = search_form.cleaned_data.get('joined_from')
+        joined_to = search_form.cleaned_data.get('joined_to')
+
+        if search_query:
+            customers = customers.filter(
+                Q(user__first_name__icontains=search_query) |
+                Q(user__last_name__icontains=search_query) |
+                Q(user__email__icontains=search_query) |
+                Q(phone__icontains=search_query)
+            )
+
+        if joined_from:
+            customers = customers.filter(created_at__gte=rollups.day_start(joined_from))
+
+        if joined_to:
+            customers = customers.filter(created_at__lt=rollups.day_start(joined_to + timedelta(days=1)))
+
+        filtered = bool(search_query or joined_from or joined_to)
+
+    return search_form, customers, filtered
+
+
+def _customers_list_plan(request):
+    """Return the customers_list context and the independent queries it still needs"""
+    search_form, customers, filtered = _filtered_customers(request)
+    paginator = KeysetPaginator(customers.select_related('user'), CUSTOMERS_PER_PAGE)
+    cursor = request.GET.get('cursor')
+
+    queries = {
+        'page_obj': lambda: paginator.get_page(cursor),
+        # The unfiltered total comes from the KPI rollup instead of a count
+        'total_customers': customers.count if filtered else lambda: rollups.snapshot()['total_customers'],
+    }
     context = {
-        'customers': customers,
-        'total_customers': customers.count()
+        'search_form': search_form,
+        'filter_query': _filter_query(request),
     }
+    return context, queries
+
+
+def _customers_list_context(context, results):
+    return {**context, **results, 'customers': results['page_obj']}
+
+
+@login_required(login_url='/auth/login/')
+def customers_list(request):
+    """List customers a page at a time with search and filtering"""
+    context, queries = _customers_list_plan(request)
+    context = _customers_list_context(context, run_queries_sync(queries))
     return render(request, 'dashboard/customers.html', context)
+
+
+@login_required(login_url='/auth/login/')
+async def customers_list_async(request):
+    """List customers for ASGI, fetching the page and the total concurrently"""
+    context, queries = _customers_list_plan(request)
+    context = _customers_list_context(context, await run_queries(queries))
+    return await sync_to_async(render)(request, 'dashboard/customers.html', context)
+
+
+@login_required(login_url='/auth/login/')
+def export_customers(request):
+    """Stream the filtered customers as CSV or JSON Lines"""
+    export_format = request.GET.get('format')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+    content_type, extension = EXPORT_FORMATS[export_format]
+
+    _, customers, _ = _filtered_customers(request)
+    lines = customer_lines(customers.order_by('created_at', 'id'), export_format)
+
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="customers.{extension}"'
+    return response
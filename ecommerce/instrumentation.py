@@ -0,0 +1,229 @@
+"""Per-request query and timing metrics.
+
+``RequestMetricsMiddleware`` samples a share of requests
+(``REQUEST_METRICS_SAMPLE_RATE``). For each sampled request it records the
+number of queries, SQL time, template render time and view time. It reports
+them in a ``Server-Timing`` header and as one JSON log line on the
+``ecommerce.requests`` logger. When the same SQL shape runs at least
+``REQUEST_METRICS_N_PLUS_ONE`` times in one request, it is logged as a
+suspected N+1 query. Application caches report their hits and misses through
+``record_cache``.
+
+The metrics of the running request live in a context variable, so the
+recorder also sees queries run from ``sync_to_async`` worker threads (see
+``admin_dashboard.concurrency``) and templates rendered there. Requests that
+are not sampled pay one context variable lookup per query.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('ecommerce.requests')
+
+_current = ContextVar('request_metrics', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+
+
+def sql_shape(sql):
+    """Reduce ``sql`` to its shape: literals and IN lists of any length look alike"""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    return _PLACEHOLDER_LIST.sub('(...)', shape)
+
+
+class RequestMetrics:
+    """Queries and timings collected during one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_time = 0.0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.shapes = Counter()
+        self.cache = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def queries(self):
+        return sum(self.shapes.values())
+
+    def add_query(self, sql, duration):
+        shape = sql_shape(sql)
+        with self._lock:
+            self.shapes[shape] += 1
+            self.sql_time += duration
+
+    def add_template(self, duration):
+        with self._lock:
+            self.template_time += duration
+
+    def add_cache(self, name, hit):
+        with self._lock:
+            self.cache[name, 'hits' if hit else 'misses'] += 1
+
+    def cache_summary(self):
+        summary = {}
+        for (name, outcome), count in sorted(self.cache.items()):
+            summary.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = count
+        return summary
+
+    def repeated_queries(self, threshold):
+        """Return ``(shape, count)`` for every shape run at least ``threshold`` times"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self, total):
+        metrics = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]
+        for name, counts in self.cache_summary().items():
+            metrics.append(f'cache;desc="{name} {counts["hits"]} hits, {counts["misses"]} misses"')
+        return ', '.join(metrics)
+
+
+def record_cache(name, hit):
+    """Count a hit or miss of the cache ``name`` against the running request, if sampled"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_cache(name, hit)
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+def _install(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _connection_created(sender, connection, **kwargs):
+    _install(connection)
+
+
+connection_created.connect(_connection_created, dispatch_uid='ecommerce.instrumentation')
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.add_template(time.perf_counter() - started)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend that reports render time to the request metrics"""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+class RequestMetricsMiddleware:
+    """Sample requests and report their query count and timings"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0)
+        self.n_plus_one = getattr(settings, 'REQUEST_METRICS_N_PLUS_ONE', 5)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = self._start()
+        if metrics is None:
+            return self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = self._start()
+        if metrics is None:
+            return await self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    def _start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        # Connections opened before this module was imported never saw
+        # connection_created.
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        return RequestMetrics()
+
+    def _finish(self, request, response, metrics):
+        now = time.perf_counter()
+        if metrics.view_started is not None:
+            metrics.view_time = now - metrics.view_started
+        total = now - metrics.started
+        response['Server-Timing'] = metrics.server_timing(total)
+
+        repeated = metrics.repeated_queries(self.n_plus_one)
+        resolver_match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'sql_ms': round(metrics.sql_time * 1000, 1),
+            'template_ms': round(metrics.template_time * 1000, 1),
+            'view_ms': round(metrics.view_time * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'n_plus_one': [{'sql': shape, 'count': count} for shape, count in repeated],
+            'cache': metrics.cache_summary(),
+        }
+        logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(record))
+        return response
@@ -0,0 +1,110 @@
+"""Full-page cache for the storefront's template-only views.
+
+``cache_page_render`` stores the rendered bytes of a view in the default cache,
+keyed by the request path with the query parameters the view declares it reads
+(any others are ignored, so made-up query strings cannot fill the cache), a
+signature of the template files' modification times and a generation counter
+that catalog changes bump through
+``invalidate()`` (see ``admin_dashboard.signals``). Each entry carries a strong
+ETag, so a client revalidating with ``If-None-Match`` gets a 304 and a cache
+hit never touches the template engine.
+"""
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import engines
+from django.utils.cache import get_conditional_response
+
+GENERATION_KEY = 'page_cache:generation'
+CACHE_CONTROL = 'public, no-cache'
+
+_template_state = {'checked': None, 'version': None}
+_template_lock = threading.Lock()
+
+
+def _template_dirs():
+    dirs = []
+    for engine in engines.all():
+        dirs.extend(getattr(engine, 'template_dirs', ()))
+    return dirs
+
+
+def template_version():
+    """Signature of every template file's mtime, re-checked at most every few seconds"""
+    interval = getattr(settings, 'PAGE_CACHE_TEMPLATE_CHECK_INTERVAL', 2)
+    now = time.monotonic()
+    with _template_lock:
+        checked = _template_state['checked']
+        if checked is not None and now - checked < interval:
+            return _template_state['version']
+
+        signature = hashlib.md5()
+        for directory in _template_dirs():
+            for root, _, files in os.walk(directory):
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    signature.update(f'{path}:{os.stat(path).st_mtime_ns};'.encode())
+        _template_state.update(checked=now, version=signature.hexdigest()[:16])
+        return _template_state['version']
+
+
+def generation():
+    return cache.get_or_set(GENERATION_KEY, 1, None)
+
+
+def invalidate():
+    """Drop every cached page by moving to a new generation"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+
+def page_key(path):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'page:{generation()}:{template_version()}:{digest}'
+
+
+def cache_page_render(view=None, *, query=()):
+    """Serve a template-only view from the page cache with a strong ETag
+
+    ``query`` names the GET parameters the view reads; only those vary the
+    cached page.
+    """
+    if view is None:
+        return lambda view: cache_page_render(view, query=query)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        params = [(name, request.GET[name]) for name in sorted(query) if name in request.GET]
+        key = page_key(f'{request.path}?{urlencode(params)}' if params else request.path)
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            # Only plain, cookie-free successes are shared between visitors.
+            if response.status_code != 200 or response.streaming or response.cookies:
+                return response
+            content = response.content
+            entry = (content, response['Content-Type'], f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+            cache.set(key, entry, getattr(settings, 'PAGE_CACHE_TIMEOUT', 24 * 60 * 60))
+
+        content, content_type, etag = entry
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    return wrapper
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,7 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ecommerce.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'ecommerce.static_assets.PrecompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,9 +58,17 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'ecommerce.urls'
 
+# Serve the dashboard listings from their async views; asgi.py turns this on
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+# Give each independent query of an async view its own connection and thread
+CONCURRENT_VIEW_QUERIES = True
+# Seconds between dashboard KPI refreshes for the JSON endpoint and SSE stream
+DASHBOARD_KPI_INTERVAL = 5
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that reports render time to RequestMetricsMiddleware
+        'BACKEND': 'ecommerce.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -72,6 +83,30 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ecommerce.wsgi.application'
 
+# Share of requests that get a Server-Timing header and a log line with their
+# query count and timings, and the repeat count of one SQL shape that is
+# reported as a suspected N+1 query. The test cases in ``ecommerce.testing``
+# turn sampling off.
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('DJANGO_REQUEST_METRICS_SAMPLE_RATE', '0.05'))
+REQUEST_METRICS_N_PLUS_ONE = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'ecommerce.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGO_REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -115,6 +150,27 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Cache
+# Per-process memory cache; point this at a shared backend (Redis, Memcached)
+# when running several workers so page cache invalidation reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ecommerce',
+    }
+}
+
+# Storefront pages rendered by ecommerce.page_cache
+PAGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Lead capture forms (About, Contact, 404) are spooled here and written in
+# batches by homepage.leads
+LEAD_SPOOL_DIR = BASE_DIR / 'var' / 'spool'
+LEAD_BATCH_SIZE = 100
+LEAD_FLUSH_INTERVAL = 2.0
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
@@ -124,12 +180,44 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic fingerprints file names and writes .gz/.br siblings, which
+# PrecompressedStaticMiddleware serves with far-future cache headers
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'ecommerce.static_assets.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files (User uploaded files)
 # https://docs.djangoproject.com/en/5.2/topics/files/
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product image derivatives are rendered off the request thread by this many workers
+PRODUCT_IMAGE_WORKERS = 2
+PRODUCT_IMAGE_ASYNC = True
+
+# Dashboard search typeahead: products held in the in-process prefix index and
+# seconds before it is rebuilt to pick up writes from other processes
+PRODUCT_SUGGEST_MAX_PRODUCTS = 50000
+PRODUCT_SUGGEST_MAX_AGE = 300
+
+# Seconds before the trigram index behind typo-tolerant product search is
+# rebuilt from the search vocabulary
+PRODUCT_FUZZY_MAX_AGE = 300
+
+# Seconds before the in-process category tree is reloaded to pick up category
+# writes from other processes
+CATEGORY_TREE_MAX_AGE = 60
+
+# Seconds a cached products_list page (ids and total) lives; product writes
+# invalidate every entry at once through a generation counter
+PRODUCT_RESULT_CACHE_TIMEOUT = 300
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
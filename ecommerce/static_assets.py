@@ -0,0 +1,214 @@
+"""Fingerprinted, precompressed static files.
+
+``collectstatic`` runs through ``CompressedManifestStaticFilesStorage``, which
+content-hashes every file name (``staticfiles.json`` maps the original names to
+the hashed ones) and then writes ``.gz`` and, when the ``brotli`` package is
+installed, ``.br`` siblings next to each compressible file.
+
+``PrecompressedStaticMiddleware`` serves ``STATIC_ROOT`` itself: it picks the
+best precompressed sibling the client accepts, so no response is compressed at
+request time, and marks hashed names as immutable for a year.
+"""
+import gzip
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip siblings are always written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.html', '.txt', '.xml',
+    '.ico', '.ttf', '.otf', '.eot',
+}
+# Files smaller than this aren't worth a separate compressed copy
+MIN_COMPRESS_SIZE = 256
+# Keep a compressed copy only if it saves at least this fraction
+MIN_SAVING = 0.05
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+
+# Preferred first when the client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress_file(path):
+    """Write ``.gz``/``.br`` siblings for ``path`` and return the encodings written"""
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    with open(path, 'rb') as source:
+        data = source.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    candidates = {'gzip': lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        candidates['br'] = lambda: brotli.compress(data, quality=11)
+
+    written = []
+    for encoding, suffix in ENCODINGS:
+        if encoding not in candidates:
+            continue
+        compressed = candidates[encoding]()
+        if len(compressed) > len(data) * (1 - MIN_SAVING):
+            continue
+        with open(path + suffix, 'wb') as target:
+            target.write(compressed)
+        written.append(encoding)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that also precompresses what it collects"""
+
+    manifest_strict = False
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def convert(matchobj):
+            # Vendored CSS/JS reference source maps and fonts that aren't shipped;
+            # leave those references alone rather than abort collectstatic.
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+
+        return convert
+
+    def post_process(self, paths, dry_run=False, **options):
+        collected = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                collected.add(name)
+                if hashed_name:
+                    collected.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        # zlib and brotli release the GIL, so threads compress in parallel.
+        paths = [self.path(name) for name in sorted(collected) if self.exists(name)]
+        with ThreadPoolExecutor() as pool:
+            list(pool.map(compress_file, paths))
+
+    def stored_name(self, name):
+        # Until collectstatic has written a manifest, serve the original names.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+
+def accepted_encodings(header):
+    """Return the content codings allowed by an Accept-Encoding header"""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding)
+    if '*' in accepted:
+        accepted.update(encoding for encoding, _ in ENCODINGS)
+    return accepted
+
+
+class StaticAsset:
+    """A file under STATIC_ROOT and its precompressed siblings"""
+
+    def __init__(self, name, path):
+        stat = os.stat(path)
+        self.name = name
+        self.path = path
+        self.size = stat.st_size
+        self.last_modified = int(stat.st_mtime)
+        self.etag = f'"{self.size:x}-{self.last_modified:x}"'
+        self.content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.variants = {
+            encoding: path + suffix
+            for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix)
+        }
+        immutable = name in set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL
+
+    def etag_for(self, encoding):
+        """Return the strong ETag of one content coding of the file"""
+        # Each coding is different bytes, so each needs its own strong validator.
+        return f'{self.etag[:-1]}-{encoding}"' if encoding else self.etag
+
+    def select(self, accept_encoding):
+        """Return ``(path, content encoding)`` for the best variant the client accepts"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return self.variants[encoding], encoding
+        return self.path, None
+
+
+def _find_asset(name):
+    if not settings.STATIC_ROOT or not name or name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+        return None
+    try:
+        path = safe_join(settings.STATIC_ROOT, name)
+    except SuspiciousFileOperation:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return StaticAsset(name, path)
+
+
+# Collected files don't change while a process runs; look each one up once.
+_cached_find_asset = lru_cache(maxsize=4096)(_find_asset)
+
+
+class PrecompressedStaticMiddleware:
+    """Serve collected static files with their precompressed variants"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            name = request.path_info[len(self.prefix):]
+            # Keep picking up freshly collected files while developing.
+            asset = _find_asset(name) if settings.DEBUG else _cached_find_asset(name)
+            if asset is not None:
+                return self.serve(request, asset)
+        return self.get_response(request)
+
+    def serve(self, request, asset):
+        path, encoding = asset.select(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        etag = asset.etag_for(encoding)
+        response = get_conditional_response(request, etag=etag, last_modified=asset.last_modified)
+        if response is None:
+            response = FileResponse(open(path, 'rb'), content_type=asset.content_type)
+            # FileResponse would name the .gz/.br file here; this is an inline asset.
+            del response['Content-Disposition']
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(asset.last_modified)
+        response['Cache-Control'] = asset.cache_control
+        response['Vary'] = 'Accept-Encoding'
+        return response
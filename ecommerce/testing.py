@@ -0,0 +1,18 @@
+"""Test case bases shared by the apps' test suites.
+
+Request metrics are sampled at random (``REQUEST_METRICS_SAMPLE_RATE``), which
+would log a JSON line for an unpredictable few test requests. These bases turn
+sampling off whatever runner is used; tests of the metrics opt back in with
+``override_settings``.
+"""
+from django import test
+
+
+@test.override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+class TestCase(test.TestCase):
+    pass
+
+
+@test.override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+class TransactionTestCase(test.TransactionTestCase):
+    pass
@@ -0,0 +1,185 @@
+import gzip
+import json
+import os
+import tempfile
+
+from unittest import mock
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import override_settings
+from django.urls import path, reverse
+
+from admin_dashboard.models import Category, Customer, Product
+from homepage import views as homepage_views
+
+from . import page_cache, static_assets, urls as project_urls
+from .testing import TestCase
+from .instrumentation import sql_shape
+
+CSS = 'body { background: url("../img/dot.png"); }\n' + '.x { color: red; }\n' * 200
+
+
+class StaticAssetPipelineTestCase(TestCase):
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(source.name, 'site', 'css'))
+        os.makedirs(os.path.join(source.name, 'site', 'img'))
+        with open(os.path.join(source.name, 'site', 'css', 'app.css'), 'w') as css:
+            css.write(CSS)
+        with open(os.path.join(source.name, 'site', 'img', 'dot.png'), 'wb') as png:
+            png.write(b'\x89PNG' + bytes(512))
+
+        self.root = root.name
+        override = override_settings(
+            STATICFILES_DIRS=[source.name], STATIC_ROOT=root.name, INSTALLED_APPS=['django.contrib.staticfiles'],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(static_assets._cached_find_asset.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_hashes_and_precompresses(self):
+        with open(os.path.join(self.root, 'staticfiles.json')) as manifest:
+            hashed = json.load(manifest)['paths']['site/css/app.css']
+        self.assertRegex(hashed, r'^site/css/app\.[0-9a-f]{12}\.css$')
+        with gzip.open(os.path.join(self.root, hashed + '.gz'), 'rt') as compressed:
+            self.assertIn('dot.', compressed.read())
+        # Binary formats aren't compressed
+        self.assertFalse(any(name.endswith('.png.gz') for name in os.listdir(os.path.join(self.root, 'site', 'img'))))
+
+    def test_serves_best_accepted_encoding_with_immutable_headers(self):
+        url = staticfiles_storage.url('site/css/app.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], static_assets.IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), open(
+            os.path.join(self.root, url[len('/static/'):])
+        ).read())
+
+        identity = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', identity)
+        # Strong validators differ per content coding
+        self.assertEqual(response['ETag'], identity['ETag'][:-1] + '-gzip"')
+
+        revalidated = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_unhashed_names_get_short_cache(self):
+        response = self.client.get('/static/site/css/app.css')
+        self.assertEqual(response['Cache-Control'], static_assets.DEFAULT_CACHE_CONTROL)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(static_assets.accepted_encodings('br;q=0.9, gzip;q=0'), {'br'})
+        self.assertEqual(static_assets.accepted_encodings('*'), {'*', 'br', 'gzip'})
+
+
+@override_settings(PAGE_CACHE_TEMPLATE_CHECK_INTERVAL=0)
+class PageCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_second_request_skips_rendering(self):
+        first = self.client.get(reverse('home'))
+        with mock.patch.object(homepage_views, 'render') as render:
+            second = self.client.get(reverse('home'))
+        render.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Cache-Control'], page_cache.CACHE_CONTROL)
+
+    def test_matching_etag_gets_304(self):
+        etag = self.client.get(reverse('product_list'))['ETag']
+        response = self.client.get(reverse('product_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        stale = self.client.get(reverse('product_list'), HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_only_the_query_parameters_a_view_reads_vary_the_page(self):
+        url = reverse('product_list')
+        self.client.get(url)
+        with mock.patch('productpages.views.render') as render:
+            response = self.client.get(url, {'utm_source': 'mail', 'x': '1'})
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(page_cache.page_key(f'{url}?category=dairy'), page_cache.page_key(url))
+        self.assertEqual(self.client.get(url, {'category': 'dairy'}).context['category'], 'dairy')
+
+    def test_product_changes_invalidate(self):
+        key = page_cache.page_key('/')
+        Product.objects.create(
+            name='Fresh', description='d', price=1, category=Category.objects.get(name='Snacks & Munchies'),
+            stock_quantity=1,
+        )
+        self.assertNotEqual(page_cache.page_key('/'), key)
+
+    def test_template_edits_invalidate(self):
+        key = page_cache.page_key('/')
+        index = os.path.join(page_cache._template_dirs()[0], 'index.html')
+        stat = os.stat(index)
+        self.addCleanup(os.utime, index, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.utime(index, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertNotEqual(page_cache.page_key('/'), key)
+
+
+def customer_names(request):
+    # Touches customer.user without select_related: one query per customer
+    return HttpResponse(', '.join(customer.user.username for customer in Customer.objects.all()))
+
+
+class MetricsURLConf:
+    urlpatterns = [path('customer-names/', customer_names)] + project_urls.urlpatterns
+
+
+@override_settings(ROOT_URLCONF=MetricsURLConf, REQUEST_METRICS_SAMPLE_RATE=1.0, REQUEST_METRICS_N_PLUS_ONE=5)
+class RequestMetricsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for index in range(6):
+            Customer.objects.create(user=User.objects.create_user(username=f'metrics{index}'))
+
+    def test_sql_shape_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            sql_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            sql_shape("SELECT * FROM t WHERE id IN (%s) AND name = 'yy' LIMIT 5"),
+        )
+
+    def test_sampled_request_reports_server_timing_and_a_log_line(self):
+        with self.assertLogs('ecommerce.requests', 'INFO') as logs:
+            response = self.client.get(reverse('home'))
+
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'view;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], '/')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertIn(f'desc="{record["queries"]} queries"', timing)
+        self.assertEqual(record['n_plus_one'], [])
+
+    def test_repeated_query_shapes_are_flagged(self):
+        with self.assertLogs('ecommerce.requests', 'WARNING') as logs:
+            response = self.client.get('/customer-names/')
+
+        self.assertIn('desc="7 queries"', response['Server-Timing'])
+        suspects = json.loads(logs.records[0].getMessage())['n_plus_one']
+        self.assertEqual(len(suspects), 1)
+        self.assertEqual(suspects[0]['count'], 6)
+        self.assertIn('auth_user', suspects[0]['sql'])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_untouched(self):
+        response = self.client.get(reverse('home'))
+        self.assertNotIn('Server-Timing', response)
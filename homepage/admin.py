@@ -1,7 +1,6 @@
 from django.contrib import admin
-from .models import Product,About , Contact,Error_404
+from .models import About , Contact,Error_404
 
-admin.site.register(Product)
 admin.site.register(About)
 admin.site.register(Contact)
 admin.site.register(Error_404)
@@ -0,0 +1,78 @@
+"""Storefront product blocks, precomputed from the dashboard catalog.
+
+The featured, bestseller and per-category carousels are built together with
+three queries and kept in the default cache as one entry, so rendering the
+homepage or a shop page reads them from memory. ``homepage.signals`` drops the
+entry whenever the catalog changes; bestsellers follow new orders within
+``BLOCKS_TIMEOUT``.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from admin_dashboard.models import Order, Product
+
+BLOCKS_KEY = 'storefront:blocks'
+BLOCKS_TIMEOUT = 60 * 60
+
+FEATURED_COUNT = 10
+BESTSELLER_COUNT = 3
+# Bestsellers rank the units sold over this many days
+BESTSELLER_DAYS = 30
+CATEGORY_COUNT = 10
+
+# Everything a product card needs; descriptions stay in the database.
+CARD_FIELDS = (
+    'id', 'name', 'category__name', 'category__slug', 'price', 'stock_quantity', 'image', 'image_variants',
+    'created_at',
+)
+
+
+def visible_products():
+    """Products shoppers may see"""
+    return Product.objects.filter(is_active=True, status='active')
+
+
+def _cards(queryset):
+    return list(queryset.select_related('category').only(*CARD_FIELDS))
+
+
+def build_blocks():
+    """Query the storefront blocks from the catalog"""
+    products = visible_products()
+    ranked = products.annotate(
+        category_rank=Window(RowNumber(), partition_by=F('category'), order_by=[F('created_at').desc(), F('id').desc()])
+    ).filter(category_rank__lte=CATEGORY_COUNT).order_by('category', 'category_rank')
+
+    categories = {}
+    for product in _cards(ranked):
+        categories.setdefault(product.category.slug, []).append(product)
+
+    return {
+        'featured': _cards(products.order_by('-created_at', '-id')[:FEATURED_COUNT]),
+        'bestsellers': _cards(
+            products.filter(
+                stock_quantity__gt=0,
+                order_items__order__status__in=Order.EARNING_STATUSES,
+                order_items__order__placed_at__gte=timezone.now() - timedelta(days=BESTSELLER_DAYS),
+            ).annotate(units_sold=Sum('order_items__quantity')).order_by('-units_sold', '-id')[:BESTSELLER_COUNT]
+        ),
+        'categories': categories,
+    }
+
+
+def storefront_blocks():
+    """Return the cached storefront blocks, building them on a miss"""
+    blocks = cache.get(BLOCKS_KEY)
+    if blocks is None:
+        blocks = build_blocks()
+        cache.set(BLOCKS_KEY, blocks, BLOCKS_TIMEOUT)
+    return blocks
+
+
+def refresh():
+    """Forget the cached blocks; the next page view rebuilds them"""
+    cache.delete(BLOCKS_KEY)
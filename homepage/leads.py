@@ -0,0 +1,225 @@
+"""Write-behind queue for the lead capture forms (About, Contact, Error_404).
+
+A submission is validated, appended to a per-process spool file and kept in
+memory, and the request returns straight away. A background thread flushes
+the buffer with one ``bulk_create`` per model once ``LEAD_BATCH_SIZE``
+submissions are waiting or every ``LEAD_FLUSH_INTERVAL`` seconds. Repeated
+submissions for the same email (or 404 message) collapse into one row, and
+addresses that are already stored are skipped.
+
+Spool files survive restarts: on start-up the queue claims the spools of
+processes that are no longer running and writes their submissions too. Each
+start gets its own spool name, so a restart that reuses the PID of the
+previous process (common in containers) still finds that process's spools.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# The field a lead is deduplicated on, per model
+DEDUPE_FIELDS = {
+    'homepage.About': 'email',
+    'homepage.Contact': 'email',
+    'homepage.Error_404': 'message',
+}
+
+# The PID in a spool name: leads-<pid>-<start token>.jsonl, .flushing or a
+# .recovering claim of either
+SPOOL_PID = re.compile(r'leads-(\d+)\b')
+
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WriteBehindQueue:
+    """Buffer lead submissions and write them in batches"""
+
+    def __init__(self, spool_dir, batch_size=100, interval=2.0):
+        self.spool_dir = str(spool_dir)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pid = os.getpid()
+        stem = f'leads-{self.pid}-{secrets.token_hex(4)}'
+        self.spool_path = os.path.join(self.spool_dir, f'{stem}.jsonl')
+        self.flushing_path = os.path.join(self.spool_dir, f'{stem}.flushing')
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {}  # (model label, dedupe value) -> fields
+        self._spool = None
+        self._thread = None
+
+    def start(self):
+        """Open the spool, recover abandoned ones and start the flusher thread"""
+        with self._lock:
+            if self._spool is not None:
+                return
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+            self._recover()
+            if self.interval:
+                self._thread = threading.Thread(target=self._run, name='lead-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def submit(self, model, **fields):
+        """Validate and queue a submission; return False if it is invalid"""
+        try:
+            model(**fields).full_clean()
+        except ValidationError:
+            return False
+
+        record = {'model': model._meta.label, 'fields': fields}
+        self.start()
+        with self._lock:
+            self._spool.write(json.dumps(record) + '\n')
+            self._sync()
+            self._add(record)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write everything buffered so far and return the number of rows created"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                # Everything in the current spool is in ``batch``; set it aside
+                # until the batch is committed.
+                self._spool.close()
+                os.replace(self.spool_path, self.flushing_path)
+                self._spool = open(self.spool_path, 'a', encoding='utf-8')
+
+            try:
+                created = self._write(batch)
+            except Exception:
+                with self._lock:
+                    # Newer submissions for the same key win over the failed batch.
+                    self._pending = {**batch, **self._pending}
+                    self._spool_records(batch)
+                    os.remove(self.flushing_path)
+                raise
+            os.remove(self.flushing_path)
+            return created
+
+    def _add(self, record):
+        label, fields = record['model'], record['fields']
+        self._pending[(label, fields[DEDUPE_FIELDS[label]])] = fields
+
+    def _spool_records(self, batch):
+        for (label, _), fields in batch.items():
+            self._spool.write(json.dumps({'model': label, 'fields': fields}) + '\n')
+        self._sync()
+
+    def _sync(self):
+        # A submission is only acknowledged once it is on disk
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _write(self, batch):
+        by_model = {}
+        for (label, key), fields in batch.items():
+            by_model.setdefault(label, {})[key] = fields
+
+        created = 0
+        with transaction.atomic():
+            for label, rows in by_model.items():
+                model = apps.get_model(label)
+                field = DEDUPE_FIELDS[label]
+                existing = set(
+                    model.objects.filter(**{f'{field}__in': list(rows)}).values_list(field, flat=True)
+                )
+                objs = [model(**fields) for key, fields in rows.items() if key not in existing]
+                model.objects.bulk_create(objs, batch_size=self.batch_size)
+                created += len(objs)
+        return created
+
+    def _recover(self):
+        """Adopt spools left behind by processes that have exited"""
+        own = {self.spool_path, self.flushing_path}
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, 'leads-*.*'))):
+            match = SPOOL_PID.match(os.path.basename(path))
+            if path in own or not match:
+                continue
+            # Spools of this PID that are not ours belong to an earlier process
+            # that had the same PID.
+            pid = int(match.group(1))
+            if pid != self.pid and _pid_running(pid):
+                continue
+            claimed = f'{self.spool_path}.recovering'
+            try:
+                # Only one process wins the rename.
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed, encoding='utf-8') as spool:
+                lines = spool.readlines()
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a write cut short by a crash
+                if record.get('model') in DEDUPE_FIELDS:
+                    self._spool.write(line if line.endswith('\n') else line + '\n')
+                    self._add(record)
+            self._sync()
+            os.remove(claimed)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Could not flush lead submissions; will retry')
+            finally:
+                close_old_connections()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None or _queue.pid != os.getpid():
+            _queue = WriteBehindQueue(
+                spool_dir=getattr(settings, 'LEAD_SPOOL_DIR', settings.BASE_DIR / 'var' / 'spool'),
+                batch_size=getattr(settings, 'LEAD_BATCH_SIZE', 100),
+                interval=getattr(settings, 'LEAD_FLUSH_INTERVAL', 2.0),
+            )
+        return _queue
+
+
+def submit(model, **fields):
+    """Queue a lead capture submission"""
+    return get_queue().submit(model, **fields)
@@ -1,8 +1,4 @@
-<<<<<<< HEAD
-# Generated by Django 5.2.6 on 2025-09-10 22:31
-=======
 # Generated by Django 5.2.6 on 2025-09-10 21:24
->>>>>>> 4b931f5884a3f9125c54b198efce5c0a75694fe4
 
 from django.db import migrations, models
 
@@ -16,15 +12,6 @@ class Migration(migrations.Migration):
 
     operations = [
         migrations.CreateModel(
-<<<<<<< HEAD
-            name='product',
-            fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('name', models.CharField(max_length=100)),
-                ('description', models.TextField()),
-                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
-                ('image', models.ImageField(upload_to='product_images/')),
-=======
             name='Contact',
             fields=[
                 ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
@@ -49,7 +36,6 @@ class Migration(migrations.Migration):
                 ('price', models.DecimalField(decimal_places=2, max_digits=10)),
                 ('rating', models.FloatField(default=0)),
                 ('reviews', models.IntegerField(default=0)),
->>>>>>> 4b931f5884a3f9125c54b198efce5c0a75694fe4
             ],
         ),
     ]
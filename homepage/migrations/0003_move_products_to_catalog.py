@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+def copy_products(apps, schema_editor):
+    """Copy storefront-only products into the dashboard catalog"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if 'homepage_product' not in connection.introspection.table_names(cursor):
+            return
+        # Databases migrated from either side of the old merge have different columns.
+        columns = {
+            column.name for column in connection.introspection.get_table_description(cursor, 'homepage_product')
+        }
+        selected = [column for column in ('name', 'title', 'description', 'weight', 'price') if column in columns]
+        cursor.execute(f"SELECT {', '.join(selected)} FROM homepage_product")
+        rows = [dict(zip(selected, row)) for row in cursor.fetchall()]
+
+    CatalogProduct = apps.get_model('admin_dashboard', 'Product')
+    CatalogProduct.objects.bulk_create([
+        CatalogProduct(
+            name=row['name'],
+            description=row.get('description') or row.get('weight') or '',
+            price=row['price'],
+            category=(row.get('title') or 'Snacks & Munchies')[:100],
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('homepage', '0002_about'),
+        ('admin_dashboard', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_products, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='Product',
+        ),
+    ]
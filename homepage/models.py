@@ -1,27 +1,8 @@
 from django.db import models
 
-<<<<<<< HEAD
 # Create your models here.
-class product(models.Model):
-    name = models.CharField(max_length=100)
-    description = models.TextField()
-    price = models.DecimalField(max_digits=10, decimal_places=2)
-    image = models.ImageField(upload_to='product_images/')
+# Storefront products live in admin_dashboard.Product.
 
-    def __str__(self):
-        return self.name
-=======
-class Product(models.Model):
-    title = models.CharField(max_length=100)          # e.g. Bakery & Biscuits
-    name = models.CharField(max_length=100)           # e.g. NutriChoice Digestive
-    weight = models.CharField(max_length=50, blank=True, null=True)  # optional
-    price = models.DecimalField(max_digits=10, decimal_places=2)     # better than CharField
-    rating = models.FloatField(default=0)             # e.g. 4.5
-    reviews = models.IntegerField(default=0)          # e.g. 25
-
-    def __str__(self):
-        return self.name
-    
 
 class Contact(models.Model):
     phone_number = models.CharField(max_length=20)
@@ -43,17 +24,3 @@ class About(models.Model):
 
     def __str__(self):
         return self.email
-
-
-
-
-
-
-
-
-
-
-
-
-
->>>>>>> 4b931f5884a3f9125c54b198efce5c0a75694fe4
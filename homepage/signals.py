@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from admin_dashboard.models import Category, Product
+from admin_dashboard.signals import products_bulk_changed
+
+from . import catalog
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(products_bulk_changed)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, **kwargs):
+    """Rebuild the storefront blocks after any catalog change"""
+    catalog.refresh()
@@ -1,3 +1,151 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.urls import reverse
+
+from admin_dashboard.models import Category, Product
+from admin_dashboard.orders import place_order
+from ecommerce.testing import TestCase
+
+from . import catalog, leads
+from .models import About, Contact, Error_404
+
+
+def make_product(name, category='Snacks & Munchies', **fields):
+    fields.setdefault('stock_quantity', 10)
+    return Product.objects.create(
+        name=name, description=f'{name} description', price=5, category=Category.objects.get(name=category), **fields
+    )
+
+
+class StorefrontCatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_blocks_come_from_the_dashboard_catalog(self):
+        make_product('Digestive Biscuits', 'Bakery & Biscuits')
+        make_product('Hidden Draft', status='draft')
+        popular = make_product('Popular', stock_quantity=1)
+        place_order(None, [(popular, 2)])
+
+        blocks = catalog.storefront_blocks()
+        self.assertEqual([p.name for p in blocks['featured']], ['Popular', 'Digestive Biscuits'])
+        self.assertEqual([p.name for p in blocks['bestsellers']], ['Popular'])
+        self.assertEqual([p.name for p in blocks['categories']['bakery-biscuits']], ['Digestive Biscuits'])
+
+    def test_blocks_are_served_from_cache_until_the_catalog_changes(self):
+        make_product('First')
+        catalog.storefront_blocks()
+        with self.assertNumQueries(0):
+            catalog.storefront_blocks()
+
+        make_product('Second')
+        self.assertEqual(catalog.storefront_blocks()['featured'][0].name, 'Second')
+
+    def test_category_blocks_take_one_query(self):
+        for index in range(catalog.CATEGORY_COUNT + 2):
+            make_product(f'Snack {index}')
+        make_product('Milk', 'Dairy, Bread & Eggs')
+        with self.assertNumQueries(3):
+            blocks = catalog.build_blocks()
+        self.assertEqual(len(blocks['categories']['snacks-munchies']), catalog.CATEGORY_COUNT)
+        self.assertEqual(len(blocks['categories']['dairy-bread-eggs']), 1)
+
+    def test_homepage_lists_catalog_products(self):
+        product = make_product('Haldiram Sev')
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Haldiram Sev')
+        self.assertContains(response, reverse('storefront_product_detail', args=[product.pk]))
+
+
+class StorefrontProductDetailTestCase(TestCase):
+    def test_detail_is_conditional(self):
+        product = make_product('Detail Product')
+        url = reverse('storefront_product_detail', args=[product.pk])
+        response = self.client.get(url)
+        self.assertContains(response, 'Detail Product description')
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_hidden_products_are_not_found(self):
+        product = make_product('Inactive Product', is_active=False)
+        response = self.client.get(reverse('storefront_product_detail', args=[product.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class LeadWriteBehindTestCase(TestCase):
+    def setUp(self):
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        self.spool_dir = spool_dir.name
+        self.queue = leads.WriteBehindQueue(self.spool_dir, batch_size=50, interval=None)
+
+    def test_submissions_are_deduplicated_and_written_in_one_batch(self):
+        About.objects.create(email='known@example.com')
+        for email in ('a@example.com', 'b@example.com', 'a@example.com', 'known@example.com'):
+            self.assertTrue(self.queue.submit(About, email=email))
+        self.queue.submit(Contact, phone_number='1', email='c@example.com')
+        self.queue.submit(Contact, phone_number='2', email='c@example.com')
+        self.assertFalse(About.objects.filter(email='a@example.com').exists())
+
+        # One lookup and one insert per model, inside a savepoint
+        with self.assertNumQueries(6):
+            created = self.queue.flush()
+        self.assertEqual(created, 3)
+        self.assertEqual(About.objects.filter(email='a@example.com').count(), 1)
+        self.assertEqual(Contact.objects.get(email='c@example.com').phone_number, '2')
+        self.assertEqual(os.path.getsize(self.queue.spool_path), 0)
+
+    def test_invalid_submissions_are_rejected(self):
+        self.assertFalse(self.queue.submit(About, email=None))
+        self.assertFalse(self.queue.submit(About, email='not-an-email'))
+        self.assertEqual(self.queue.pending(), 0)
+
+    def test_failed_flush_keeps_the_spool(self):
+        self.queue.submit(Error_404, message='Broken link')
+        with mock.patch.object(self.queue, '_write', side_effect=RuntimeError('database is locked')):
+            with self.assertRaises(RuntimeError):
+                self.queue.flush()
+        self.assertEqual(self.queue.pending(), 1)
+        with open(self.queue.spool_path) as spool:
+            self.assertEqual(json.loads(spool.readline())['fields'], {'message': 'Broken link'})
+        self.assertEqual(self.queue.flush(), 1)
+
+    def test_spools_of_exited_processes_are_recovered(self):
+        orphan = os.path.join(self.spool_dir, 'leads-999999999.jsonl')
+        with open(orphan, 'w') as spool:
+            spool.write(json.dumps({'model': 'homepage.About', 'fields': {'email': 'lost@example.com'}}) + '\n')
+            spool.write('{"model": "homepage.Ab')  # torn final write
+        self.queue.start()
+        self.assertFalse(os.path.exists(orphan))
+        self.assertEqual(self.queue.flush(), 1)
+        self.assertTrue(About.objects.filter(email='lost@example.com').exists())
+
+    def test_spools_of_a_restart_with_the_same_pid_are_recovered(self):
+        """A restarted process that gets the PID of the previous one still adopts its spools"""
+        # A killed process of this PID, caught in the middle of a flush
+        previous = leads.WriteBehindQueue(self.spool_dir)
+        self.assertEqual(previous.pid, self.queue.pid)
+        for path, email in ((previous.flushing_path, 'flushing@example.com'), (previous.spool_path, 'spooled@example.com')):
+            with open(path, 'w') as spool:
+                spool.write(json.dumps({'model': 'homepage.About', 'fields': {'email': email}}) + '\n')
+
+        self.queue.start()
+        self.assertEqual(self.queue.pending(), 2)
+        self.assertEqual(sorted(os.listdir(self.spool_dir)), [os.path.basename(self.queue.spool_path)])
+        self.assertEqual(self.queue.flush(), 2)
+        self.assertEqual(About.objects.count(), 2)
+
+    def test_views_queue_instead_of_saving(self):
+        with mock.patch.object(leads, '_queue', self.queue):
+            response = self.client.post(reverse('contact'), {
+                'formContactPhone': '555-0100', 'formContactEmail': 'lead@example.com',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Contact.objects.exists())
+        self.queue.flush()
+        self.assertTrue(Contact.objects.filter(email='lead@example.com').exists())
@@ -10,7 +10,7 @@ urlpatterns = [
     path('home-5/', views.home_5, name='home_5'),
 
     # Product detail page (dynamic)
-    path('product/<int:product_id>/', views.product_detail, name='product_detail'),
+    path('product/<int:product_id>/', views.product_detail, name='storefront_product_detail'),
     # path('contact/', views.contact, name='contact'),
     # path('404/', views.error_404, name='error_404'),
     path('about/', views.about, name='about'),
@@ -1,40 +1,71 @@
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404
-from .models import Product, About , Contact, Error_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from admin_dashboard.fragments import ProductValidators, product_fragment, product_version
+from ecommerce.page_cache import cache_page_render
+from . import leads
+from .catalog import storefront_blocks, visible_products
+from .models import About , Contact, Error_404
+
+DETAIL_CACHE_CONTROL = 'public, no-cache'
 
 # Create your views here.
 
+@cache_page_render
 def home(request):
     """Home page (Home 1)"""
-    return render(request, 'index.html')
+    return render(request, 'index.html', {'blocks': storefront_blocks()})
 
 # Alternative home pages
+@cache_page_render
 def home_2(request):
     """Home 2"""
     return render(request, 'pages/index-2.html')
 
+@cache_page_render
 def home_3(request):
     """Home 3"""
     return render(request, 'pages/index-3.html')
 
+@cache_page_render
 def home_4(request):
     """Home 4"""
     return render(request, 'pages/index-4.html')
 
+@cache_page_render
 def home_5(request):
     """Home 5"""
     return render(request, 'pages/index-5.html')
 
 # Product detail page (dynamic)
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
-    return render(request, 'pages/product_detail.html', {"product": product})
+    updated_at = product_version(product_id, visible_products())
+    if updated_at is None:
+        raise Http404('No Product matches the given query.')
+
+    validators = ProductValidators('storefront', product_id, updated_at)
+    not_modified = validators.not_modified(request)
+    if not_modified is not None:
+        return validators.apply(not_modified, DETAIL_CACHE_CONTROL)
+
+    def render_content():
+        product = get_object_or_404(visible_products().select_related('category'), pk=product_id)
+        return product.name, mark_safe(render_to_string('pages/product_detail_content.html', {'product': product}))
+
+    product_name, detail_content = product_fragment('storefront', product_id, updated_at, render_content)
+    context = {
+        'product_name': product_name,
+        'detail_content': detail_content,
+    }
+    response = render(request, 'pages/product_detail.html', context)
+    return validators.apply(response, DETAIL_CACHE_CONTROL)
 
 def about(request):
     if request.method == "POST":
         email = request.POST.get("formAboutEmail")
-
-        data_entry = About(email=email)
-        data_entry.save()
+        leads.submit(About, email=email)
 
     return render(request, 'pages/about.html')
 
@@ -43,27 +74,28 @@ def contact(request):
         phone_number = request.POST.get("formContactPhone")
         email = request.POST.get("formContactEmail")
 
-        data_entry = Contact(phone_number=phone_number, email=email)
-        data_entry.save()
+        leads.submit(Contact, phone_number=phone_number, email=email)
     return render(request, 'pages/contact.html')
 
 
 def error_404(request):
     if request.method == "POST":
         message = request.POST.get("formErrorMessage")
-        data_entry = Error_404(message=message)
-        data_entry.save()
+        leads.submit(Error_404, message=message)
     return render(request, 'pages/404error.html')
 
 # Blog pages
+@cache_page_render
 def blog(request):
     """Blog listing page"""
     return render(request, 'pages/blog.html')
 
+@cache_page_render
 def blog_single(request, id=1):
     """Blog single post"""
     return render(request, 'pages/blog-single.html')
 
+@cache_page_render
 def blog_category(request, category='general'):
     """Blog category page"""
     return render(request, 'pages/blog-category.html')
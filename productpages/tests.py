@@ -1,3 +1,24 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.urls import reverse
 
-# Create your tests here.
+from admin_dashboard.models import Category, Product
+from ecommerce.testing import TestCase
+
+
+class ShopGridTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for name, category in (('Catalog Sourdough', 'Dairy, Bread & Eggs'), ('Catalog Chips', 'Snacks & Munchies')):
+            Product.objects.create(
+                name=name, description='d', price=2, category=Category.objects.get(name=category), stock_quantity=3
+            )
+
+    def test_category_filter(self):
+        response = self.client.get(reverse('product_list'), {'category': 'snacks-munchies'})
+        self.assertContains(response, 'Catalog Chips')
+        self.assertNotContains(response, 'Catalog Sourdough')
+
+    def test_empty_category(self):
+        response = self.client.get(reverse('product_list'), {'category': 'frozen-veg'})
+        self.assertContains(response, 'No products in this category yet.')
@@ -1,31 +1,49 @@
 from django.shortcuts import render
 
+from ecommerce.page_cache import cache_page_render
+from homepage.catalog import storefront_blocks
+
 # Create your views here.
 
+@cache_page_render(query=('category',))
 def product_list(request):
     """Shop Grid - Filter (main product listing)"""
-    return render(request, 'pages/shop-grid.html')
+    blocks = storefront_blocks()
+    category = request.GET.get('category')
+    products = blocks['categories'].get(category, []) if category else blocks['featured']
+    context = {
+        'products': products,
+        'category': category,
+        'has_catalog': bool(blocks['featured']),
+    }
+    return render(request, 'pages/shop-grid.html', context)
 
+@cache_page_render
 def product_grid_3(request):
     """Shop Grid - 3 column"""
     return render(request, 'pages/shop-grid-3-column.html')
 
+@cache_page_render
 def product_list_filter(request):
     """Shop List - Filter"""
     return render(request, 'pages/shop-list.html')
 
+@cache_page_render
 def product_filter(request):
     """Shop - Filter"""
     return render(request, 'pages/shop-filter.html')
 
+@cache_page_render
 def product_wide(request):
     """Shop Wide"""
     return render(request, 'pages/shop-fullwidth.html')
 
+@cache_page_render
 def product_single(request, id=1):
     """Shop Single"""
     return render(request, 'pages/shop-single.html')
 
+@cache_page_render
 def product_single_v2(request, id=1):
     """Shop Single v2"""
     return render(request, 'pages/shop-single-2.html')
@@ -43,14 +61,17 @@ def product_checkout(request):
     return render(request, 'pages/shop-checkout.html')
 
 # Store Views
+@cache_page_render
 def store_list(request):
     """Store List"""
     return render(request, 'pages/store-list.html')
 
+@cache_page_render
 def store_grid(request):
     """Store Grid"""
     return render(request, 'pages/store-grid.html')
 
+@cache_page_render
 def store_single(request, id=1):
     """Store Single"""
     return render(request, 'pages/store-single.html')
@@ -0,0 +1,50 @@
+// Keep the dashboard KPI cards current without reloading the page.
+// Uses the Server-Sent Events stream when the server offers one (ASGI) and
+// falls back to polling the JSON endpoint otherwise.
+(function () {
+  var script = document.currentScript;
+  var jsonUrl = script.dataset.kpiUrl;
+  var streamUrl = script.dataset.kpiStreamUrl;
+  var interval = (parseFloat(script.dataset.kpiInterval) || 5) * 1000;
+
+  var formats = {
+    monthly_earnings: function (value) {
+      return "$" + Number(value).toFixed(2);
+    },
+    new_customers_2_days: function (value) {
+      return value + "+";
+    },
+  };
+
+  function update(kpis) {
+    document.querySelectorAll("[data-kpi]").forEach(function (element) {
+      var name = element.dataset.kpi;
+      if (!(name in kpis)) return;
+      var format = formats[name] || String;
+      element.textContent = format(kpis[name]);
+    });
+  }
+
+  function poll() {
+    fetch(jsonUrl, { credentials: "same-origin", headers: { Accept: "application/json" } })
+      .then(function (response) {
+        return response.ok ? response.json() : null;
+      })
+      .then(function (kpis) {
+        if (kpis) update(kpis);
+      })
+      .catch(function () {})
+      .then(function () {
+        setTimeout(poll, interval);
+      });
+  }
+
+  if (streamUrl && window.EventSource) {
+    var source = new EventSource(streamUrl);
+    source.addEventListener("kpis", function (event) {
+      update(JSON.parse(event.data));
+    });
+  } else if (jsonUrl) {
+    setTimeout(poll, interval);
+  }
+})();
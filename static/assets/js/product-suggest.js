@@ -0,0 +1,46 @@
+// Typeahead for the dashboard product search box: fills a <datalist> with
+// product names and categories from the suggestion endpoint as the user types.
+(function () {
+  var script = document.currentScript;
+  var input = document.getElementById(script.dataset.input);
+  var list = document.getElementById(script.dataset.list);
+  if (!input || !list) return;
+
+  var url = script.dataset.suggestUrl;
+  var timer = null;
+  var latest = 0;
+  input.setAttribute("list", list.id);
+  input.setAttribute("autocomplete", "off");
+
+  function show(data) {
+    var values = data.products.map(function (product) {
+      return product.name;
+    }).concat(data.categories);
+    list.replaceChildren.apply(list, values.map(function (value) {
+      var option = document.createElement("option");
+      option.value = value;
+      return option;
+    }));
+  }
+
+  input.addEventListener("input", function () {
+    clearTimeout(timer);
+    var query = input.value.trim();
+    if (!query) {
+      list.replaceChildren();
+      return;
+    }
+    timer = setTimeout(function () {
+      var request = ++latest;
+      fetch(url + "?q=" + encodeURIComponent(query), { credentials: "same-origin" })
+        .then(function (response) {
+          return response.ok ? response.json() : null;
+        })
+        .then(function (data) {
+          // Ignore answers to queries the user has already typed past
+          if (data && request === latest) show(data);
+        })
+        .catch(function () {});
+    }, 100);
+  });
+})();